@@ -0,0 +1,106 @@
+"""A pool of catalog ordinals supporting O(1) random selection."""
+
+import random
+from typing import Optional
+
+
+class AllowedPool:
+    """A class used to pick a random allowed video in constant time.
+
+    The pool is a permutation of the catalog ordinals 0..n-1 split in two:
+    the first `len(pool)` slots hold the allowed ordinals, the rest hold the
+    excluded ones. Excluding an ordinal swaps it with the last allowed slot
+    and shrinks the allowed part, allowing it again swaps it back in, so
+    both are O(1) and a random allowed ordinal is a random slot of the
+    first part.
+
+    Only the slots that differ from the identity permutation are stored,
+    so a pool over a fresh catalog costs nothing however large the catalog
+    is.
+    """
+
+    def __init__(self, size: int = 0):
+        """AllowedPool constructor.
+
+        Args:
+            size: The number of catalog ordinals, all of them allowed.
+        """
+        self._size = size
+        self._known = size
+        self._slots = {}
+        self._positions = {}
+
+    def __len__(self):
+        """Returns the number of allowed ordinals."""
+        return self._size
+
+    def __contains__(self, ordinal: int) -> bool:
+        return 0 <= ordinal < self._known and \
+            self._position(ordinal) < self._size
+
+    @property
+    def known(self) -> int:
+        """Returns the number of ordinals the pool knows about."""
+        return self._known
+
+    def extend(self, count: int):
+        """Makes the pool aware of `count` new catalog ordinals, appended
+        after the known ones and allowed."""
+        for _ in range(count):
+            ordinal = self._known
+            self._known += 1
+            self.add(ordinal)
+
+    def discard(self, ordinal: int) -> bool:
+        """Excludes an ordinal from random selection.
+
+        Returns:
+            False if the ordinal was not allowed.
+        """
+        if ordinal not in self:
+            return False
+        self._size -= 1
+        self._swap(self._position(ordinal), self._size)
+        return True
+
+    def add(self, ordinal: int) -> bool:
+        """Allows an ordinal known to the pool again.
+
+        Returns:
+            False if the ordinal was already allowed.
+        """
+        if not 0 <= ordinal < self._known or ordinal in self:
+            return False
+        self._swap(self._position(ordinal), self._size)
+        self._size += 1
+        return True
+
+    def choice(self, rng=random) -> Optional[int]:
+        """Returns a random allowed ordinal, or None if there is none.
+
+        Args:
+            rng: The random number generator to use.
+        """
+        if not self._size:
+            return None
+        return self._slot(rng.randrange(self._size))
+
+    def _slot(self, position):
+        return self._slots.get(position, position)
+
+    def _position(self, ordinal):
+        return self._positions.get(ordinal, ordinal)
+
+    def _swap(self, first, second):
+        first_ordinal = self._slot(first)
+        second_ordinal = self._slot(second)
+        self._place(second_ordinal, first)
+        self._place(first_ordinal, second)
+
+    def _place(self, ordinal, position):
+        if ordinal == position:
+            self._slots.pop(position, None)
+            self._positions.pop(ordinal, None)
+        else:
+            self._slots[position] = ordinal
+            self._positions[ordinal] = position
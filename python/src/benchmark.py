@@ -0,0 +1,571 @@
+"""A benchmark of every command at several catalog sizes.
+
+Synthetic catalogs are generated for each size, and every command known to
+CommandParser is executed many times against a fresh VideoPlayer. For each
+command and size the benchmark reports latency percentiles, throughput and
+the peak memory allocated while the command runs:
+
+    python3 -m src.benchmark --sizes 1000,100000 --output results.json
+
+A moderation feed is also compared with the FLAG_VIDEO and ALLOW_VIDEO
+commands it stands for; --min-moderation-speedup fails the run when the feed
+is not that many times faster per record.
+
+Results are written as JSON. Pass an earlier results file as --baseline to
+fail the run (exit status 1) when a command got slower by more than
+--threshold.
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, Dict, List, NamedTuple, Optional, Sequence
+
+from .catalog_generator import CatalogSpec, write_catalog
+from .command_parser import CommandException, CommandParser
+from .output_sink import NullSink
+from .video_catalog import read_video_rows
+from .video_player import VideoPlayer
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+DEFAULT_SIZES = (1000, 10000, 100000)
+# How many playlists the playlist commands find when they start.
+PLAYLISTS = 100
+# How many videos every one of those playlists holds.
+PLAYLIST_VIDEOS = 20
+# How many videos the moderation feed flags and allows again.
+FEED_VIDEOS = 100
+
+
+class Context:
+    """A class used to hold what workloads need to build commands.
+
+    Attributes:
+        parser: The CommandParser the commands are run with.
+        rng: The random number generator workloads draw from.
+        video_ids: Every video_id of the catalog.
+        words: Words appearing in titles, to search for.
+        tags: The tags of the catalog, once per video carrying them.
+        playlists: The names of the playlists created during setup.
+        workdir: A directory for files commands read.
+        feed: The moderation feed written during setup, if any.
+    """
+
+    def __init__(self, parser, rng, rows, workdir):
+        self.parser = parser
+        self.rng = rng
+        self.video_ids = [video_id for _, video_id, _ in rows]
+        self.words = [title.split()[0].lower() for title, _, _ in rows
+                      if title]
+        self.tags = [tag for _, _, tags in rows for tag in tags]
+        self.playlists = []
+        self.workdir = workdir
+        self.feed = None
+        self._counter = 0
+
+    def run(self, *command: str):
+        """Runs a command that is not measured."""
+        self.parser.execute_command(list(command))
+
+    def video_id(self) -> str:
+        return self.rng.choice(self.video_ids)
+
+    def playlist(self) -> str:
+        return self.rng.choice(self.playlists)
+
+    def unique_name(self) -> str:
+        self._counter += 1
+        return f"bench_playlist_{self._counter}"
+
+
+class Workload(NamedTuple):
+    """A class used to describe how a command is benchmarked.
+
+    Attributes:
+        command: A function returning the command to measure. It is called
+            before every run, outside of the measurement, and can run
+            other commands to put the player in the right state.
+        setup: An optional function called once with the Context before
+            the command is run for the first time.
+    """
+    command: Callable[[Context], Sequence[str]]
+    setup: Optional[Callable[[Context], None]] = None
+
+
+def _create_playlists(context):
+    for number in range(PLAYLISTS):
+        name = f"playlist_{number}"
+        context.playlists.append(name)
+        context.run("CREATE_PLAYLIST", name)
+        for _ in range(PLAYLIST_VIDEOS):
+            context.run("ADD_TO_PLAYLIST", name, context.video_id())
+
+
+def _start_playing(context):
+    context.run("PLAY", context.video_id())
+
+
+def _write_feed(context):
+    path = os.path.join(context.workdir, "feed.txt")
+    with open(path, "w", encoding="utf-8") as feed:
+        for video_id in context.rng.sample(
+                context.video_ids, min(FEED_VIDEOS, len(context.video_ids))):
+            feed.write(f"{video_id} | FLAG | benchmark\n")
+            feed.write(f"{video_id} | ALLOW\n")
+    context.feed = path
+
+
+def _play_then(name):
+    def command(context):
+        _start_playing(context)
+        return [name]
+    return command
+
+
+def _pause_then_continue(context):
+    _start_playing(context)
+    context.run("PAUSE")
+    return ["CONTINUE"]
+
+
+def _add_then_remove(context):
+    playlist, video_id = context.playlist(), context.video_id()
+    context.run("ADD_TO_PLAYLIST", playlist, video_id)
+    return ["REMOVE_FROM_PLAYLIST", playlist, video_id]
+
+
+def _fill_then_clear(context):
+    playlist = context.playlist()
+    for _ in range(PLAYLIST_VIDEOS):
+        context.run("ADD_TO_PLAYLIST", playlist, context.video_id())
+    return ["CLEAR_PLAYLIST", playlist]
+
+
+def _create_then_delete(context):
+    playlist = context.unique_name()
+    context.run("CREATE_PLAYLIST", playlist)
+    return ["DELETE_PLAYLIST", playlist]
+
+
+def _allow_then_flag(context):
+    video_id = context.video_id()
+    context.run("ALLOW_VIDEO", video_id)
+    return ["FLAG_VIDEO", video_id, "benchmark"]
+
+
+def _flag_then_allow(context):
+    video_id = context.video_id()
+    context.run("FLAG_VIDEO", video_id)
+    return ["ALLOW_VIDEO", video_id]
+
+
+WORKLOADS: Dict[str, Workload] = {
+    "NUMBER_OF_VIDEOS": Workload(lambda context: ["NUMBER_OF_VIDEOS"]),
+    "SHOW_ALL_VIDEOS": Workload(lambda context: ["SHOW_ALL_VIDEOS"]),
+    "PLAY": Workload(lambda context: ["PLAY", context.video_id()]),
+    "PLAY_RANDOM": Workload(lambda context: ["PLAY_RANDOM"]),
+    "STOP": Workload(_play_then("STOP")),
+    "PAUSE": Workload(_play_then("PAUSE")),
+    "CONTINUE": Workload(_pause_then_continue),
+    "SHOW_PLAYING": Workload(lambda context: ["SHOW_PLAYING"],
+                             _start_playing),
+    "CREATE_PLAYLIST": Workload(
+        lambda context: ["CREATE_PLAYLIST", context.unique_name()]),
+    "ADD_TO_PLAYLIST": Workload(
+        lambda context: ["ADD_TO_PLAYLIST", context.playlist(),
+                         context.video_id()],
+        _create_playlists),
+    "REMOVE_FROM_PLAYLIST": Workload(_add_then_remove, _create_playlists),
+    "CLEAR_PLAYLIST": Workload(_fill_then_clear, _create_playlists),
+    "DELETE_PLAYLIST": Workload(_create_then_delete, _create_playlists),
+    "SHOW_PLAYLIST": Workload(
+        lambda context: ["SHOW_PLAYLIST", context.playlist()],
+        _create_playlists),
+    "SHOW_ALL_PLAYLISTS": Workload(lambda context: ["SHOW_ALL_PLAYLISTS"],
+                                   _create_playlists),
+    "SEARCH_VIDEOS": Workload(
+        lambda context: ["SEARCH_VIDEOS", context.rng.choice(context.words)]),
+    "SEARCH_VIDEOS_WITH_TAG": Workload(
+        lambda context: ["SEARCH_VIDEOS_WITH_TAG",
+                         context.rng.choice(context.tags)]),
+    "FLAG_VIDEO": Workload(_allow_then_flag),
+    "ALLOW_VIDEO": Workload(_flag_then_allow),
+    "APPLY_MODERATION_FEED": Workload(
+        lambda context: ["APPLY_MODERATION_FEED", context.feed], _write_feed),
+    "HELP": Workload(lambda context: ["HELP"]),
+}
+
+
+def workload_for(name: str) -> Optional[Workload]:
+    """Returns how to benchmark a command, or None if it is not known.
+
+    Commands registered without arguments are run as they are even if they
+    have no entry in WORKLOADS.
+    """
+    workload = WORKLOADS.get(name)
+    command = CommandParser.COMMANDS.get(name)
+    if workload is None and command is not None and command.arities is None:
+        workload = Workload(lambda context: [name])
+    return workload
+
+
+def percentile(sorted_values: Sequence[float], fraction: float) -> float:
+    """Returns the nearest-rank percentile of sorted values, e.g. 0.99."""
+    if not sorted_values:
+        return 0.0
+    rank = max(int(fraction * len(sorted_values) + 0.5), 1)
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def _new_context(catalog_path, rows, workdir, seed):
+    rng = random.Random(seed)
+    player = VideoPlayer(ask=lambda prompt: "", out=NullSink(), seed=seed,
+                         catalog_path=catalog_path)
+    return Context(CommandParser(player), rng, rows, workdir)
+
+
+def _execute(parser, command):
+    try:
+        parser.execute_command(command)
+    except CommandException:
+        pass
+
+
+def benchmark_command(name, catalog_path, rows, workdir, iterations=200,
+                      time_budget=2.0, warmup=3, memory_iterations=20,
+                      seed=0) -> dict:
+    """Benchmarks one command against one catalog.
+
+    Args:
+        name: The command name, e.g. "PLAY".
+        catalog_path: The catalog file the player loads.
+        rows: The (title, video_id, tags) rows of that catalog.
+        workdir: A directory for files the commands read.
+        iterations: The most times the command is measured.
+        time_budget: Stop measuring once the command took this many
+            seconds in total, after at least 5 runs.
+        warmup: How many runs come before measuring, e.g. to build the
+            indexes the command uses.
+        memory_iterations: How many runs peak memory is measured over.
+            They are separate from the latency runs since tracing
+            allocations slows everything down.
+        seed: The seed of the random choices.
+
+    Returns:
+        A dictionary of the results.
+    """
+    workload = workload_for(name)
+    context = _new_context(catalog_path, rows, workdir, seed)
+    if workload.setup is not None:
+        workload.setup(context)
+    for _ in range(warmup):
+        _execute(context.parser, workload.command(context))
+
+    latencies = []
+    spent = 0.0
+    while len(latencies) < iterations and (
+            spent < time_budget or len(latencies) < 5):
+        command = workload.command(context)
+        start = time.perf_counter()
+        _execute(context.parser, command)
+        latency = time.perf_counter() - start
+        latencies.append(latency)
+        spent += latency
+
+    # Like the timed runs, every command is built right before it runs,
+    # since it may depend on what the previous one left behind.
+    tracemalloc.start()
+    peak = 0
+    for _ in range(memory_iterations):
+        command = workload.command(context)
+        _reset_traced_peak()
+        _execute(context.parser, command)
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+    tracemalloc.stop()
+
+    latencies.sort()
+    return {
+        "catalog_size": len(rows),
+        "command": name,
+        "iterations": len(latencies),
+        "mean_us": spent / len(latencies) * 1e6,
+        "p50_us": percentile(latencies, 0.50) * 1e6,
+        "p90_us": percentile(latencies, 0.90) * 1e6,
+        "p99_us": percentile(latencies, 0.99) * 1e6,
+        "max_us": latencies[-1] * 1e6,
+        "throughput_per_s": len(latencies) / spent if spent else float("inf"),
+        "peak_alloc_bytes": peak,
+    }
+
+
+def benchmark_moderation(catalog_path, rows, workdir, seed=0) -> dict:
+    """Compares a moderation feed with the FLAG_VIDEO and ALLOW_VIDEO
+    commands doing the same.
+
+    Every video of the catalog is flagged and every other one allowed
+    again, once command by command and once as a single feed, each on a
+    fresh player.
+
+    Args:
+        catalog_path: The catalog file the players load.
+        rows: The (title, video_id, tags) rows of that catalog.
+        workdir: A directory to write the feed to.
+        seed: The seed of the players.
+
+    Returns:
+        A dictionary of the microseconds per record each way took and the
+        speedup of the feed.
+    """
+    video_ids = [video_id for _, video_id, _ in rows]
+    allowed = video_ids[::2]
+    commands = [["FLAG_VIDEO", video_id, "benchmark"]
+                for video_id in video_ids]
+    commands += [["ALLOW_VIDEO", video_id] for video_id in allowed]
+    path = os.path.join(workdir, "moderation_feed.txt")
+    with open(path, "w", encoding="utf-8") as feed:
+        for video_id in video_ids:
+            feed.write(f"{video_id} | FLAG | benchmark\n")
+        for video_id in allowed:
+            feed.write(f"{video_id} | ALLOW\n")
+
+    parser = _new_context(catalog_path, rows, workdir, seed).parser
+    start = time.perf_counter()
+    for command in commands:
+        _execute(parser, command)
+    per_command = time.perf_counter() - start
+
+    parser = _new_context(catalog_path, rows, workdir, seed).parser
+    start = time.perf_counter()
+    _execute(parser, ["APPLY_MODERATION_FEED", path])
+    feed = time.perf_counter() - start
+
+    records = max(len(commands), 1)
+    return {
+        "catalog_size": len(rows),
+        "records": len(commands),
+        "per_command_us": per_command / records * 1e6,
+        "feed_us": feed / records * 1e6,
+        "speedup": per_command / feed if feed else float("inf"),
+    }
+
+
+def _reset_traced_peak():
+    """Leaves what building a command allocated out of the traced peak."""
+    try:
+        tracemalloc.reset_peak()
+    except AttributeError:  # Python < 3.9
+        pass
+
+
+def _peak_rss_bytes():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes.
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def run_benchmarks(sizes=DEFAULT_SIZES, commands=None, catalogs=None,
+                   log=None, **options) -> dict:
+    """Benchmarks commands against catalogs of several sizes.
+
+    Args:
+        sizes: The catalog sizes to generate.
+        commands: The command names to benchmark, all registered commands
+            by default.
+        catalogs: Existing catalog files to use instead of generated ones.
+        log: An optional function called with a line of progress.
+        options: Passed on to benchmark_command.
+
+    Returns:
+        The results, ready to be saved as JSON.
+    """
+    if commands is None:
+        commands = list(CommandParser.COMMANDS)
+    missing = [name for name in commands if workload_for(name) is None]
+    if missing:
+        raise ValueError(f"No benchmark workload for {', '.join(missing)}")
+
+    results = []
+    loads = []
+    moderation = []
+    with tempfile.TemporaryDirectory() as workdir:
+        if catalogs is None:
+            catalogs = []
+            for size in sizes:
+                path = os.path.join(workdir, f"videos_{size}.txt")
+                write_catalog(path, CatalogSpec(videos=size))
+                catalogs.append(path)
+
+        for catalog_path in catalogs:
+            rows = list(read_video_rows(catalog_path))
+            start = time.perf_counter()
+            tracemalloc.start()
+            player = VideoPlayer(out=NullSink(), catalog_path=catalog_path)
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            loads.append({
+                "catalog_size": len(rows),
+                "load_s": time.perf_counter() - start,
+                "peak_alloc_bytes": peak,
+            })
+            for name in commands:
+                result = benchmark_command(
+                    name, catalog_path, rows, workdir, **options)
+                results.append(result)
+                if log is not None:
+                    log(format_result(result))
+            if "APPLY_MODERATION_FEED" in commands:
+                moderation.append(benchmark_moderation(
+                    catalog_path, rows, workdir, options.get("seed", 0)))
+            del player
+
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "peak_rss_bytes": _peak_rss_bytes(),
+        "loads": loads,
+        "results": results,
+        "moderation": moderation,
+    }
+
+
+def format_result(result) -> str:
+    """Returns one line of the results table."""
+    return (f"{result['catalog_size']:>10} {result['command']:<24}"
+            f"{result['p50_us']:>11.1f}{result['p90_us']:>11.1f}"
+            f"{result['p99_us']:>11.1f}{result['throughput_per_s']:>12.0f}"
+            f"{result['peak_alloc_bytes'] / 1024:>11.1f}")
+
+
+TABLE_HEADER = (f"{'videos':>10} {'command':<24}{'p50 us':>11}{'p90 us':>11}"
+                f"{'p99 us':>11}{'ops/s':>12}{'peak KiB':>11}")
+
+
+def format_moderation(result) -> str:
+    """Returns a line comparing a moderation feed with single commands."""
+    return (f"{result['catalog_size']:>10} moderation feed: "
+            f"{result['feed_us']:.1f} us per record against "
+            f"{result['per_command_us']:.1f} us per FLAG_VIDEO or "
+            f"ALLOW_VIDEO ({result['speedup']:.1f}x)")
+
+
+def find_regressions(results, baseline, threshold=0.25,
+                     metric="p50_us") -> List[str]:
+    """Compares results with an earlier run.
+
+    Args:
+        results: The results of run_benchmarks.
+        baseline: The results of an earlier run.
+        threshold: How much slower than the baseline a command may get,
+            0.25 for 25%.
+        metric: The latency to compare, e.g. "p90_us".
+
+    Returns:
+        A description of every command that got too slow. Commands or
+        sizes missing from either run are not compared.
+    """
+    before = {(result["catalog_size"], result["command"]): result[metric]
+              for result in baseline["results"]}
+    regressions = []
+    for result in results["results"]:
+        key = (result["catalog_size"], result["command"])
+        if key not in before or not before[key]:
+            continue
+        change = result[metric] / before[key] - 1
+        if change > threshold:
+            regressions.append(
+                f"{result['command']} on {result['catalog_size']} videos: "
+                f"{metric} {before[key]:.1f} -> {result[metric]:.1f} "
+                f"(+{change:.0%})")
+    return regressions
+
+
+def main(argv=None):
+    """Runs the benchmark from the command line."""
+    arguments = argparse.ArgumentParser(
+        description="Benchmarks every command at several catalog sizes.")
+    arguments.add_argument(
+        "--sizes", default=",".join(map(str, DEFAULT_SIZES)),
+        help="comma separated catalog sizes to generate "
+             "(default %(default)s)")
+    arguments.add_argument(
+        "--catalog", action="append", metavar="FILE",
+        help="benchmark an existing catalog file instead, can be repeated")
+    arguments.add_argument(
+        "--commands", help="comma separated commands to run, all by default")
+    arguments.add_argument("--iterations", type=int, default=200,
+                           help="most runs per command (default %(default)s)")
+    arguments.add_argument("--time-budget", type=float, default=2.0,
+                           help="seconds measured per command "
+                                "(default %(default)s)")
+    arguments.add_argument("--seed", type=int, default=0,
+                           help="random seed (default %(default)s)")
+    arguments.add_argument("--output", metavar="FILE",
+                           help="write the results as JSON to FILE")
+    arguments.add_argument("--baseline", metavar="FILE",
+                           help="fail if slower than the results in FILE")
+    arguments.add_argument("--threshold", type=float, default=0.25,
+                           help="allowed slowdown against the baseline "
+                                "(default %(default)s)")
+    arguments.add_argument("--min-moderation-speedup", type=float,
+                           metavar="FACTOR",
+                           help="fail if a moderation feed is less than "
+                                "FACTOR times faster than single commands")
+    arguments.add_argument("--metric", default="p50_us",
+                           choices=("mean_us", "p50_us", "p90_us", "p99_us"),
+                           help="latency compared with the baseline "
+                                "(default %(default)s)")
+    options = arguments.parse_args(argv)
+
+    print(TABLE_HEADER)
+    results = run_benchmarks(
+        sizes=[int(size) for size in options.sizes.split(",")],
+        commands=options.commands.upper().split(",")
+        if options.commands else None,
+        catalogs=options.catalog,
+        log=print,
+        iterations=options.iterations,
+        time_budget=options.time_budget,
+        seed=options.seed,
+    )
+    for moderation in results["moderation"]:
+        print(format_moderation(moderation))
+    if options.output:
+        with open(options.output, "w") as output:
+            json.dump(results, output, indent=2)
+
+    if options.min_moderation_speedup is not None:
+        slow = [moderation for moderation in results["moderation"]
+                if moderation["speedup"] < options.min_moderation_speedup]
+        for moderation in slow:
+            print(f"TOO SLOW: {format_moderation(moderation).strip()}",
+                  file=sys.stderr)
+        if slow:
+            return 1
+
+    if options.baseline:
+        with open(options.baseline) as baseline_file:
+            baseline = json.load(baseline_file)
+        regressions = find_regressions(
+            results, baseline, options.threshold, options.metric)
+        for regression in regressions:
+            print(f"REGRESSION: {regression}", file=sys.stderr)
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
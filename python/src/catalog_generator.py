@@ -0,0 +1,197 @@
+"""A generator of synthetic videos.txt catalogs.
+
+The bundled videos.txt only has five videos, which hides how any of the
+commands scale. This module writes catalogs of any size in the same
+format, e.g. a million videos:
+
+    python3 -m src.catalog_generator videos_1m.txt --videos 1000000
+
+Titles are built from a generated vocabulary, their length in words
+follows a log-normal distribution, and tags are drawn from a vocabulary
+whose popularity follows Zipf's law, so a few tags are on most videos and
+most tags are rare. The same seed always writes the same catalog.
+"""
+
+import argparse
+import bisect
+import itertools
+import math
+import random
+import sys
+from typing import Iterator, List, NamedTuple, Sequence, Tuple
+
+_SYLLABLES = (
+    "ba", "ca", "da", "fe", "ga", "hi", "jo", "ka", "li", "mo", "nu", "pa",
+    "qui", "ra", "si", "to", "vu", "wa", "xe", "yo", "zu", "an", "el", "in",
+    "or", "ut", "ber", "con", "dor", "fin", "gal", "hop", "lin", "mar", "nor",
+    "per", "ros", "sun", "tar", "vin",
+)
+# Words that are not ASCII, mixing accents, other scripts, characters
+# outside the Basic Multilingual Plane and combining characters.
+_UNICODE_WORDS = (
+    "Café", "Ñandú", "Größe", "Crème", "São", "Łódź", "Ørsted", "İstanbul",
+    "кошки", "собака", "γάτα", "σκύλος", "猫", "犬", "動画", "音楽", "고양이",
+    "강아지", "قطة", "כלב", "बिल्ली", "แมว", "😀", "🐱", "🎵", "été",
+)
+# Words are built from up to this many syllables.
+_MAX_SYLLABLES = 4
+
+
+class CatalogSpec(NamedTuple):
+    """A class used to represent the shape of a synthetic catalog.
+
+    Attributes:
+        videos: The number of videos to write.
+        words: The size of the vocabulary titles are built from.
+        title_words: The median number of words in a title.
+        title_spread: The sigma of the log-normal distribution of title
+            lengths; 0 makes every title title_words long.
+        max_title_words: The longest a title can be, in words.
+        tags: The size of the tag vocabulary.
+        max_tags: The most tags a video can have. Every video has between
+            0 and max_tags tags, uniformly.
+        zipf: The exponent of the tag popularity distribution. The tag
+            ranked r is picked in proportion to 1 / r ** zipf, 0 makes every
+            tag equally popular.
+        unicode: The fraction of title words taken from a list of non-ASCII
+            words.
+        seed: The seed of the random number generator.
+    """
+    videos: int = 1000
+    words: int = 5000
+    title_words: int = 4
+    title_spread: float = 0.5
+    max_title_words: int = 20
+    tags: int = 1000
+    max_tags: int = 4
+    zipf: float = 1.0
+    unicode: float = 0.0
+    seed: int = 0
+
+
+def _vocabulary(size: int, rng: random.Random) -> List[str]:
+    """Returns `size` distinct capitalised words made of syllables."""
+    words = set()
+    # Grow the longest word allowed until there are enough combinations.
+    length = 1
+    while len(_SYLLABLES) ** length < size * 2 and length < _MAX_SYLLABLES:
+        length += 1
+    if len(_SYLLABLES) ** length < size:
+        raise ValueError(
+            f"Cannot generate {size} distinct words, "
+            f"at most {len(_SYLLABLES) ** length}")
+    while len(words) < size:
+        syllables = rng.randint(1, length)
+        words.add("".join(rng.choice(_SYLLABLES)
+                          for _ in range(syllables)).capitalize())
+    return sorted(words)
+
+
+def _zipf_cum_weights(size: int, exponent: float) -> List[float]:
+    """Returns the cumulative weights of ranks 1..size under Zipf's law."""
+    return list(itertools.accumulate(
+        1 / rank ** exponent for rank in range(1, size + 1)))
+
+
+def generate_rows(spec: CatalogSpec = CatalogSpec()) \
+        -> Iterator[Tuple[str, str, Sequence[str]]]:
+    """Yields a (title, video_id, tags) tuple for every video of a synthetic
+    catalog, without holding the catalog in memory.
+
+    Args:
+        spec: The CatalogSpec describing the catalog.
+    """
+    if spec.max_tags > spec.tags:
+        raise ValueError("max_tags cannot be larger than the tag vocabulary")
+    rng = random.Random(spec.seed)
+    words = _vocabulary(spec.words, rng)
+    tags = [f"#{word.lower()}" for word in _vocabulary(spec.tags, rng)]
+    # Popularity rank should not follow alphabetical order.
+    rng.shuffle(tags)
+    cum_weights = _zipf_cum_weights(spec.tags, spec.zipf)
+    total = cum_weights[-1] if cum_weights else 0
+    mu = math.log(max(spec.title_words, 1))
+    id_width = len(str(max(spec.videos - 1, 0)))
+
+    for number in range(spec.videos):
+        length = round(rng.lognormvariate(mu, spec.title_spread))
+        length = min(max(length, 1), spec.max_title_words)
+        title = " ".join(
+            rng.choice(_UNICODE_WORDS) if rng.random() < spec.unicode
+            else rng.choice(words)
+            for _ in range(length))
+
+        video_tags = []
+        for _ in range(rng.randint(0, spec.max_tags)):
+            # Draw until the tag is new to this video; with Zipfian
+            # popularity the top tags would otherwise repeat.
+            while True:
+                rank = bisect.bisect_right(cum_weights, rng.random() * total)
+                tag = tags[min(rank, spec.tags - 1)]
+                if tag not in video_tags:
+                    break
+            video_tags.append(tag)
+
+        yield title, f"video_{number:0{id_width}d}_id", video_tags
+
+
+def write_catalog(destination, spec: CatalogSpec = CatalogSpec()) -> int:
+    """Writes a synthetic catalog in videos.txt format.
+
+    Args:
+        destination: The path of the file to write.
+        spec: The CatalogSpec describing the catalog.
+
+    Returns:
+        The number of videos written.
+    """
+    count = 0
+    with open(destination, "w", encoding="utf-8") as catalog_file:
+        for title, video_id, tags in generate_rows(spec):
+            catalog_file.write(f"{title} | {video_id} | {','.join(tags)}\n")
+            count += 1
+    return count
+
+
+def main(argv=None):
+    """Writes a synthetic catalog file."""
+    defaults = CatalogSpec()
+    arguments = argparse.ArgumentParser(
+        description="Writes a synthetic videos.txt catalog.")
+    arguments.add_argument("destination", help="the file to write")
+    arguments.add_argument("--videos", type=int, default=defaults.videos,
+                           help="number of videos (default %(default)s)")
+    arguments.add_argument("--words", type=int, default=defaults.words,
+                           help="title vocabulary size (default %(default)s)")
+    arguments.add_argument("--title-words", type=int,
+                           default=defaults.title_words,
+                           help="median title length in words "
+                                "(default %(default)s)")
+    arguments.add_argument("--title-spread", type=float,
+                           default=defaults.title_spread,
+                           help="sigma of the log-normal title length "
+                                "(default %(default)s)")
+    arguments.add_argument("--max-title-words", type=int,
+                           default=defaults.max_title_words,
+                           help="longest title in words (default %(default)s)")
+    arguments.add_argument("--tags", type=int, default=defaults.tags,
+                           help="tag vocabulary size (default %(default)s)")
+    arguments.add_argument("--max-tags", type=int, default=defaults.max_tags,
+                           help="most tags per video (default %(default)s)")
+    arguments.add_argument("--zipf", type=float, default=defaults.zipf,
+                           help="Zipf exponent of tag popularity "
+                                "(default %(default)s)")
+    arguments.add_argument("--unicode", type=float, default=defaults.unicode,
+                           help="fraction of non-ASCII title words "
+                                "(default %(default)s)")
+    arguments.add_argument("--seed", type=int, default=defaults.seed,
+                           help="random seed (default %(default)s)")
+    options = vars(arguments.parse_args(argv))
+    destination = options.pop("destination")
+    count = write_catalog(destination, CatalogSpec(**options))
+    print(f"Wrote {count} videos to {destination}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
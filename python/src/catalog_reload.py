@@ -0,0 +1,232 @@
+"""Incremental reloading of videos.txt files."""
+
+import hashlib
+import os
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from .video import TagPool, Video
+
+
+class CatalogDiff(NamedTuple):
+    """A class used to represent the changes between two versions of a
+    catalog.
+
+    Attributes:
+        added: The videos that were not in the catalog.
+        removed: The videos that are no longer in it.
+        updated: (old, new) pairs of videos whose title or tags changed.
+    """
+    added: List[Video]
+    removed: List[Video]
+    updated: List[Tuple[Video, Video]]
+
+    def __bool__(self):
+        return bool(self.added or self.removed or self.updated)
+
+    @classmethod
+    def of_changes(cls, version, upserts, removals) -> "CatalogDiff":
+        """Describes what applying changes to a catalog version does.
+
+        Args:
+            version: The CatalogVersion the changes are applied to.
+            upserts: The videos added or replacing the video with the same
+                video_id.
+            removals: The video_ids removed, all present in the version.
+        """
+        videos = version.videos
+        added = []
+        updated = []
+        for video in upserts:
+            old = videos.get(video.video_id)
+            if old is None:
+                added.append(video)
+            else:
+                updated.append((old, video))
+        return cls(added, [videos[video_id] for video_id in removals], updated)
+
+    @classmethod
+    def between(cls, old, new) -> "CatalogDiff":
+        """Compares two versions of a catalog, in O(number of videos).
+
+        Versions share the Video objects they did not change, so videos
+        are compared by identity.
+        """
+        old_videos = old.videos
+        new_videos = new.videos
+        added = []
+        updated = []
+        for video_id, video in new_videos.items():
+            before = old_videos.get(video_id)
+            if before is None:
+                added.append(video)
+            elif before is not video:
+                updated.append((before, video))
+        removed = [video for video_id, video in old_videos.items()
+                   if video_id not in new_videos]
+        return cls(added, removed, updated)
+
+
+def _split_lines(text: str) -> List[str]:
+    """Returns the non-blank lines of text, split like a file opened in
+    text mode would be."""
+    lines = text.replace("\r\n", "\n").replace("\r", "\n").split("\n")
+    return [line for line in lines if line.strip()]
+
+
+class CatalogFile:
+    """A class used to notice and read the changes of a videos.txt file.
+
+    read_changes costs one stat call while the file keeps its size and
+    modification time. Once they change, the file is compared with what
+    was read last time and only new lines are parsed:
+
+    - If the file grew and still starts with the bytes it had, which a
+      hash of them tells, only the lines appended to it are parsed.
+    - Otherwise every line is looked up among the lines that defined a
+      video last time, and only the lines that are not found are parsed.
+
+    The first change is compared with the catalog itself, so it parses the
+    whole file once. Like read_video_rows, the last line defining a
+    video_id wins.
+    """
+
+    def __init__(self, path, loaded_mtime_ns: Optional[int] = None):
+        """CatalogFile constructor.
+
+        Args:
+            path: The videos.txt file.
+            loaded_mtime_ns: The modification time of the file when the
+                catalog was loaded from it. The file counts as unchanged
+                until its modification time differs.
+        """
+        self._path = path
+        self._loaded_mtime_ns = loaded_mtime_ns
+        self.mtime_ns = loaded_mtime_ns
+        # What the last read saw: the size and mtime of the file, a hash
+        # of its bytes, whether they ended a line, and the line defining
+        # every video_id. Empty until the first read.
+        self._signature = None
+        self._hash = None
+        self._ends_line = True
+        self._definitions: Dict[str, str] = {}
+        self._tag_pool = TagPool()
+
+    def read_changes(self, version):
+        """Reads what changed in the file since the last call.
+
+        Args:
+            version: The CatalogVersion the changes are for.
+
+        Returns:
+            None if the file has not changed, else an (upserts, removals)
+            tuple: the videos to add or replace and the video_ids to
+            remove to bring the version in line with the file.
+
+        Raises:
+            OSError: If the file cannot be read.
+            ValueError: If a line of the file is malformed. Nothing is
+                remembered from the read, so the next call tries again.
+        """
+        with open(self._path, "rb") as catalog_file:
+            stat = os.fstat(catalog_file.fileno())
+            signature = (stat.st_mtime_ns, stat.st_size)
+            if signature == self._signature or (
+                    self._signature is None
+                    and stat.st_mtime_ns == self._loaded_mtime_ns):
+                return None
+            changes = self._read_appended(catalog_file, stat.st_size, version)
+            if changes is None:
+                catalog_file.seek(0)
+                data = catalog_file.read()
+                changes = self._read_all(data, version)
+                self._hash = hashlib.sha1(data)
+                self._ends_line = not data or data.endswith((b"\n", b"\r"))
+        self._signature = signature
+        self.mtime_ns = stat.st_mtime_ns
+        return changes
+
+    def _read_appended(self, catalog_file, size, version):
+        """Parses only the end of a file that was appended to, or returns
+        None if it was changed in any other way."""
+        if self._signature is None or size <= self._signature[1]:
+            return None
+        head = hashlib.sha1(catalog_file.read(self._signature[1]))
+        if head.digest() != self._hash.digest():
+            return None
+        tail = catalog_file.read()
+        # An old last line without its line break may have been extended.
+        if not self._ends_line and not tail.startswith((b"\n", b"\r")):
+            return None
+        lines = _split_lines(self._decode(tail))
+        rows = self._parse(lines)
+        definitions = dict(self._definitions)
+        latest = {}
+        for line, row in zip(lines, rows):
+            definitions[row[1]] = line
+            latest[row[1]] = row
+        upserts = [
+            video for video in map(self._video, latest.values())
+            if not self._same(version.videos.get(video.video_id), video)
+        ]
+        head.update(tail)
+        self._hash = head
+        self._ends_line = tail.endswith((b"\n", b"\r"))
+        self._definitions = definitions
+        return upserts, []
+
+    def _read_all(self, data, version):
+        """Compares the whole file with the last read and the version."""
+        lines = _split_lines(self._decode(data))
+        known = {line: video_id
+                 for video_id, line in self._definitions.items()}
+        unparsed = [line for line in lines if line not in known]
+        rows = dict(zip(unparsed, self._parse(unparsed)))
+        definitions = {}
+        for line in lines:
+            video_id = known.get(line)
+            if video_id is None:
+                video_id = rows[line][1]
+            definitions[video_id] = line
+
+        videos = version.videos
+        upserts = []
+        for video_id, line in definitions.items():
+            current = videos.get(video_id)
+            if current is not None and \
+                    self._definitions.get(video_id) == line:
+                continue
+            row = rows.get(line)
+            if row is None:
+                row, = self._parse([line])
+            video = self._video(row)
+            if not self._same(current, video):
+                upserts.append(video)
+        removals = [video_id for video_id in videos
+                    if video_id not in definitions]
+        self._definitions = definitions
+        return upserts, removals
+
+    def _parse(self, lines):
+        # Imported here, video_catalog imports this module.
+        from .video_catalog import parse_video_rows
+        try:
+            rows = list(parse_video_rows(lines))
+        except ValueError as e:
+            raise ValueError(f"{self._path} has a malformed line") from e
+        if len(rows) != len(lines):
+            raise ValueError(f"{self._path} has a malformed line")
+        return rows
+
+    def _video(self, row) -> Video:
+        title, video_id, tags = row
+        return Video(title, video_id, self._tag_pool.get(tags))
+
+    @staticmethod
+    def _same(video, other) -> bool:
+        return video is not None and video.title == other.title and \
+            tuple(video.tags) == tuple(other.tags)
+
+    @staticmethod
+    def _decode(data: bytes) -> str:
+        # The encoding read_video_rows opens the file with.
+        return data.decode("utf-8")
@@ -0,0 +1,217 @@
+"""A compiled, memory-mapped video catalog snapshot.
+
+The snapshot is built once from videos.txt and can then be opened without
+parsing anything. The file layout is:
+
+    header     magic, version, number of videos
+    records    one fixed-size record per video, in videos.txt order, holding
+               the offset and length of its title, id and tags in the pool
+    id index   record numbers sorted by the UTF-8 bytes of the video id
+    pool       every string of the catalog, UTF-8 encoded, back to back
+
+Tags are stored in the pool joined by commas, the same way videos.txt
+stores them.
+"""
+
+import mmap
+import os
+import struct
+import sys
+from collections.abc import Mapping
+from typing import Iterable, Sequence, Tuple
+
+from .video import TagPool, Video
+
+MAGIC = b"YTCS"
+VERSION = 1
+
+_HEADER = struct.Struct("<4sII")
+# title offset, id offset, tags offset, title length, id length, tags length
+_RECORD = struct.Struct("<QQQIII")
+_ORDINAL = struct.Struct("<I")
+
+
+class SnapshotError(Exception):
+    """A class used to represent a broken or incompatible snapshot file."""
+    pass
+
+
+def build_snapshot(rows: Iterable[Tuple[str, str, Sequence[str]]],
+                   destination):
+    """Writes a snapshot file from (title, video_id, tags) rows.
+
+    Like loading videos.txt into a dictionary, the last row of a video_id
+    wins and the video keeps the position of its first row.
+
+    Args:
+        rows: The videos to store, in catalog order.
+        destination: The path of the snapshot file to write.
+
+    Returns:
+        The number of videos written.
+    """
+    pool = bytearray()
+    records = []
+    ids = []
+    latest = {}
+    for row in rows:
+        latest[row[1]] = row
+    for title, video_id, tags in latest.values():
+        fields = []
+        for text in (title, video_id, ",".join(tags)):
+            data = text.encode("utf-8")
+            fields.append((len(pool), len(data)))
+            pool += data
+        (title_off, title_len), (id_off, id_len), (tags_off, tags_len) = fields
+        records.append(_RECORD.pack(
+            title_off, id_off, tags_off, title_len, id_len, tags_len))
+        ids.append(bytes(pool[id_off:id_off + id_len]))
+
+    id_order = sorted(range(len(ids)), key=ids.__getitem__)
+
+    with open(destination, "wb") as snapshot_file:
+        snapshot_file.write(_HEADER.pack(MAGIC, VERSION, len(records)))
+        snapshot_file.write(b"".join(records))
+        snapshot_file.write(b"".join(_ORDINAL.pack(i) for i in id_order))
+        snapshot_file.write(pool)
+    return len(records)
+
+
+class SnapshotCatalog(Mapping):
+    """A read-only mapping of video_id to Video backed by a snapshot file.
+
+    Opening a snapshot only maps the file into memory. A Video object is
+    created the first time it is looked up and is then reused, so the same
+    video_id always returns the same object.
+    """
+
+    def __init__(self, path):
+        """SnapshotCatalog constructor. Maps the file and checks that its
+        header and sections fit in it.
+
+        Args:
+            path: The snapshot file.
+
+        Raises:
+            SnapshotError: If the file is not a snapshot this version can
+                read, or is truncated. Records pointing outside the string
+                pool are only noticed when they are read.
+        """
+        with open(path, "rb") as snapshot_file:
+            if os.fstat(snapshot_file.fileno()).st_size < _HEADER.size:
+                raise SnapshotError(
+                    f"{path} is not a video catalog snapshot")
+            self._mmap = mmap.mmap(
+                snapshot_file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, count = _HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC or version != VERSION:
+            self._mmap.close()
+            raise SnapshotError(
+                f"{path} is not a version {VERSION} video catalog snapshot")
+
+        self._count = count
+        self._records_offset = _HEADER.size
+        self._index_offset = self._records_offset + count * _RECORD.size
+        self._pool_offset = self._index_offset + count * _ORDINAL.size
+        if self._pool_offset > len(self._mmap):
+            self._mmap.close()
+            raise SnapshotError(
+                f"{path} is truncated: its header counts {count} videos")
+        self._pool_size = len(self._mmap) - self._pool_offset
+        self._path = path
+        self._videos = {}
+        self._tag_pool = TagPool()
+
+    def __len__(self):
+        return self._count
+
+    def __iter__(self):
+        for ordinal in range(self._count):
+            yield self._video_id_at(ordinal)
+
+    def __getitem__(self, video_id):
+        ordinal = self.ordinal(video_id)
+        if ordinal is None:
+            raise KeyError(video_id)
+        return self.video_at(ordinal)
+
+    def __contains__(self, video_id):
+        return self.ordinal(video_id) is not None
+
+    def ordinal(self, video_id):
+        """Returns the catalog position of a video_id, or None if it does
+        not exist. This is a binary search over the id index."""
+        key = video_id.encode("utf-8")
+        low, high = 0, self._count
+        while low < high:
+            middle = (low + high) // 2
+            ordinal = self._ordinal_by_id(middle)
+            current = self._id_bytes_at(ordinal)
+            if current < key:
+                low = middle + 1
+            elif current > key:
+                high = middle
+            else:
+                return ordinal
+        return None
+
+    def video_at(self, ordinal):
+        """Returns the Video stored at the given catalog position."""
+        video = self._videos.get(ordinal)
+        if video is None:
+            title_off, id_off, tags_off, title_len, id_len, tags_len = \
+                _RECORD.unpack_from(
+                    self._mmap, self._records_offset + ordinal * _RECORD.size)
+            tags = self._text(tags_off, tags_len)
+            video = Video(
+                self._text(title_off, title_len),
+                self._text(id_off, id_len),
+                self._tag_pool.get(tags.split(",") if tags else ()),
+            )
+            self._videos[ordinal] = video
+        return video
+
+    def close(self):
+        """Unmaps the snapshot file. Videos already returned stay valid."""
+        self._mmap.close()
+
+    def _ordinal_by_id(self, position):
+        ordinal = _ORDINAL.unpack_from(
+            self._mmap, self._index_offset + position * _ORDINAL.size)[0]
+        if ordinal >= self._count:
+            raise SnapshotError(f"{self._path} has a broken id index")
+        return ordinal
+
+    def _id_bytes_at(self, ordinal):
+        _, id_off, _, _, id_len, _ = _RECORD.unpack_from(
+            self._mmap, self._records_offset + ordinal * _RECORD.size)
+        return self._pool_bytes(id_off, id_len)
+
+    def _video_id_at(self, ordinal):
+        return self._id_bytes_at(ordinal).decode("utf-8")
+
+    def _text(self, offset, length):
+        return self._pool_bytes(offset, length).decode("utf-8")
+
+    def _pool_bytes(self, offset, length):
+        if offset + length > self._pool_size:
+            raise SnapshotError(f"{self._path} is truncated")
+        start = self._pool_offset + offset
+        return self._mmap[start:start + length]
+
+
+def main(argv):
+    """Compiles a videos.txt file into a snapshot file."""
+    from .video_catalog import read_video_rows
+
+    if len(argv) != 2:
+        print("Usage: python3 -m src.catalog_snapshot <videos.txt> <snapshot>")
+        return 1
+    source, destination = argv
+    count = build_snapshot(read_video_rows(source), destination)
+    print(f"Wrote {count} videos to {destination}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,402 @@
+"""A columnar, struct-of-arrays video catalog.
+
+Instead of one object per video, the catalog is a handful of parallel
+arrays over contiguous UTF-8 buffers:
+
+    title offsets   where every title starts in the title buffer
+    lower offsets   the same for the lowercased titles searches scan
+    id offsets      where every video id starts in the id buffer
+    id order        ordinals sorted by the UTF-8 bytes of their video id
+    tag offsets     the range of tag ids of every video in the tag array
+    tag ids         the int32 tag ids of every video, back to back
+    name offsets    where every tag name starts in the tag name buffer
+    buffers         the titles, lowercased titles, ids and tag names
+
+The same layout is used in memory and on disk, so a saved catalog is
+opened by memory-mapping the file and pointing the arrays into it. Video
+objects are only views created when a video is looked up.
+
+Searches and tag filters scan the buffers directly: title searches use
+bytes.find over the lowercased titles, and tag filters either NumPy, when
+it is installed, or a bytes.find over the tag array.
+"""
+
+import bisect
+import collections
+import mmap
+import struct
+import sys
+from array import array
+from collections.abc import ItemsView, Mapping, ValuesView
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+from .video import TagPool, Video
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+MAGIC = b"YTCC"
+VERSION = 1
+
+# magic, version, byte order, number of videos, number of tags,
+# number of tag ids
+_HEADER = struct.Struct("<4sHHIII")
+_BYTE_ORDER = 1 if sys.byteorder == "little" else 2
+# Arrays are written in the machine's byte order, aligned to 8 bytes.
+_ALIGNMENT = 8
+
+
+class ColumnarError(Exception):
+    """A class used to represent a broken or incompatible columnar file."""
+    pass
+
+
+def _offsets(chunks: Iterable[bytes]) -> Tuple[array, bytes]:
+    """Returns the start offsets of chunks (plus the end of the last one)
+    and the chunks joined."""
+    offsets = array("q", [0])
+    buffer = bytearray()
+    for chunk in chunks:
+        buffer += chunk
+        offsets.append(len(buffer))
+    return offsets, bytes(buffer)
+
+
+def encode_columns(rows: Iterable[Tuple[str, str, Sequence[str]]]) -> bytes:
+    """Encodes (title, video_id, tags) rows in the columnar layout.
+
+    Like loading videos.txt into a dictionary, the last row of a video_id
+    wins and the video keeps the position of its first row.
+
+    Args:
+        rows: The videos, in catalog order.
+    """
+    latest = {}
+    for row in rows:
+        latest[row[1]] = row
+    titles, ids, tag_offsets, tag_ids = [], [], array("q", [0]), array("i")
+    tag_numbers: Dict[str, int] = {}
+    for title, video_id, tags in latest.values():
+        titles.append(title)
+        ids.append(video_id.encode("utf-8"))
+        for tag in tags:
+            tag_ids.append(tag_numbers.setdefault(tag, len(tag_numbers)))
+        tag_offsets.append(len(tag_ids))
+
+    title_offsets, title_buffer = _offsets(
+        title.encode("utf-8") for title in titles)
+    lower_offsets, lower_buffer = _offsets(
+        title.lower().encode("utf-8") for title in titles)
+    id_offsets, id_buffer = _offsets(ids)
+    id_order = array("q", sorted(range(len(ids)), key=ids.__getitem__))
+    name_offsets, name_buffer = _offsets(
+        tag.encode("utf-8") for tag in tag_numbers)
+
+    sections = [
+        title_offsets, lower_offsets, id_offsets, id_order, tag_offsets,
+        name_offsets, tag_ids, title_buffer, lower_buffer, id_buffer,
+        name_buffer,
+    ]
+    output = bytearray(_HEADER.pack(
+        MAGIC, VERSION, _BYTE_ORDER, len(ids), len(tag_numbers),
+        len(tag_ids)))
+    for section in sections:
+        output += bytes(-len(output) % _ALIGNMENT)
+        output += section.tobytes() if isinstance(section, array) else section
+    return bytes(output)
+
+
+class ColumnarCatalog(Mapping):
+    """A read-only mapping of video_id to Video stored as parallel arrays.
+
+    Looking a video up creates a new Video from the arrays every time;
+    nothing but the buffers themselves is kept per video. Besides the
+    mapping interface, the catalog answers the queries of NgramIndex and
+    TagIndex by scanning its buffers, so no index has to be built over it.
+    """
+
+    def __init__(self, buffer):
+        """ColumnarCatalog constructor.
+
+        Args:
+            buffer: The encoded catalog, as returned by encode_columns or
+                memory-mapped from a saved file.
+        """
+        self._buffer = buffer
+        try:
+            magic, version, byte_order, count, tag_count, tag_entries = \
+                _HEADER.unpack_from(buffer, 0)
+        except struct.error:
+            raise ColumnarError("Not a columnar video catalog")
+        if magic != MAGIC or version != VERSION:
+            raise ColumnarError(
+                f"Not a version {VERSION} columnar video catalog")
+        if byte_order != _BYTE_ORDER:
+            raise ColumnarError(
+                "The columnar catalog was written on a machine with a "
+                "different byte order")
+
+        view = memoryview(buffer)
+        position = _HEADER.size
+
+        def section(length, typecode=None):
+            nonlocal position
+            position += -position % _ALIGNMENT
+            size = length * (struct.calcsize(typecode) if typecode else 1)
+            if position + size > len(view):
+                raise ColumnarError("The columnar video catalog is truncated")
+            data = view[position:position + size]
+            position += size
+            return data.cast(typecode) if typecode else data
+
+        self._count = count
+        self._title_offsets = section(count + 1, "q")
+        self._lower_offsets = section(count + 1, "q")
+        self._id_offsets = section(count + 1, "q")
+        self._id_order = section(count, "q")
+        self._tag_offsets = section(count + 1, "q")
+        name_offsets = section(tag_count + 1, "q")
+        # Scans call find on the buffer itself, which both bytes and mmap
+        # support, so they need to know where their section starts.
+        self._tag_ids = section(tag_entries, "i")
+        self._tag_ids_start = position - self._tag_ids.nbytes
+        self._titles = section(self._title_offsets[count])
+        self._lower_titles = section(self._lower_offsets[count])
+        self._lower_start = position - self._lower_titles.nbytes
+        self._ids = section(self._id_offsets[count])
+        names = section(name_offsets[tag_count])
+
+        self._tag_pool = TagPool()
+        self._tag_names = self._tag_pool.get(
+            bytes(names[name_offsets[i]:name_offsets[i + 1]]).decode("utf-8")
+            for i in range(tag_count))
+        self._tag_numbers = {
+            tag: number for number, tag in enumerate(self._tag_names)}
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Tuple[str, str, Sequence[str]]]):
+        """Builds an in-memory catalog from (title, video_id, tags) rows."""
+        return cls(encode_columns(rows))
+
+    @classmethod
+    def open(cls, path):
+        """Memory-maps a catalog saved with save."""
+        with open(path, "rb") as columns_file:
+            mapped = mmap.mmap(columns_file.fileno(), 0, access=mmap.ACCESS_READ)
+        return cls(mapped)
+
+    def save(self, path):
+        """Writes the catalog to a file that open can memory-map."""
+        with open(path, "wb") as columns_file:
+            columns_file.write(self._buffer)
+
+    def __len__(self):
+        return self._count
+
+    def __iter__(self):
+        for ordinal in range(self._count):
+            yield self._video_id_at(ordinal)
+
+    def __getitem__(self, video_id):
+        ordinal = self.ordinal(video_id)
+        if ordinal is None:
+            raise KeyError(video_id)
+        return self.video_at(ordinal)
+
+    def __contains__(self, video_id):
+        return self.ordinal(video_id) is not None
+
+    def values(self):
+        return _ColumnarValues(self)
+
+    def items(self):
+        return _ColumnarItems(self)
+
+    def ordinal(self, video_id):
+        """Returns the catalog position of a video_id, or None if it does
+        not exist."""
+        key = video_id.encode("utf-8")
+        low, high = 0, self._count
+        while low < high:
+            middle = (low + high) // 2
+            ordinal = self._id_order[middle]
+            current = self._id_bytes_at(ordinal)
+            if current < key:
+                low = middle + 1
+            elif current > key:
+                high = middle
+            else:
+                return ordinal
+        return None
+
+    def video_at(self, ordinal):
+        """Returns a Video for the given catalog position."""
+        start, end = self._title_offsets[ordinal], \
+            self._title_offsets[ordinal + 1]
+        return Video(
+            bytes(self._titles[start:end]).decode("utf-8"),
+            self._video_id_at(ordinal),
+            self._tags_at(ordinal),
+        )
+
+    def search(self, search_term: str) -> List[Video]:
+        """Returns the videos whose title contains search_term, ignoring
+        case, sorted by title like NgramIndex.search.
+
+        Args:
+            search_term: The text to look for.
+        """
+        return self._sorted_videos(self.search_ordinals(search_term))
+
+    def search_ordinals(self, search_term: str) -> List[int]:
+        """Returns the ordinals of the videos whose title contains
+        search_term, ignoring case, in catalog order."""
+        term = search_term.lower().encode("utf-8")
+        if not term:
+            return list(range(self._count))
+        # Searching the whole buffer at once can match across the end of
+        # one title and the start of the next, so every hit is checked
+        # against the title it starts in.
+        buffer, base = self._buffer, self._lower_start
+        offsets = self._lower_offsets
+        limit = base + offsets[self._count]
+        ordinals = []
+        start = buffer.find(term, base, limit)
+        while start != -1:
+            ordinal = bisect.bisect_right(offsets, start - base) - 1
+            end = base + offsets[ordinal + 1]
+            if start + len(term) <= end:
+                ordinals.append(ordinal)
+                start = buffer.find(term, end, limit)
+            else:
+                start = buffer.find(term, start + 1, limit)
+        return ordinals
+
+    def tags(self) -> List[str]:
+        """Returns every tag of the catalog."""
+        return list(self._tag_names)
+
+    def tag_counts(self) -> Dict[str, int]:
+        """Returns how many videos carry every tag."""
+        if numpy is not None:
+            counts = numpy.bincount(
+                numpy.frombuffer(self._tag_ids, dtype=numpy.int32),
+                minlength=len(self._tag_names)).tolist()
+        else:
+            counter = collections.Counter(self._tag_ids)
+            counts = [counter[number] for number in range(len(self._tag_names))]
+        return dict(zip(self._tag_names, counts))
+
+    def videos_with_tag(self, tag: str) -> List[Video]:
+        """Returns the videos carrying the tag, sorted by title.
+
+        Args:
+            tag: The tag to look for, e.g. "#cat".
+        """
+        return self._sorted_videos(self._ordinals_with_tag(tag))
+
+    def query(self, all_of: Iterable[str] = (), any_of: Iterable[str] = (),
+              none_of: Iterable[str] = ()) -> List[Video]:
+        """Returns the videos matching a combination of tags, sorted by
+        title. Works like TagIndex.query.
+
+        Raises:
+            ValueError: If neither all_of nor any_of is given.
+        """
+        all_of, any_of, none_of = list(all_of), list(any_of), list(none_of)
+        if not all_of and not any_of:
+            raise ValueError("A tag query needs at least one tag to match")
+
+        selected = None
+        for tag in all_of:
+            ordinals = self._ordinals_with_tag(tag)
+            selected = ordinals if selected is None else selected & ordinals
+        if any_of:
+            ordinals = set().union(
+                *(self._ordinals_with_tag(tag) for tag in any_of))
+            selected = ordinals if selected is None else selected & ordinals
+        for tag in none_of:
+            selected -= self._ordinals_with_tag(tag)
+        return self._sorted_videos(selected)
+
+    def _ordinals_with_tag(self, tag):
+        """Returns the set of ordinals carrying a tag, scanning the tag
+        array."""
+        number = self._tag_numbers.get(tag)
+        if number is None:
+            return set()
+        if numpy is not None:
+            positions = numpy.flatnonzero(
+                numpy.frombuffer(self._tag_ids, dtype=numpy.int32) == number)
+            ordinals = numpy.searchsorted(
+                numpy.frombuffer(self._tag_offsets, dtype=numpy.int64),
+                positions, side="right") - 1
+            return set(ordinals.tolist())
+
+        pattern = array("i", [number]).tobytes()
+        width = len(pattern)
+        buffer, base = self._buffer, self._tag_ids_start
+        limit = base + len(self._tag_ids) * width
+        ordinals = set()
+        start = buffer.find(pattern, base, limit)
+        while start != -1:
+            if (start - base) % width:
+                # Matched the end of one tag id and the start of the next.
+                start = buffer.find(pattern, start + 1, limit)
+                continue
+            ordinals.add(bisect.bisect_right(
+                self._tag_offsets, (start - base) // width) - 1)
+            start = buffer.find(pattern, start + width, limit)
+        return ordinals
+
+    def _sorted_videos(self, ordinals):
+        videos = [self.video_at(ordinal) for ordinal in sorted(ordinals)]
+        videos.sort(key=lambda video: video.title)
+        return videos
+
+    def _id_bytes_at(self, ordinal):
+        return bytes(self._ids[
+            self._id_offsets[ordinal]:self._id_offsets[ordinal + 1]])
+
+    def _video_id_at(self, ordinal):
+        return self._id_bytes_at(ordinal).decode("utf-8")
+
+    def _tags_at(self, ordinal):
+        names = self._tag_names
+        return self._tag_pool.get(names[number] for number in self._tag_ids[
+            self._tag_offsets[ordinal]:self._tag_offsets[ordinal + 1]])
+
+
+class _ColumnarValues(ValuesView):
+    def __iter__(self):
+        catalog = self._mapping
+        for ordinal in range(len(catalog)):
+            yield catalog.video_at(ordinal)
+
+
+class _ColumnarItems(ItemsView):
+    def __iter__(self):
+        catalog = self._mapping
+        for ordinal in range(len(catalog)):
+            video = catalog.video_at(ordinal)
+            yield video.video_id, video
+
+
+def main(argv):
+    """Converts a videos.txt file into a columnar catalog file."""
+    from .video_catalog import read_video_rows
+
+    if len(argv) != 2:
+        print("Usage: python3 -m src.columnar_catalog <videos.txt> <columns>")
+        return 1
+    source, destination = argv
+    catalog = ColumnarCatalog.from_rows(read_video_rows(source))
+    catalog.save(destination)
+    print(f"Wrote {len(catalog)} videos to {destination}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
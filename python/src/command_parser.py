@@ -1,7 +1,6 @@
 """A command parser class."""
 
-import textwrap
-from typing import Sequence
+from typing import Callable, NamedTuple, Optional, Sequence, Tuple, Union
 
 
 class CommandException(Exception):
@@ -9,11 +8,77 @@ class CommandException(Exception):
     pass
 
 
+class Command(NamedTuple):
+    """A class used to describe one entry of the command table.
+
+    Attributes:
+        handler: The name of the VideoPlayer method that runs the command,
+            or a function called with the parser followed by the arguments.
+        arities: The accepted numbers of arguments. None for commands that
+            take no arguments; anything typed after them is ignored.
+        usage: The error shown when the number of arguments is wrong.
+        help: The description shown by HELP.
+        steps: For commands asking the user a question, the VideoPlayer
+            methods running the command in two steps and the question's
+            prompt, as (ask, prompt, answer). ask is called with the
+            arguments, shows the question and returns what answer is called
+            with, followed by the user's answer. A falsy return means there
+            is no question. None for commands that ask nothing.
+    """
+    handler: Union[str, Callable]
+    arities: Optional[Tuple[int, ...]]
+    usage: str
+    help: str
+    steps: Optional[Tuple[str, str, str]] = None
+
+
 class CommandParser:
-    """A class used to parse and execute a user Command."""
+    """A class used to parse and execute a user Command.
+
+    Commands are looked up in the COMMANDS table, which also produces the
+    HELP text. Use register_command to add a new command, or replace one;
+    existing parsers pick the change up the next time they run it.
+    """
+
+    COMMANDS = {}
+
+    def __init__(self, video_player, out=None):
+        """The CommandParser class is initialized.
 
-    def __init__(self, video_player):
+        Args:
+            video_player: The VideoPlayer the commands are run on.
+            out: The OutputSink the parser's own messages are written to,
+                the player's sink by default.
+        """
         self._player = video_player
+        self._out = out if out is not None else video_player.out
+        # The handler bound for each command name, with the table entry it
+        # was bound from, so it is only bound again if the entry changes.
+        self._handlers = {}
+
+    @classmethod
+    def register_command(cls, name: str, handler: Union[str, Callable],
+                         arities: Optional[Tuple[int, ...]] = None,
+                         usage: str = "", help: str = "",
+                         steps: Optional[Tuple[str, str, str]] = None):
+        """Adds a command to the table, or replaces an existing one.
+
+        Args:
+            name: The command name, e.g. "PLAY".
+            handler: The name of the VideoPlayer method that runs the
+                command, or a function called with the parser followed by
+                the command arguments.
+            arities: The accepted numbers of arguments. None for commands
+                that take no arguments.
+            usage: The error shown when the number of arguments is wrong.
+            help: The description shown by HELP, e.g.
+                "PLAY <video_id> - Plays specified video.".
+            steps: For commands asking the user a question, the
+                (ask, prompt, answer) VideoPlayer methods and prompt to run
+                it in two steps, see Command.
+        """
+        cls.COMMANDS[name.upper()] = Command(
+            handler, arities, usage, help, steps)
 
     def execute_command(self, command: Sequence[str]):
         """Executes the user command. Expects the command to be upper case.
@@ -24,140 +89,154 @@ class CommandParser:
                 "Please enter a valid command, "
                 "type HELP for a list of available commands.")
 
-        if command[0].upper() == "NUMBER_OF_VIDEOS":
-            self._player.number_of_videos()
-
-        elif command[0].upper() == "SHOW_ALL_VIDEOS":
-            self._player.show_all_videos()
-
-        elif command[0].upper() == "PLAY":
-            if len(command) != 2:
-                raise CommandException(
-                    "Please enter PLAY command followed by video_id.")
-            self._player.play_video(command[1])
-
-        elif command[0].upper() == "PLAY_RANDOM":
-            self._player.play_random_video()
-
-        elif command[0].upper() == "STOP":
-            self._player.stop_video()
-
-        elif command[0].upper() == "PAUSE":
-            self._player.pause_video()
-
-        elif command[0].upper() == "CONTINUE":
-            self._player.continue_video()
-
-        elif command[0].upper() == "SHOW_PLAYING":
-            self._player.show_playing()
-
-        elif command[0].upper() == "CREATE_PLAYLIST":
-            if len(command) != 2:
-                raise CommandException(
-                    "Please enter CREATE_PLAYLIST command followed by a "
-                    "playlist name.")
-            self._player.create_playlist(command[1])
-
-        elif command[0].upper() == "ADD_TO_PLAYLIST":
-            if len(command) != 3:
-                raise CommandException(
-                    "Please enter ADD_TO_PLAYLIST command followed by a "
-                    "playlist name and video_id to add.")
-            self._player.add_to_playlist(command[1], command[2])
-
-        elif command[0].upper() == "REMOVE_FROM_PLAYLIST":
-            if len(command) != 3:
-                raise CommandException(
-                    "Please enter REMOVE_FROM_PLAYLIST command followed by a "
-                    "playlist name and video_id to remove.")
-            self._player.remove_from_playlist(command[1], command[2])
-
-        elif command[0].upper() == "CLEAR_PLAYLIST":
-            if len(command) != 2:
-                raise CommandException(
-                    "Please enter CLEAR_PLAYLIST command followed by a "
-                    "playlist name.")
-            self._player.clear_playlist(command[1])
-
-        elif command[0].upper() == "DELETE_PLAYLIST":
-            if len(command) != 2:
-                raise CommandException(
-                    "Please enter DELETE_PLAYLIST command followed by a "
-                    "playlist name.")
-            self._player.delete_playlist(command[1])
-
-        elif command[0].upper() == "SHOW_PLAYLIST":
-            if len(command) != 2:
-                raise CommandException(
-                    "Please enter SHOW_PLAYLIST command followed by a "
-                    "playlist name.")
-            self._player.show_playlist(command[1])
-
-        elif command[0].upper() == "SHOW_ALL_PLAYLISTS":
-            self._player.show_all_playlists()
-
-        elif command[0].upper() == "SEARCH_VIDEOS":
-            if len(command) != 2:
-                raise CommandException(
-                    "Please enter SEARCH_VIDEOS command followed by a "
-                    "search term.")
-            self._player.search_videos(command[1])
-
-        elif command[0].upper() == "SEARCH_VIDEOS_WITH_TAG":
-            if len(command) != 2:
-                raise CommandException(
-                    "Please enter SEARCH_VIDEOS_WITH_TAG command followed by a "
-                    "video tag.")
-            self._player.search_videos_tag(command[1])
-
-        elif command[0].upper() == "FLAG_VIDEO":
-            if len(command) == 3:
-                self._player.flag_video(command[1], command[2])
-            elif len(command) == 2:
-                self._player.flag_video(command[1])
-            else:
-                raise CommandException(
-                    "Please enter FLAG_VIDEO command followed by a "
-                    "video_id and an optional flag reason.")
-
-        elif command[0].upper() == "ALLOW_VIDEO":
-            if len(command) != 2:
-                raise CommandException(
-                    "Please enter ALLOW_VIDEO command followed by a "
-                    "video_id.")
-            self._player.allow_video(command[1])
-
-        elif command[0].upper() == "HELP":
-            self._get_help()
-        else:
-            print(
+        name = command[0].upper()
+        entry = self.COMMANDS.get(name)
+        if entry is None:
+            self._out.write(
                 "Please enter a valid command, type HELP for a list of "
-                "available commands.")
+                "available commands.\n")
+            return
+
+        handler = self._handler(name, entry)
+        if entry.arities is None:
+            handler()
+        elif len(command) - 1 in entry.arities:
+            handler(*command[1:])
+        else:
+            raise CommandException(entry.usage)
+
+    def command_steps(self, command: Sequence[str]) \
+            -> Optional[Tuple[Callable, str, Callable]]:
+        """Returns how to run a command asking a question in two steps, for
+        callers that cannot wait for the answer while the command runs.
+
+        Returns:
+            An (ask, prompt, answer) tuple, or None for commands to run with
+            execute_command, including those with the wrong number of
+            arguments. ask() shows the question and returns what to call
+            answer with, followed by the answer read after writing prompt.
+            If it returns something falsy there is no question to answer.
+        """
+        entry = self.COMMANDS.get(command[0].upper()) if command else None
+        if entry is None or entry.steps is None or \
+                len(command) - 1 not in (entry.arities or (0,)):
+            return None
+        ask, prompt, answer = entry.steps
+        arguments = command[1:]
+        return (lambda: getattr(self._player, ask)(*arguments), prompt,
+                getattr(self._player, answer))
+
+    def _handler(self, name, entry):
+        bound = self._handlers.get(name)
+        if bound is None or bound[0] is not entry:
+            bound = (entry, self._bind(entry.handler))
+            # Replaced as a whole, so that it stays consistent for threads
+            # sharing the parser.
+            self._handlers[name] = bound
+        return bound[1]
+
+    def _bind(self, handler):
+        if isinstance(handler, str):
+            return getattr(self._player, handler)
+        return lambda *args: handler(self, *args)
 
     def _get_help(self):
         """Displays all available commands to the user."""
-        help_text = textwrap.dedent("""
-        Available commands:
-            NUMBER_OF_VIDEOS - Shows how many videos are in the library.
-            SHOW_ALL_VIDEOS - Lists all videos from the library.
-            PLAY <video_id> - Plays specified video.
-            PLAY_RANDOM - Plays a random video from the library.
-            STOP - Stop the current video.
-            PAUSE - Pause the current video.
-            CONTINUE - Resume the current paused video.
-            SHOW_PLAYING - Displays the title, url and paused status of the video that is currently playing (or paused).
-            CREATE_PLAYLIST <playlist_name> - Creates a new (empty) playlist with the provided name.
-            ADD_TO_PLAYLIST <playlist_name> <video_id> - Adds the requested video to the playlist.
-            REMOVE_FROM_PLAYLIST <playlist_name> <video_id> - Removes the specified video from the specified playlist
-            CLEAR_PLAYLIST <playlist_name> - Removes all the videos from the playlist.
-            DELETE_PLAYLIST <playlist_name> - Deletes the playlist.
-            SHOW_PLAYLIST <playlist_name> - List all the videos in this playlist.
-            SHOW_ALL_PLAYLISTS - Display all the available playlists.
-            SEARCH_VIDEOS <search_term> - Display all the videos whose titles contain the search_term.
-            SEARCH_VIDEOS_WITH_TAG <tag_name> -Display all videos whose tags contains the provided tag.
-            FLAG_VIDEO <video_id> <flag_reason> - Mark a video as flagged.
-            ALLOW_VIDEO <video_id> - Removes a flag from a video.
-            HELP - Displays help.
-            EXIT - Terminates the program execution.
-        """)
-        print(help_text)
+        lines = [command.help for command in self.COMMANDS.values()]
+        lines.append("EXIT - Terminates the program execution.")
+        help_text = "\nAvailable commands:\n" + "".join(
+            f"    {line}\n" for line in lines)
+        self._out.write(help_text + "\n")
+
+
+CommandParser.register_command(
+    "NUMBER_OF_VIDEOS", "number_of_videos",
+    help="NUMBER_OF_VIDEOS - Shows how many videos are in the library.")
+CommandParser.register_command(
+    "SHOW_ALL_VIDEOS", "show_all_videos",
+    help="SHOW_ALL_VIDEOS - Lists all videos from the library.")
+CommandParser.register_command(
+    "PLAY", "play_video", (1,),
+    "Please enter PLAY command followed by video_id.",
+    "PLAY <video_id> - Plays specified video.")
+CommandParser.register_command(
+    "PLAY_RANDOM", "play_random_video",
+    help="PLAY_RANDOM - Plays a random video from the library.")
+CommandParser.register_command(
+    "STOP", "stop_video",
+    help="STOP - Stop the current video.")
+CommandParser.register_command(
+    "PAUSE", "pause_video",
+    help="PAUSE - Pause the current video.")
+CommandParser.register_command(
+    "CONTINUE", "continue_video",
+    help="CONTINUE - Resume the current paused video.")
+CommandParser.register_command(
+    "SHOW_PLAYING", "show_playing",
+    help="SHOW_PLAYING - Displays the title, url and paused status of the "
+         "video that is currently playing (or paused).")
+CommandParser.register_command(
+    "CREATE_PLAYLIST", "create_playlist", (1,),
+    "Please enter CREATE_PLAYLIST command followed by a playlist name.",
+    "CREATE_PLAYLIST <playlist_name> - Creates a new (empty) playlist with "
+    "the provided name.")
+CommandParser.register_command(
+    "ADD_TO_PLAYLIST", "add_to_playlist", (2,),
+    "Please enter ADD_TO_PLAYLIST command followed by a playlist name and "
+    "video_id to add.",
+    "ADD_TO_PLAYLIST <playlist_name> <video_id> - Adds the requested video "
+    "to the playlist.")
+CommandParser.register_command(
+    "REMOVE_FROM_PLAYLIST", "remove_from_playlist", (2,),
+    "Please enter REMOVE_FROM_PLAYLIST command followed by a playlist name "
+    "and video_id to remove.",
+    "REMOVE_FROM_PLAYLIST <playlist_name> <video_id> - Removes the specified "
+    "video from the specified playlist")
+CommandParser.register_command(
+    "CLEAR_PLAYLIST", "clear_playlist", (1,),
+    "Please enter CLEAR_PLAYLIST command followed by a playlist name.",
+    "CLEAR_PLAYLIST <playlist_name> - Removes all the videos from the "
+    "playlist.")
+CommandParser.register_command(
+    "DELETE_PLAYLIST", "delete_playlist", (1,),
+    "Please enter DELETE_PLAYLIST command followed by a playlist name.",
+    "DELETE_PLAYLIST <playlist_name> - Deletes the playlist.")
+CommandParser.register_command(
+    "SHOW_PLAYLIST", "show_playlist", (1,),
+    "Please enter SHOW_PLAYLIST command followed by a playlist name.",
+    "SHOW_PLAYLIST <playlist_name> - List all the videos in this playlist.")
+CommandParser.register_command(
+    "SHOW_ALL_PLAYLISTS", "show_all_playlists",
+    help="SHOW_ALL_PLAYLISTS - Display all the available playlists.")
+CommandParser.register_command(
+    "SEARCH_VIDEOS", "search_videos", (1,),
+    "Please enter SEARCH_VIDEOS command followed by a search term.",
+    "SEARCH_VIDEOS <search_term> - Display all the videos whose titles "
+    "contain the search_term.",
+    ("show_search_results", "\n", "play_search_answer"))
+CommandParser.register_command(
+    "SEARCH_VIDEOS_WITH_TAG", "search_videos_tag", (1,),
+    "Please enter SEARCH_VIDEOS_WITH_TAG command followed by a video tag.",
+    "SEARCH_VIDEOS_WITH_TAG <tag_name> -Display all videos whose tags "
+    "contains the provided tag.",
+    ("show_tag_results", "", "play_search_answer"))
+CommandParser.register_command(
+    "FLAG_VIDEO", "flag_video", (1, 2),
+    "Please enter FLAG_VIDEO command followed by a video_id and an optional "
+    "flag reason.",
+    "FLAG_VIDEO <video_id> <flag_reason> - Mark a video as flagged.")
+CommandParser.register_command(
+    "ALLOW_VIDEO", "allow_video", (1,),
+    "Please enter ALLOW_VIDEO command followed by a video_id.",
+    "ALLOW_VIDEO <video_id> - Removes a flag from a video.")
+CommandParser.register_command(
+    "APPLY_MODERATION_FEED", "apply_moderation_feed", (1,),
+    "Please enter APPLY_MODERATION_FEED command followed by a feed file.",
+    "APPLY_MODERATION_FEED <feed_file> - Flags and allows every video listed "
+    "in the file, one 'video_id | FLAG or ALLOW | reason' per line.")
+CommandParser.register_command(
+    "RELOAD_CATALOG", "reload_catalog",
+    help="RELOAD_CATALOG - Picks up the changes made to the catalog file.")
+CommandParser.register_command(
+    "HELP", CommandParser._get_help,
+    help="HELP - Displays help.")
@@ -0,0 +1,404 @@
+"""A benchmark comparing the interchangeable VideoPlayer implementations.
+
+python/src and the reference solutions in solutions/python all implement
+the same commands on top of very different data structures. This module
+loads each of them behind a common adapter, replays the same command trace
+against the same synthetic catalog, and prints a comparison of latency,
+allocations and memory:
+
+    python3 -m src.compare_implementations --sizes 1000,10000
+
+Every implementation is copied into a scratch directory with the generated
+catalog as its videos.txt, since most of them can only load the videos.txt
+next to their code, and imported from there as a package of its own.
+Output is discarded and every "Would you like to play any of the above?"
+question is answered with no.
+"""
+
+import argparse
+import contextlib
+import importlib
+import importlib.util
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Dict, List, Sequence
+
+from .benchmark import percentile
+from .catalog_generator import CatalogSpec, write_catalog
+from .video_catalog import read_video_rows
+
+_SOLUTIONS = Path(__file__).resolve().parent.parent.parent / "solutions" / \
+    "python"
+
+IMPLEMENTATIONS = {
+    "python/src": Path(__file__).resolve().parent,
+    "solution1": _SOLUTIONS / "solution1" / "src",
+    "solution2": _SOLUTIONS / "solution2",
+    "solution3": _SOLUTIONS / "solution3" / "src",
+    "solution5": _SOLUTIONS / "solution5" / "src",
+}
+
+# The relative frequency of every command in generated traces. Only
+# commands every implementation supports are used.
+COMMAND_MIX = {
+    "PLAY": 15,
+    "PLAY_RANDOM": 5,
+    "STOP": 5,
+    "PAUSE": 5,
+    "CONTINUE": 5,
+    "SHOW_PLAYING": 5,
+    "CREATE_PLAYLIST": 3,
+    "ADD_TO_PLAYLIST": 15,
+    "REMOVE_FROM_PLAYLIST": 5,
+    "CLEAR_PLAYLIST": 1,
+    "DELETE_PLAYLIST": 1,
+    "SHOW_PLAYLIST": 5,
+    "SHOW_ALL_PLAYLISTS": 2,
+    "SEARCH_VIDEOS": 8,
+    "SEARCH_VIDEOS_WITH_TAG": 8,
+    "FLAG_VIDEO": 3,
+    "ALLOW_VIDEO": 3,
+    "NUMBER_OF_VIDEOS": 2,
+    "SHOW_ALL_VIDEOS": 1,
+    "HELP": 1,
+}
+# How many playlists a trace creates before the mix starts.
+PLAYLISTS = 20
+
+
+def generate_trace(rows, length: int = 2000, seed: int = 0) \
+        -> List[List[str]]:
+    """Returns a command trace to replay on every implementation.
+
+    The trace creates a few playlists and then draws `length` commands
+    from COMMAND_MIX, with video ids, title words and tags taken from the
+    catalog.
+
+    Args:
+        rows: The (title, video_id, tags) rows of the catalog.
+        length: The number of commands after the playlists are created.
+        seed: The seed of the random choices.
+    """
+    rng = random.Random(seed)
+    video_ids = [video_id for _, video_id, _ in rows]
+    words = [title.split()[0].lower() for title, _, _ in rows if title]
+    tags = [tag for _, _, tags in rows for tag in tags] or ["#none"]
+    playlists = [f"playlist_{number}" for number in range(PLAYLISTS)]
+
+    def arguments(name):
+        if name in ("PLAY", "ALLOW_VIDEO"):
+            return [rng.choice(video_ids)]
+        if name == "FLAG_VIDEO":
+            return [rng.choice(video_ids), "benchmark"]
+        if name == "CREATE_PLAYLIST":
+            playlist = f"playlist_{len(playlists)}"
+            playlists.append(playlist)
+            return [playlist]
+        if name in ("ADD_TO_PLAYLIST", "REMOVE_FROM_PLAYLIST"):
+            return [rng.choice(playlists), rng.choice(video_ids)]
+        if name in ("CLEAR_PLAYLIST", "DELETE_PLAYLIST", "SHOW_PLAYLIST"):
+            return [rng.choice(playlists)]
+        if name == "SEARCH_VIDEOS":
+            return [rng.choice(words)]
+        if name == "SEARCH_VIDEOS_WITH_TAG":
+            return [rng.choice(tags)]
+        return []
+
+    trace = [["CREATE_PLAYLIST", playlist] for playlist in playlists]
+    names = list(COMMAND_MIX)
+    weights = list(COMMAND_MIX.values())
+    for name in rng.choices(names, weights, k=length):
+        trace.append([name] + arguments(name))
+    return trace
+
+
+class _Discard:
+    """A stdout replacement throwing everything away."""
+
+    def write(self, text):
+        return len(text)
+
+    def flush(self):
+        pass
+
+
+class _NoAnswers:
+    """A stdin replacement answering every input() with an empty line."""
+
+    def readline(self, size=-1):
+        return "\n"
+
+
+@contextlib.contextmanager
+def _quiet():
+    stdin = sys.stdin
+    sys.stdin = _NoAnswers()
+    try:
+        with contextlib.redirect_stdout(_Discard()):
+            yield
+    finally:
+        sys.stdin = stdin
+
+
+class PlayerAdapter:
+    """A class used to drive one implementation through a common interface.
+
+    Every implementation has a VideoPlayer taking no arguments and a
+    CommandParser wrapping it, which is all the adapter relies on.
+    """
+
+    def __init__(self, name: str, source: Path):
+        """PlayerAdapter constructor.
+
+        Args:
+            name: The name shown in the results, e.g. "solution1".
+            source: The directory holding the implementation's modules.
+        """
+        self.name = name
+        self.source = Path(source)
+        self._package = None
+        self._player_module = None
+        self._parser_module = None
+
+    def install(self, catalog_path, workdir):
+        """Copies the implementation next to a catalog and imports it.
+
+        Args:
+            catalog_path: The catalog the implementation loads as its
+                videos.txt.
+            workdir: The directory to copy the implementation into.
+        """
+        prefix = "_impl_" + "".join(
+            character if character.isalnum() else "_"
+            for character in self.name) + "_"
+        # A directory of its own per install, so that no two installs share
+        # a package name, even for adapters created one after the other.
+        directory = Path(tempfile.mkdtemp(prefix=prefix, dir=workdir))
+        package = directory.name
+        directory.rmdir()
+        shutil.copytree(self.source, directory,
+                        ignore=shutil.ignore_patterns("__pycache__"))
+        shutil.copyfile(catalog_path, directory / "videos.txt")
+
+        spec = importlib.util.spec_from_file_location(
+            package, directory / "__init__.py",
+            submodule_search_locations=[str(directory)])
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[package] = module
+        self._package = package
+        spec.loader.exec_module(module)
+        self._player_module = importlib.import_module(f"{package}.video_player")
+        self._parser_module = importlib.import_module(
+            f"{package}.command_parser")
+
+    def uninstall(self):
+        """Forgets the modules imported by install."""
+        if self._package is None:
+            return
+        for name in list(sys.modules):
+            if name == self._package or \
+                    name.startswith(self._package + "."):
+                del sys.modules[name]
+        self._package = None
+        self._player_module = None
+        self._parser_module = None
+
+    def new_parser(self):
+        """Returns a CommandParser around a new VideoPlayer."""
+        player = self._player_module.VideoPlayer()
+        return self._parser_module.CommandParser(player)
+
+    def execute(self, parser, command: Sequence[str]) -> bool:
+        """Runs one command.
+
+        Returns:
+            False if the implementation raised anything but its own
+            CommandException.
+        """
+        try:
+            parser.execute_command(list(command))
+        except self._parser_module.CommandException:
+            pass
+        except Exception:
+            return False
+        return True
+
+
+def compare(adapter: PlayerAdapter, catalog_path, trace, workdir) -> dict:
+    """Replays a trace on one implementation.
+
+    The trace is replayed twice on fresh players: once timing every
+    command, once tracing allocations, which would distort the timings.
+
+    Args:
+        adapter: The PlayerAdapter of the implementation.
+        catalog_path: The catalog to load.
+        trace: The commands to replay.
+        workdir: A scratch directory to install the implementation into.
+
+    Returns:
+        A dictionary of the results.
+    """
+    adapter.install(catalog_path, workdir)
+    try:
+        with _quiet():
+            tracemalloc.start()
+            start = time.perf_counter()
+            parser = adapter.new_parser()
+            load_s = time.perf_counter() - start
+            loaded_bytes = tracemalloc.get_traced_memory()[0]
+            tracemalloc.stop()
+
+            latencies: Dict[str, List[float]] = {}
+            errors = 0
+            start = time.perf_counter()
+            for command in trace:
+                command_start = time.perf_counter()
+                if not adapter.execute(parser, command):
+                    errors += 1
+                latencies.setdefault(command[0], []).append(
+                    time.perf_counter() - command_start)
+            total_s = time.perf_counter() - start
+
+            parser = adapter.new_parser()
+            tracemalloc.start()
+            blocks = sys.getallocatedblocks()
+            for command in trace:
+                adapter.execute(parser, command)
+            retained_blocks = sys.getallocatedblocks() - blocks
+            current, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+    finally:
+        adapter.uninstall()
+
+    every_latency = sorted(
+        latency for values in latencies.values() for latency in values)
+    return {
+        "implementation": adapter.name,
+        "load_s": load_s,
+        "loaded_bytes": loaded_bytes,
+        "total_s": total_s,
+        "commands_per_s": len(trace) / total_s if total_s else float("inf"),
+        "p50_us": percentile(every_latency, 0.50) * 1e6,
+        "p99_us": percentile(every_latency, 0.99) * 1e6,
+        "commands": {
+            name: percentile(sorted(values), 0.50) * 1e6
+            for name, values in latencies.items()
+        },
+        "peak_bytes": peak,
+        "retained_bytes": current,
+        "retained_blocks": retained_blocks,
+        "errors": errors,
+    }
+
+
+def run_comparison(implementations=None, sizes=(1000, 10000),
+                   trace_length=2000, seed=0) -> List[dict]:
+    """Compares implementations at several catalog sizes.
+
+    Args:
+        implementations: A mapping of name to source directory,
+            IMPLEMENTATIONS by default.
+        sizes: The catalog sizes to generate.
+        trace_length: The number of commands in the trace.
+        seed: The seed of the catalog and the trace.
+
+    Returns:
+        One dictionary per implementation and size.
+    """
+    if implementations is None:
+        implementations = IMPLEMENTATIONS
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        for size in sizes:
+            catalog_path = os.path.join(workdir, f"videos_{size}.txt")
+            write_catalog(catalog_path, CatalogSpec(videos=size, seed=seed))
+            trace = generate_trace(
+                list(read_video_rows(catalog_path)), trace_length, seed)
+            for name, source in implementations.items():
+                result = compare(
+                    PlayerAdapter(name, source), catalog_path, trace, workdir)
+                result["catalog_size"] = size
+                results.append(result)
+    return results
+
+
+def format_table(results) -> str:
+    """Returns the comparison as two text tables: a summary per
+    implementation, then the median latency of every command."""
+    lines = [
+        f"{'videos':>8} {'implementation':<14}{'load ms':>9}{'load KiB':>10}"
+        f"{'cmds/s':>9}{'p50 us':>9}{'p99 us':>10}{'peak KiB':>10}"
+        f"{'kept KiB':>10}{'kept blk':>10}{'errors':>8}"]
+    for result in results:
+        lines.append(
+            f"{result['catalog_size']:>8} {result['implementation']:<14}"
+            f"{result['load_s'] * 1e3:>9.1f}"
+            f"{result['loaded_bytes'] / 1024:>10.0f}"
+            f"{result['commands_per_s']:>9.0f}{result['p50_us']:>9.1f}"
+            f"{result['p99_us']:>10.1f}{result['peak_bytes'] / 1024:>10.0f}"
+            f"{result['retained_bytes'] / 1024:>10.0f}"
+            f"{result['retained_blocks']:>10}{result['errors']:>8}")
+
+    for size in dict.fromkeys(result["catalog_size"] for result in results):
+        row = [result for result in results if result["catalog_size"] == size]
+        lines.append("")
+        lines.append(f"Median latency in us on {size} videos")
+        lines.append(f"{'command':<24}" + "".join(
+            f"{result['implementation']:>12}" for result in row))
+        for name in COMMAND_MIX:
+            lines.append(f"{name:<24}" + "".join(
+                f"{result['commands'].get(name, 0.0):>12.1f}"
+                for result in row))
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    """Runs the comparison from the command line."""
+    arguments = argparse.ArgumentParser(
+        description="Compares the VideoPlayer implementations.")
+    arguments.add_argument(
+        "--sizes", default="1000,10000",
+        help="comma separated catalog sizes (default %(default)s)")
+    arguments.add_argument(
+        "--only", help="comma separated implementations to compare, "
+                       f"out of {', '.join(IMPLEMENTATIONS)}")
+    arguments.add_argument(
+        "--implementation", action="append", metavar="NAME=DIR", default=[],
+        help="compare another implementation in DIR, can be repeated")
+    arguments.add_argument("--trace-length", type=int, default=2000,
+                           help="commands per trace (default %(default)s)")
+    arguments.add_argument("--seed", type=int, default=0,
+                           help="random seed (default %(default)s)")
+    arguments.add_argument("--output", metavar="FILE",
+                           help="write the results as JSON to FILE")
+    options = arguments.parse_args(argv)
+
+    implementations = dict(IMPLEMENTATIONS)
+    if options.only:
+        implementations = {
+            name: implementations[name] for name in options.only.split(",")}
+    for entry in options.implementation:
+        name, _, directory = entry.partition("=")
+        implementations[name] = Path(directory)
+
+    results = run_comparison(
+        implementations,
+        [int(size) for size in options.sizes.split(",")],
+        options.trace_length, options.seed)
+    print(format_table(results))
+    if options.output:
+        with open(options.output, "w") as output:
+            json.dump(results, output, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,158 @@
+"""A video player that can be shared between threads."""
+
+import threading
+from contextlib import contextmanager
+
+from .rw_lock import KeyedLocks, ReadWriteLock
+from .video_player import VideoPlayer
+
+# Keys of the keyed locks that are not a playlist or a video.
+PLAYBACK = "playback"
+LIBRARY = "library"
+
+
+def _playlist(playlist_name):
+    return ("playlist", playlist_name.lower())
+
+
+def _video(video_id):
+    return ("video", video_id)
+
+
+class ConcurrentVideoPlayer(VideoPlayer):
+    """A class used to represent a Video Player whose commands can run on
+    many threads at once.
+
+    Commands that only read the library, NUMBER_OF_VIDEOS, SHOW_ALL_VIDEOS
+    and the searches, take no lock at all: they read one published
+    version of the catalog and of the flags, which writers never change
+    (see VideoCatalog and FlagStore), so they never wait and never see a
+    moderation feed half applied.
+
+    Every other command holds a read/write lock over the player. Commands
+    that only read playlists, such as SHOW_ALL_PLAYLISTS, hold it shared.
+    So do commands changing a single playlist or video,
+    which additionally hold an exclusive lock on that playlist or video:
+    edits of different playlists run side by side, and a video cannot be
+    flagged while it is being added to a playlist or played. Commands
+    changing what is playing hold the playback lock, and those changing
+    flags or the random pool also hold the library lock, which serializes
+    the short updates of the library's flags.
+
+    Creating and deleting playlists change the set of playlists, and
+    moderation feeds and catalog reloads change many videos at once, so
+    they hold the player lock exclusively. A search asking which result to play takes the lock
+    of the video it plays only once it has the answer.
+
+    Locks are taken by the outermost command only: a command calling
+    another, such as FLAG_VIDEO stopping the current video, runs the
+    inner one under the locks it already holds.
+    """
+
+    def __init__(self, *args, stripes: int = 64, **kwargs):
+        """ConcurrentVideoPlayer constructor. Takes the arguments of
+        VideoPlayer.
+
+        Args:
+            stripes: The number of locks playlists and videos are spread
+                over, see KeyedLocks.
+        """
+        self._lock = ReadWriteLock()
+        self._keys = KeyedLocks(stripes)
+        self._holding = threading.local()
+        super().__init__(*args, **kwargs)
+
+    @contextmanager
+    def _locked(self, *keys, exclusive=False):
+        """Holds the player lock, shared or exclusive, and the locks of
+        the given keys, unless this thread is already inside a command."""
+        if getattr(self._holding, "locks", False):
+            yield
+            return
+        player_lock = self._lock.write() if exclusive else self._lock.read()
+        with player_lock, self._keys.hold(*keys):
+            self._holding.locks = True
+            try:
+                yield
+            finally:
+                self._holding.locks = False
+
+    def export_state(self):
+        with self._locked(exclusive=True):
+            return super().export_state()
+
+    def restore_state(self, state):
+        with self._locked(exclusive=True):
+            super().restore_state(state)
+
+    def play_video(self, video_id):
+        with self._locked(PLAYBACK, _video(video_id)):
+            super().play_video(video_id)
+
+    def stop_video(self):
+        with self._locked(PLAYBACK):
+            super().stop_video()
+
+    def play_random_video(self):
+        with self._locked(PLAYBACK, LIBRARY):
+            super().play_random_video()
+
+    def pause_video(self):
+        with self._locked(PLAYBACK):
+            super().pause_video()
+
+    def continue_video(self):
+        with self._locked(PLAYBACK):
+            super().continue_video()
+
+    def show_playing(self):
+        with self._locked(PLAYBACK):
+            super().show_playing()
+
+    def create_playlist(self, playlist_name):
+        with self._locked(exclusive=True):
+            super().create_playlist(playlist_name)
+
+    def add_to_playlist(self, playlist_name, video_id):
+        with self._locked(_playlist(playlist_name), _video(video_id)):
+            super().add_to_playlist(playlist_name, video_id)
+
+    def show_all_playlists(self):
+        with self._locked():
+            super().show_all_playlists()
+
+    def show_playlist(self, playlist_name):
+        with self._locked(_playlist(playlist_name)):
+            super().show_playlist(playlist_name)
+
+    def remove_from_playlist(self, playlist_name, video_id):
+        with self._locked(_playlist(playlist_name)):
+            super().remove_from_playlist(playlist_name, video_id)
+
+    def clear_playlist(self, playlist_name):
+        with self._locked(_playlist(playlist_name)):
+            super().clear_playlist(playlist_name)
+
+    def delete_playlist(self, playlist_name):
+        with self._locked(exclusive=True):
+            super().delete_playlist(playlist_name)
+
+    def flag_video(self, video_id, flag_reason=""):
+        with self._locked(PLAYBACK, _video(video_id), LIBRARY):
+            super().flag_video(video_id, flag_reason)
+
+    def allow_video(self, video_id):
+        with self._locked(_video(video_id), LIBRARY):
+            super().allow_video(video_id)
+
+    def apply_moderation(self, records):
+        with self._locked(exclusive=True):
+            return super().apply_moderation(records)
+
+    def reload_catalog(self):
+        with self._locked(exclusive=True):
+            super().reload_catalog()
+
+    def poll_catalog(self):
+        with self._locked(exclusive=True):
+            return super().poll_catalog()
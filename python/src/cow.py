@@ -0,0 +1,454 @@
+"""Copy-on-write containers that versioned catalogs are built from.
+
+Every container has a fork method returning a new container with the same
+contents that shares all of its storage with the original. After a fork
+neither side changes the shared storage again: the first write to a part
+of it copies that part. A version that has been published to readers is
+never written to; writers fork it, change the fork and publish that.
+"""
+
+import bisect
+from itertools import accumulate, chain, islice
+
+# Marks a key removed in a CowDict's changes.
+_REMOVED = object()
+# Marks a key that is not among a CowDict's changes.
+_ABSENT = object()
+
+
+class CowDict:
+    """A class used to represent a dictionary with cheap versions.
+
+    The contents are a base dictionary shared by every version, plus the
+    changes made since it was built. Forking copies only the changes; once
+    they grow to a quarter of the base, the fork gets a new base with the
+    changes merged in. Keys iterate in base order, then in the order new
+    keys were added.
+
+    Values are shared between versions as well. A version that needs to
+    change a value in place gets its own copy from edit first.
+    """
+
+    def __init__(self, base=None):
+        """CowDict constructor.
+
+        Args:
+            base: The initial contents. The dictionary is used as it is and
+                must not be changed afterwards.
+        """
+        self._base = base if base is not None else {}
+        self._changes = {}
+        self._len = len(self._base)
+        # Keys whose values this version copied with edit.
+        self._owned = set()
+
+    def __len__(self):
+        return self._len
+
+    def __contains__(self, key) -> bool:
+        return self.get(key, _ABSENT) is not _ABSENT
+
+    def __getitem__(self, key):
+        value = self.get(key, _ABSENT)
+        if value is _ABSENT:
+            raise KeyError(key)
+        return value
+
+    def get(self, key, default=None):
+        if not self._changes:
+            return self._base.get(key, default)
+        value = self._changes.get(key, _ABSENT)
+        if value is _ABSENT:
+            return self._base.get(key, default)
+        return default if value is _REMOVED else value
+
+    def __iter__(self):
+        changes = self._changes
+        for key in self._base:
+            if changes.get(key) is not _REMOVED:
+                yield key
+        base = self._base
+        for key, value in changes.items():
+            if value is not _REMOVED and key not in base:
+                yield key
+
+    def keys(self):
+        return iter(self)
+
+    def values(self):
+        return (value for _, value in self.items())
+
+    def items(self):
+        changes = self._changes
+        for key, value in self._base.items():
+            changed = changes.get(key, _ABSENT)
+            if changed is _ABSENT:
+                yield key, value
+            elif changed is not _REMOVED:
+                yield key, changed
+        base = self._base
+        for key, value in changes.items():
+            if value is not _REMOVED and key not in base:
+                yield key, value
+
+    def __setitem__(self, key, value):
+        if key not in self:
+            self._len += 1
+        self._changes[key] = value
+        self._owned.discard(key)
+
+    def update(self, items):
+        """Sets many keys at once, like dict.update with (key, value)
+        pairs."""
+        changes = self._changes
+        base = self._base
+        added = 0
+        for key, value in items:
+            previous = changes.get(key, _ABSENT)
+            if previous is _ABSENT:
+                if key not in base:
+                    added += 1
+            elif previous is _REMOVED:
+                added += 1
+            changes[key] = value
+            self._owned.discard(key)
+        self._len += added
+
+    def remove_all(self, keys):
+        """Removes many keys at once. Keys that are not there are
+        ignored."""
+        changes = self._changes
+        base = self._base
+        removed = 0
+        for key in keys:
+            previous = changes.get(key, _ABSENT)
+            if previous is _ABSENT:
+                if key not in base:
+                    continue
+                changes[key] = _REMOVED
+            elif previous is _REMOVED:
+                continue
+            elif key in base:
+                changes[key] = _REMOVED
+            else:
+                del changes[key]
+            self._owned.discard(key)
+            removed += 1
+        self._len -= removed
+
+    def getter(self):
+        """Returns a function looking keys up like get. While the version
+        has no changes it is the base dictionary's own get, which is
+        faster; either way it must not be used once the version changes."""
+        if not self._changes:
+            return self._base.get
+        return self.get
+
+    def __delitem__(self, key):
+        if self.pop(key, _ABSENT) is _ABSENT:
+            raise KeyError(key)
+
+    def pop(self, key, default=None):
+        """Removes a key and returns its value, or default if it is not
+        there."""
+        value = self.get(key, _ABSENT)
+        if value is _ABSENT:
+            return default
+        if key in self._base:
+            self._changes[key] = _REMOVED
+        else:
+            del self._changes[key]
+        self._owned.discard(key)
+        self._len -= 1
+        return value
+
+    def edit(self, key, copy, factory):
+        """Returns the value of a key that this version may change in
+        place.
+
+        Args:
+            key: The key.
+            copy: Called with a value shared with other versions, returns
+                this version's copy of it.
+            factory: Called without arguments to create a value for a key
+                that is not there yet.
+        """
+        value = self.get(key, _ABSENT)
+        if key in self._owned:
+            return value
+        value = factory() if value is _ABSENT else copy(value)
+        self[key] = value
+        self._owned.add(key)
+        return value
+
+    def fork(self) -> "CowDict":
+        """Returns a new version with the same contents."""
+        self._owned = set()
+        forked = CowDict.__new__(CowDict)
+        if len(self._changes) * 4 > len(self._base):
+            forked._base = dict(self.items())
+            forked._changes = {}
+        else:
+            forked._base = self._base
+            forked._changes = dict(self._changes)
+        forked._len = self._len
+        forked._owned = set()
+        return forked
+
+
+class ChunkedList:
+    """A class used to represent a list with cheap versions.
+
+    Items are stored in chunks of up to 2 * `chunk_size` items. Forking
+    copies the list of chunks, not the chunks; a version copies a chunk
+    the first time it changes it. Inserting and deleting move the items of
+    one chunk only, so the list also works as a sorted list that is cheap
+    to insert into, see insort.
+
+    As long as items are only appended and replaced, every chunk but the
+    last holds exactly `chunk_size` items and positions are found by
+    division instead of a binary search.
+    """
+
+    def __init__(self, items=(), chunk_size: int = 512):
+        """ChunkedList constructor.
+
+        Args:
+            items: The initial items.
+            chunk_size: How many items a chunk holds when the list is
+                built, and half of the most it holds.
+        """
+        items = list(items)
+        self._chunk_size = chunk_size
+        self._chunks = [items[start:start + chunk_size]
+                        for start in range(0, len(items), chunk_size)]
+        self._len = len(items)
+        # ids of the chunks this version created, which it may change.
+        self._owned = {id(chunk) for chunk in self._chunks}
+        # Whether every chunk but the last holds chunk_size items.
+        self._uniform = True
+        # Where each chunk starts, and the last item of each chunk, both
+        # computed when first needed.
+        self._offsets = None
+        self._lasts = None
+        self._lasts_owned = False
+
+    def __len__(self):
+        return self._len
+
+    def __iter__(self):
+        return chain.from_iterable(self._chunks)
+
+    def __getitem__(self, position):
+        """Returns the item at a position, or a list for a slice."""
+        if self._uniform and type(position) is int and \
+                0 <= position < self._len:
+            size = self._chunk_size
+            return self._chunks[position // size][position % size]
+        if isinstance(position, slice):
+            start, stop, step = position.indices(self._len)
+            if step != 1:
+                return list(self)[position]
+            if start >= stop:
+                return []
+            chunk, offset = self._locate(start)
+            return list(islice(self._iterate_from(chunk, offset),
+                               stop - start))
+        chunk, offset = self._locate(position)
+        return self._chunks[chunk][offset]
+
+    def __setitem__(self, position: int, item):
+        chunk, offset = self._locate(position)
+        self._writable(chunk)[offset] = item
+        self._update_last(chunk)
+
+    def __delitem__(self, position: int):
+        chunk, offset = self._locate(position)
+        self._delete(chunk, offset)
+
+    def append(self, item):
+        """Adds an item at the end."""
+        limit = self._chunk_size if self._uniform else 2 * self._chunk_size
+        if not self._chunks or len(self._chunks[-1]) >= limit:
+            chunk = []
+            self._owned.add(id(chunk))
+            self._chunks.append(chunk)
+            self._lasts = None
+        self._writable(len(self._chunks) - 1).append(item)
+        self._update_last(len(self._chunks) - 1)
+        self._len += 1
+        self._offsets = None
+
+    def insort(self, item):
+        """Inserts an item into a sorted list."""
+        chunk = self._chunk_for(item)
+        if chunk is None:
+            self.append(item)
+            return
+        writable = self._writable(chunk)
+        bisect.insort(writable, item)
+        self._uniform = False
+        self._len += 1
+        self._offsets = None
+        if len(writable) > 2 * self._chunk_size:
+            half = len(writable) // 2
+            tail = writable[half:]
+            del writable[half:]
+            self._owned.add(id(tail))
+            self._chunks.insert(chunk + 1, tail)
+            self._lasts = None
+        else:
+            self._update_last(chunk)
+
+    def remove(self, item) -> bool:
+        """Removes an item equal to item from a sorted list.
+
+        Returns:
+            False if there was none.
+        """
+        chunk = self._chunk_for(item)
+        if chunk is None:
+            return False
+        offset = bisect.bisect_left(self._chunks[chunk], item)
+        if offset == len(self._chunks[chunk]) or \
+                self._chunks[chunk][offset] != item:
+            return False
+        self._delete(chunk, offset)
+        return True
+
+    def bisect_left(self, item) -> int:
+        """Returns where item would be inserted into a sorted list, before
+        any equal items."""
+        chunk = self._chunk_for(item)
+        if chunk is None:
+            return self._len
+        self._ensure_offsets()
+        return self._offsets[chunk] + \
+            bisect.bisect_left(self._chunks[chunk], item)
+
+    def fork(self) -> "ChunkedList":
+        """Returns a new version with the same items."""
+        self._owned = set()
+        forked = ChunkedList.__new__(ChunkedList)
+        forked._chunk_size = self._chunk_size
+        forked._chunks = list(self._chunks)
+        forked._len = self._len
+        forked._owned = set()
+        forked._uniform = self._uniform
+        forked._offsets = self._offsets
+        forked._lasts = self._lasts
+        forked._lasts_owned = self._lasts_owned = False
+        return forked
+
+    def _writable(self, chunk: int):
+        """Returns a chunk this version may change, copying it if it is
+        shared."""
+        items = self._chunks[chunk]
+        if id(items) not in self._owned:
+            items = list(items)
+            self._chunks[chunk] = items
+            self._owned.add(id(items))
+        return items
+
+    def _delete(self, chunk, offset):
+        writable = self._writable(chunk)
+        del writable[offset]
+        self._uniform = False
+        if not writable:
+            del self._chunks[chunk]
+            self._owned.discard(id(writable))
+            self._lasts = None
+        else:
+            self._update_last(chunk)
+        self._len -= 1
+        self._offsets = None
+
+    def _update_last(self, chunk):
+        if self._lasts is None:
+            return
+        if not self._lasts_owned:
+            self._lasts = list(self._lasts)
+            self._lasts_owned = True
+        self._lasts[chunk] = self._chunks[chunk][-1]
+
+    def _ensure_offsets(self):
+        # Readers of a published version may call this at the same time,
+        # so the list is only stored once it is complete.
+        if self._offsets is None:
+            offsets = [0]
+            offsets.extend(accumulate(len(chunk) for chunk in self._chunks))
+            self._offsets = offsets
+
+    def _locate(self, position):
+        if position < 0:
+            position += self._len
+        if not 0 <= position < self._len:
+            raise IndexError("ChunkedList index out of range")
+        if self._uniform:
+            return divmod(position, self._chunk_size)
+        self._ensure_offsets()
+        chunk = bisect.bisect_right(self._offsets, position) - 1
+        return chunk, position - self._offsets[chunk]
+
+    def _chunk_for(self, item):
+        """Returns the first chunk whose last item is not less than item,
+        the last chunk if there is none, or None for an empty list."""
+        if not self._chunks:
+            return None
+        if self._lasts is None:
+            self._lasts = [chunk[-1] for chunk in self._chunks]
+            self._lasts_owned = True
+        chunk = bisect.bisect_left(self._lasts, item)
+        return min(chunk, len(self._chunks) - 1)
+
+    def _iterate_from(self, chunk, offset):
+        yield from islice(self._chunks[chunk], offset, None)
+        for items in islice(self._chunks, chunk + 1, None):
+            yield from items
+
+
+class AppendOnlyList:
+    """A class used to represent a list that versions share by only ever
+    appending to it.
+
+    Every version sees the first len(version) items of one underlying
+    list, so forking copies nothing and reads are plain list lookups.
+    Appending past the end another version already appended to copies the
+    list first. Like the other containers, only one thread may write to
+    the versions of a list at a time.
+    """
+
+    def __init__(self, items=()):
+        self._items = list(items)
+        self._len = len(self._items)
+
+    def __len__(self):
+        return self._len
+
+    def __iter__(self):
+        return islice(self._items, self._len)
+
+    def __getitem__(self, position: int):
+        if not 0 <= position < self._len:
+            raise IndexError("AppendOnlyList index out of range")
+        return self._items[position]
+
+    def shared(self) -> list:
+        """Returns the underlying list, for fast lookups. Its first
+        len(self) items are this version's, and it must not be changed."""
+        return self._items
+
+    def append(self, item):
+        """Adds an item at the end."""
+        if len(self._items) != self._len:
+            self._items = self._items[:self._len]
+        self._items.append(item)
+        self._len += 1
+
+    def fork(self) -> "AppendOnlyList":
+        """Returns a new version with the same items."""
+        forked = AppendOnlyList.__new__(AppendOnlyList)
+        forked._items = self._items
+        forked._len = self._len
+        return forked
+
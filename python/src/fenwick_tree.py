@@ -0,0 +1,111 @@
+"""A Fenwick tree over weights, used for weighted random selection."""
+
+from array import array
+import math
+from typing import Iterable, Optional
+
+
+def check_weight(weight: float):
+    """Raises ValueError unless weight is finite and not negative, which
+    every weight of a FenwickTree must be for its prefix sums to hold."""
+    if not 0 <= weight < math.inf:
+        raise ValueError(f"Invalid weight {weight!r}: weights must be "
+                         f"finite and greater or equal to 0")
+
+
+class FenwickTree:
+    """A class used to sample positions in proportion to their weight.
+
+    Changing one weight and finding the position a cumulative weight falls
+    into both take O(log n), so weights can be updated one at a time
+    without rebuilding anything.
+    """
+
+    def __init__(self, weights: Iterable[float] = ()):
+        """FenwickTree constructor. Builds the tree in O(n).
+
+        Args:
+            weights: The initial weight of every position.
+        """
+        self._values = array("d", weights)
+        self._tree = array("d", [0.0]) + self._values
+        size = len(self._values)
+        for i in range(1, size + 1):
+            parent = i + (i & -i)
+            if parent <= size:
+                self._tree[parent] += self._tree[i]
+
+    def __len__(self):
+        return len(self._values)
+
+    def get(self, position: int) -> float:
+        """Returns the weight of a position."""
+        return self._values[position]
+
+    def set(self, position: int, weight: float):
+        """Changes the weight of a position.
+
+        Args:
+            position: The position to change.
+            weight: The new weight, zero to never select the position.
+        """
+        if weight < 0:
+            raise ValueError("Weights cannot be negative")
+        delta = weight - self._values[position]
+        self._values[position] = weight
+        i = position + 1
+        while i < len(self._tree):
+            self._tree[i] += delta
+            i += i & -i
+
+    def extend(self, weights: Iterable[float]):
+        """Appends positions in O(log n) each, without rebuilding the
+        tree.
+
+        Args:
+            weights: The weight of every new position.
+        """
+        tree = self._tree
+        for weight in weights:
+            self._values.append(weight)
+            i = len(self._values)
+            # Node i sums the weights of (i - lowbit(i), i]: its own, and
+            # those of the nodes already covering the positions below it.
+            node = weight
+            low = i - (i & -i)
+            j = i - 1
+            while j > low:
+                node += tree[j]
+                j -= j & -j
+            tree.append(node)
+
+    def total(self) -> float:
+        """Returns the sum of all weights."""
+        total = 0.0
+        i = len(self._values)
+        while i > 0:
+            total += self._tree[i]
+            i -= i & -i
+        return total
+
+    def find(self, target: float) -> Optional[int]:
+        """Returns the position whose cumulative weight range contains
+        target, i.e. the first position where the running sum of weights
+        exceeds target. Returns None if target is not below the total.
+        """
+        position = 0
+        step = 1 << len(self._values).bit_length()
+        while step:
+            next_position = position + step
+            if next_position < len(self._tree) and \
+                    self._tree[next_position] <= target:
+                position = next_position
+                target -= self._tree[next_position]
+            step >>= 1
+        if position >= len(self._values):
+            return None
+        # Rounding can land on a position whose weight is zero; move on to
+        # the next position that can actually be selected.
+        while position < len(self._values) and not self._values[position]:
+            position += 1
+        return position if position < len(self._values) else None
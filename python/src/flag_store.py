@@ -0,0 +1,251 @@
+"""The flagged videos of a library, indexed by catalog ordinal."""
+
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .cow import CowDict
+
+# Marks an ordinal FlagStore.apply has not looked up yet.
+_UNKNOWN = object()
+
+
+class FlagSnapshot:
+    """A class used to represent the flags at one point in time.
+
+    The flags are a copy-on-write dictionary of catalog ordinal to flag
+    reason, so the next snapshot only records what it changes and shares
+    the rest.
+
+    A snapshot never changes, so it can be read from any thread without
+    locking.
+    """
+
+    def __init__(self, reasons=None):
+        """FlagSnapshot constructor.
+
+        Args:
+            reasons: A CowDict of ordinal to flag reason, never changed
+                afterwards.
+        """
+        self._reasons = reasons if reasons is not None else CowDict()
+
+    def __len__(self):
+        """Returns how many videos are flagged."""
+        return len(self._reasons)
+
+    def __bool__(self):
+        return bool(self._reasons)
+
+    def __contains__(self, ordinal: int) -> bool:
+        return ordinal in self._reasons
+
+    def reason(self, ordinal: int) -> Optional[str]:
+        """Returns why the video is flagged, or None if it is not."""
+        return self._reasons.get(ordinal)
+
+    def ordinals(self) -> Iterable[int]:
+        """Returns the ordinals of the flagged videos, in no particular
+        order."""
+        return self._reasons.keys()
+
+    def items(self) -> List[Tuple[int, str]]:
+        """Returns (ordinal, reason) for every flagged video, in ordinal
+        order."""
+        return sorted(self._reasons.items())
+
+
+class _FlagChanges:
+    """The next FlagSnapshot while it is being written."""
+
+    def __init__(self, snapshot):
+        self._reasons = snapshot._reasons.fork()
+
+    def __len__(self):
+        return len(self._reasons)
+
+    def __bool__(self):
+        return bool(self._reasons)
+
+    def __contains__(self, ordinal: int) -> bool:
+        return ordinal in self._reasons
+
+    def reason(self, ordinal: int) -> Optional[str]:
+        return self._reasons.get(ordinal)
+
+    def flag(self, ordinal: int, flag_reason: str) -> bool:
+        if ordinal in self._reasons:
+            return False
+        self._reasons[ordinal] = flag_reason
+        return True
+
+    def allow(self, ordinal: int) -> bool:
+        if ordinal not in self._reasons:
+            return False
+        del self._reasons[ordinal]
+        return True
+
+    def update(self, states: Dict[int, Optional[str]]):
+        """Sets the state of many ordinals at once.
+
+        Args:
+            states: The flag reason of every ordinal to flag, or None for
+                every ordinal to allow. The ordinals must not be in that
+                state already.
+        """
+        self._reasons.update(
+            (ordinal, flag_reason) for ordinal, flag_reason in states.items()
+            if flag_reason is not None)
+        self._reasons.remove_all(
+            ordinal for ordinal, flag_reason in states.items()
+            if flag_reason is None)
+
+    def snapshot(self, final=False) -> FlagSnapshot:
+        """Returns the changes so far as a FlagSnapshot. Unless final, the
+        changes can go on without affecting it."""
+        if final:
+            # Nothing writes to the changes again, so the reasons can be
+            # handed over as they are.
+            return FlagSnapshot(self._reasons)
+        return FlagSnapshot(self._reasons.fork())
+
+
+class FlagStore:
+    """A class used to keep which videos are flagged, and why.
+
+    The flags are published as immutable FlagSnapshots. Reads use the
+    current snapshot and never wait; use snapshot() to make several reads
+    against the same flags. Changes are serialized by a lock, written to
+    the next snapshot and published by replacing one reference. Inside a
+    batch every change is published at once when the batch ends, so
+    readers see a whole moderation feed applied or none of it, while the
+    thread running the batch sees its own changes as it makes them.
+    """
+
+    def __init__(self):
+        self._snapshot = FlagSnapshot()
+        self._lock = threading.RLock()
+        self._changes = None
+        self._writer = None
+
+    def snapshot(self) -> FlagSnapshot:
+        """Returns the current flags, which never change."""
+        if self._writing():
+            return self._changes.snapshot()
+        return self._snapshot
+
+    def __len__(self):
+        """Returns how many videos are flagged."""
+        return len(self._reading())
+
+    def __bool__(self):
+        return bool(self._reading())
+
+    def __contains__(self, ordinal: int) -> bool:
+        return ordinal in self._reading()
+
+    def reason(self, ordinal: int) -> Optional[str]:
+        """Returns why the video is flagged, or None if it is not."""
+        return self._reading().reason(ordinal)
+
+    def items(self) -> List[Tuple[int, str]]:
+        """Returns (ordinal, reason) for every flagged video, in ordinal
+        order."""
+        return self.snapshot().items()
+
+    @contextmanager
+    def batch(self):
+        """Collects the flag and allow calls of a with block and publishes
+        them together when it ends. Batches on the same thread nest; other
+        writers wait for the batch to end. Nothing is published if the
+        block raises."""
+        with self._lock:
+            if self._changes is not None:
+                yield
+                return
+            self._changes = _FlagChanges(self._snapshot)
+            self._writer = threading.get_ident()
+            try:
+                yield
+                self._snapshot = self._changes.snapshot(final=True)
+            finally:
+                self._changes = self._writer = None
+
+    def _writing(self) -> bool:
+        """Returns whether this thread is running a batch."""
+        return self._writer == threading.get_ident() and \
+            self._changes is not None
+
+    def _reading(self):
+        return self._changes if self._writing() else self._snapshot
+
+    def flag(self, ordinal: int, flag_reason: str) -> bool:
+        """Flags a video.
+
+        Returns:
+            False if the video was already flagged.
+        """
+        return self._change(_FlagChanges.flag, ordinal, flag_reason)
+
+    def allow(self, ordinal: int) -> bool:
+        """Removes the flag from a video.
+
+        Returns:
+            False if the video was not flagged.
+        """
+        return self._change(_FlagChanges.allow, ordinal)
+
+    def apply(self, decisions: Iterable[Tuple[int, Optional[str]]]) \
+            -> Tuple[int, int, Dict[int, Optional[str]]]:
+        """Flags and allows many videos in one batch.
+
+        The decisions are played in order against a plain dictionary of
+        the ordinals they touch, and only the ordinals whose state ends up
+        changed are written to the reasons, once each.
+
+        Args:
+            decisions: (ordinal, flag_reason) pairs, with a flag_reason of
+                None to allow the video.
+
+        Returns:
+            A (flagged, allowed, changed) tuple: how many decisions flagged
+            or allowed a video, the others finding it in that state
+            already, and the new flag reason, or None, of every ordinal
+            whose state changed.
+        """
+        with self.batch():
+            changes = self._changes
+            known = changes._reasons.getter()
+            states = {}
+            flagged = allowed = 0
+            for ordinal, flag_reason in decisions:
+                state = states.get(ordinal, _UNKNOWN)
+                if state is _UNKNOWN:
+                    state = known(ordinal)
+                if flag_reason is None:
+                    if state is None:
+                        continue
+                    allowed += 1
+                elif state is not None:
+                    continue
+                else:
+                    flagged += 1
+                states[ordinal] = flag_reason
+            changed = {ordinal: flag_reason
+                       for ordinal, flag_reason in states.items()
+                       if known(ordinal) != flag_reason}
+            changes.update(changed)
+        return flagged, allowed, changed
+
+    def _change(self, change, *args) -> bool:
+        """Applies a change to the current batch, or publishes it on its
+        own if there is none."""
+        with self._lock:
+            if self._changes is not None:
+                return change(self._changes, *args)
+            changes = _FlagChanges(self._snapshot)
+            if not change(changes, *args):
+                return False
+            self._snapshot = changes.snapshot(final=True)
+            return True
+
@@ -0,0 +1,99 @@
+"""A benchmark of how much memory a loaded catalog takes per video.
+
+It loads the same generated catalog twice and compares the bytes allocated
+per video by:
+
+    before  the original Video: a __dict__ per video holding the title, id,
+            tags and the playing/paused flags, and a new tuple of new tag
+            strings for every video
+    after   the current Video: __slots__, no playback state, and tag tuples
+            of interned strings shared through a TagPool
+
+    python3 -m src.memory_benchmark --videos 1000000
+"""
+
+import argparse
+import gc
+import os
+import sys
+import tempfile
+import tracemalloc
+
+from .catalog_generator import CatalogSpec, write_catalog
+from .video_catalog import load_videos, read_video_rows
+
+
+class _DictVideo:
+    """The Video class as it was before it used __slots__."""
+
+    def __init__(self, video_title, video_id, video_tags):
+        self._title = video_title
+        self._video_id = video_id
+        self.playing = 0
+        self.paused = 0
+        self._tags = tuple(video_tags)
+
+
+def _load_dict_videos(path):
+    videos = {}
+    for title, url, tags in read_video_rows(path):
+        videos[url] = _DictVideo(title, url, tags)
+    return videos
+
+
+def _allocated_by(load, path):
+    """Returns how many bytes the result of load(path) keeps allocated."""
+    gc.collect()
+    tracemalloc.start()
+    videos = load(path)
+    allocated = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del videos
+    return allocated
+
+
+def measure(path) -> dict:
+    """Measures the memory taken by a catalog file with both Video
+    representations.
+
+    Returns:
+        The number of videos and the bytes per video before and after.
+    """
+    count = sum(1 for _ in read_video_rows(path))
+    before = _allocated_by(_load_dict_videos, path)
+    after = _allocated_by(load_videos, path)
+    return {
+        "videos": count,
+        "before_bytes_per_video": before / count,
+        "after_bytes_per_video": after / count,
+    }
+
+
+def main(argv=None):
+    """Runs the memory benchmark from the command line."""
+    arguments = argparse.ArgumentParser(
+        description="Compares the memory taken per video.")
+    arguments.add_argument("--videos", type=int, default=100000,
+                           help="videos to generate (default %(default)s)")
+    arguments.add_argument("--catalog", metavar="FILE",
+                           help="measure an existing videos.txt instead")
+    options = arguments.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        path = options.catalog
+        if path is None:
+            path = os.path.join(workdir, "videos.txt")
+            write_catalog(path, CatalogSpec(videos=options.videos))
+        result = measure(path)
+
+    before = result["before_bytes_per_video"]
+    after = result["after_bytes_per_video"]
+    print(f"{result['videos']} videos")
+    print(f"before: {before:8.1f} bytes per video")
+    print(f"after:  {after:8.1f} bytes per video "
+          f"({1 - after / before:.0%} less)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,46 @@
+"""Reading moderation feeds for bulk FLAG_VIDEO / ALLOW_VIDEO."""
+
+import csv
+from typing import Iterable, Iterator, NamedTuple
+
+FLAG = "FLAG"
+ALLOW = "ALLOW"
+
+
+class ModerationRecord(NamedTuple):
+    """A class used to represent one decision of a moderation feed."""
+    video_id: str
+    action: str
+    reason: str = ""
+
+
+def parse_moderation_feed(lines: Iterable[str]) -> Iterator[ModerationRecord]:
+    """Parses moderation feed lines.
+
+    Each line is `video_id | action | reason`, where action is FLAG or
+    ALLOW (in any case) and the reason is optional. Blank lines are
+    skipped.
+
+    Args:
+        lines: The feed lines, e.g. an open file.
+    """
+    make = ModerationRecord._make
+    for row in csv.reader(lines, delimiter="|"):
+        # Unrolled, feeds run to millions of lines.
+        count = len(row)
+        if count > 2:
+            fields = (row[0].strip(), row[1].strip().upper(), row[2].strip())
+        elif count == 2:
+            fields = (row[0].strip(), row[1].strip().upper(), "")
+        elif count == 1:
+            fields = (row[0].strip(), "", "")
+        else:
+            continue
+        if any(fields):
+            yield make(fields)
+
+
+def read_moderation_feed(path) -> Iterator[ModerationRecord]:
+    """Yields the records of a moderation feed file."""
+    with open(path, encoding="utf-8") as feed_file:
+        yield from parse_moderation_feed(feed_file)
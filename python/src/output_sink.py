@@ -0,0 +1,102 @@
+"""Output sinks the video player writes its messages to."""
+
+import sys
+from typing import List
+
+
+class OutputSink:
+    """A class used to represent where the player's output goes.
+
+    Sinks receive text exactly as print() would have written it, newlines
+    included. The base class writes straight to the current sys.stdout,
+    which behaves like print().
+    """
+
+    def write(self, text: str):
+        """Writes text to the sink."""
+        sys.stdout.write(text)
+
+    def flush(self):
+        """Makes sure everything written so far has been delivered."""
+        sys.stdout.flush()
+
+
+class BufferedSink(OutputSink):
+    """A sink that collects text and writes it to a stream in large chunks.
+
+    Call flush (or use the sink as a context manager) to write out what is
+    left once the output is complete.
+    """
+
+    def __init__(self, stream=None, chunk_size: int = 1 << 16):
+        """BufferedSink constructor.
+
+        Args:
+            stream: The file object to write to, sys.stdout by default.
+            chunk_size: How many characters to collect before writing.
+        """
+        self._stream = stream
+        self._chunk_size = chunk_size
+        self._parts = []
+        self._size = 0
+
+    def write(self, text: str):
+        self._parts.append(text)
+        self._size += len(text)
+        if self._size >= self._chunk_size:
+            self._write_out()
+
+    def flush(self):
+        self._write_out()
+        self._target().flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.flush()
+
+    def _target(self):
+        return self._stream if self._stream is not None else sys.stdout
+
+    def _write_out(self):
+        if self._parts:
+            self._target().write("".join(self._parts))
+            self._parts = []
+            self._size = 0
+
+
+class ListSink(OutputSink):
+    """A sink that keeps everything in memory, e.g. for tests or to send it
+    somewhere else in one piece."""
+
+    def __init__(self):
+        self._parts = []
+
+    def write(self, text: str):
+        self._parts.append(text)
+
+    def flush(self):
+        pass
+
+    def getvalue(self) -> str:
+        """Returns everything written so far."""
+        return "".join(self._parts)
+
+    def lines(self) -> List[str]:
+        """Returns everything written so far, split into lines."""
+        return self.getvalue().splitlines()
+
+    def clear(self):
+        """Forgets everything written so far."""
+        self._parts = []
+
+
+class NullSink(OutputSink):
+    """A sink that throws all output away, e.g. for benchmarks."""
+
+    def write(self, text: str):
+        pass
+
+    def flush(self):
+        pass
@@ -0,0 +1,81 @@
+"""A playlist library class."""
+
+import bisect
+from typing import Iterator, List, Optional
+
+from .video_playlist import Playlist
+
+
+def _playlist_key(playlist_name: str) -> str:
+    """Playlist names are not case sensitive."""
+    return playlist_name.lower()
+
+
+class PlaylistLibrary:
+    """A class used to hold the playlists of one player.
+
+    Playlists are found through a dictionary keyed by the lowercase name,
+    and the lowercase names are also kept in a sorted list that is updated
+    with a binary search on every create and delete, so listing the
+    playlists never sorts them. The playlists holding each video are
+    indexed by video_id, so a video can be followed into the playlists
+    holding it without looking at the others.
+    """
+
+    def __init__(self):
+        self._playlists = {}
+        self._sorted_keys = []
+        # video_id -> {playlist: None}, kept up to date by the playlists.
+        self._holding = {}
+
+    def __contains__(self, playlist_name: str) -> bool:
+        return _playlist_key(playlist_name) in self._playlists
+
+    def __len__(self):
+        return len(self._playlists)
+
+    def __iter__(self) -> Iterator[Playlist]:
+        """Iterates over the playlists sorted by lowercase name."""
+        return (self._playlists[key] for key in self._sorted_keys)
+
+    def get(self, playlist_name: str) -> Optional[Playlist]:
+        """Returns the playlist with the given name, ignoring case, or None
+        if it does not exist."""
+        return self._playlists.get(_playlist_key(playlist_name))
+
+    def create(self, playlist_name: str) -> Optional[Playlist]:
+        """Creates an empty playlist.
+
+        Returns:
+            The new playlist, or None if a playlist with the same name
+            already exists.
+        """
+        key = _playlist_key(playlist_name)
+        if key in self._playlists:
+            return None
+        playlist = Playlist(playlist_name, self._holding)
+        self._playlists[key] = playlist
+        bisect.insort(self._sorted_keys, key)
+        return playlist
+
+    def delete(self, playlist_name: str) -> Optional[Playlist]:
+        """Deletes a playlist.
+
+        Returns:
+            The deleted playlist, or None if it did not exist.
+        """
+        key = _playlist_key(playlist_name)
+        playlist = self._playlists.pop(key, None)
+        if playlist is not None:
+            del self._sorted_keys[bisect.bisect_left(self._sorted_keys, key)]
+            playlist.detach()
+        return playlist
+
+    def holding(self, video_id: str) -> List[Playlist]:
+        """Returns the playlists holding a video, sorted by lowercase
+        name."""
+        playlists = self._holding.get(video_id)
+        if not playlists:
+            return []
+        return sorted(playlists, key=lambda playlist:
+                      _playlist_key(playlist.playlist_name))
@@ -0,0 +1,257 @@
+"""Durable playlist storage: a write-ahead log plus compacted snapshots."""
+
+import json
+import os
+import threading
+import time
+from typing import Dict, List, Tuple
+
+CREATE = "create"
+ADD = "add"
+REMOVE = "remove"
+CLEAR = "clear"
+DELETE = "delete"
+
+LOG_FILE = "playlists.log"
+SNAPSHOT_FILE = "playlists.snapshot.json"
+
+
+def _key(playlist_name: str) -> str:
+    """Playlist names are not case sensitive."""
+    return playlist_name.lower()
+
+
+class PlaylistStore:
+    """A class used to keep playlists across restarts.
+
+    Every playlist change is appended to a log as one JSON line numbered
+    with a sequence number. Appends are buffered and the log is only
+    fsynced once `sync_every` changes are waiting or `sync_interval`
+    seconds have passed since the oldest of them (group commit), so a
+    crash can lose at most that window of changes. A timer syncs the log
+    when the interval runs out, even if no other change comes. Every `snapshot_every`
+    changes the playlists are written to a snapshot and the log starts
+    over, which keeps startup from replaying the whole history: opening a
+    store loads the snapshot and replays only the log records newer than
+    it.
+
+    The store keeps its own copy of the playlists as names and video ids.
+    It does not check that videos exist; the VideoPlayer only records
+    changes that succeeded.
+    """
+
+    def __init__(self, directory, sync_every: int = 64,
+                 sync_interval: float = 1.0, snapshot_every: int = 10000):
+        """PlaylistStore constructor. Loads the stored playlists.
+
+        Args:
+            directory: The directory holding the log and the snapshot. It
+                is created if needed.
+            sync_every: How many changes are written before the log is
+                fsynced. 1 fsyncs every change.
+            sync_interval: The longest, in seconds, a change waits to be
+                fsynced.
+            snapshot_every: How many changes are logged before a snapshot
+                is written and the log is emptied.
+        """
+        self._directory = directory
+        self._log_path = os.path.join(directory, LOG_FILE)
+        self._snapshot_path = os.path.join(directory, SNAPSHOT_FILE)
+        self._sync_every = sync_every
+        self._sync_interval = sync_interval
+        self._snapshot_every = snapshot_every
+        self._lock = threading.Lock()
+        # lowercase name -> (name, {video_id: None}), in creation order
+        self._playlists: Dict[str, Tuple[str, Dict[str, None]]] = {}
+        self._sequence = 0
+        self._logged = 0
+        self._unsynced = 0
+        self._oldest_unsynced = None
+        self._sync_timer = None
+        # How many log records the last load replayed after the snapshot.
+        self.replayed = 0
+
+        os.makedirs(directory, exist_ok=True)
+        self._load()
+        self._log = open(self._log_path, "a", encoding="utf-8")
+
+    @property
+    def sequence(self) -> int:
+        """Returns the sequence number of the last recorded change."""
+        return self._sequence
+
+    def playlists(self) -> List[Tuple[str, List[str]]]:
+        """Returns every stored playlist as (name, video_ids), in creation
+        order."""
+        with self._lock:
+            return [(name, list(video_ids))
+                    for name, video_ids in self._playlists.values()]
+
+    def create(self, playlist_name: str):
+        """Records that a playlist was created."""
+        self._record(CREATE, playlist_name)
+
+    def add(self, playlist_name: str, video_id: str):
+        """Records that a video was added to a playlist."""
+        self._record(ADD, playlist_name, video_id)
+
+    def remove(self, playlist_name: str, video_id: str):
+        """Records that a video was removed from a playlist."""
+        self._record(REMOVE, playlist_name, video_id)
+
+    def clear(self, playlist_name: str):
+        """Records that every video was removed from a playlist."""
+        self._record(CLEAR, playlist_name)
+
+    def delete(self, playlist_name: str):
+        """Records that a playlist was deleted."""
+        self._record(DELETE, playlist_name)
+
+    def sync(self):
+        """Writes every recorded change to disk."""
+        with self._lock:
+            self._sync()
+
+    def snapshot(self):
+        """Writes a snapshot of the playlists and empties the log."""
+        with self._lock:
+            self._snapshot()
+
+    def close(self):
+        """Syncs the log and closes it."""
+        with self._lock:
+            if not self._log.closed:
+                self._sync()
+                self._log.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _record(self, operation, playlist_name, video_id=None):
+        with self._lock:
+            self._sequence += 1
+            record = [self._sequence, operation, playlist_name]
+            if video_id is not None:
+                record.append(video_id)
+            self._apply(operation, playlist_name, video_id)
+            self._log.write(json.dumps(record, ensure_ascii=False) + "\n")
+            self._logged += 1
+            self._unsynced += 1
+            now = time.monotonic()
+            if self._oldest_unsynced is None:
+                self._oldest_unsynced = now
+            if self._logged >= self._snapshot_every:
+                self._snapshot()
+            elif self._unsynced >= self._sync_every or \
+                    now - self._oldest_unsynced >= self._sync_interval:
+                self._sync()
+            elif self._sync_timer is None:
+                self._sync_timer = threading.Timer(
+                    self._sync_interval, self._sync_when_due)
+                self._sync_timer.daemon = True
+                self._sync_timer.start()
+
+    def _sync_when_due(self):
+        """Syncs the changes the timer was started for, unless something
+        synced them already or the store was closed."""
+        with self._lock:
+            self._sync_timer = None
+            if not self._log.closed:
+                self._sync()
+
+    def _sync(self):
+        if self._sync_timer is not None:
+            self._sync_timer.cancel()
+            self._sync_timer = None
+        if not self._unsynced:
+            return
+        self._log.flush()
+        os.fsync(self._log.fileno())
+        self._unsynced = 0
+        self._oldest_unsynced = None
+
+    def _snapshot(self):
+        state = {
+            "sequence": self._sequence,
+            "playlists": [[name, list(video_ids)]
+                          for name, video_ids in self._playlists.values()],
+        }
+        temporary = self._snapshot_path + ".tmp"
+        with open(temporary, "w", encoding="utf-8") as snapshot_file:
+            json.dump(state, snapshot_file, ensure_ascii=False)
+            snapshot_file.flush()
+            os.fsync(snapshot_file.fileno())
+        os.replace(temporary, self._snapshot_path)
+        self._sync_directory()
+        # Log records up to the snapshot's sequence number are skipped on
+        # load, so a crash before the log is emptied loses nothing.
+        self._log.close()
+        self._log = open(self._log_path, "w", encoding="utf-8")
+        self._sync_directory()
+        self._logged = 0
+        self._unsynced = 0
+        self._oldest_unsynced = None
+
+    def _sync_directory(self):
+        if not hasattr(os, "O_DIRECTORY"):  # Windows
+            return
+        descriptor = os.open(self._directory, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(descriptor)
+        finally:
+            os.close(descriptor)
+
+    def _load(self):
+        snapshot_sequence = 0
+        if os.path.exists(self._snapshot_path):
+            with open(self._snapshot_path, encoding="utf-8") as snapshot_file:
+                state = json.load(snapshot_file)
+            snapshot_sequence = state["sequence"]
+            for name, video_ids in state["playlists"]:
+                self._playlists[_key(name)] = (name, dict.fromkeys(video_ids))
+        self._sequence = snapshot_sequence
+
+        if not os.path.exists(self._log_path):
+            return
+        with open(self._log_path, "rb+") as log_file:
+            valid = 0
+            for line in log_file:
+                try:
+                    record = json.loads(line) if line.endswith(b"\n") \
+                        else None
+                except ValueError:
+                    record = None
+                if record is None:
+                    # Cut short by a crash; nothing after it was synced.
+                    log_file.truncate(valid)
+                    break
+                valid += len(line)
+                sequence, operation, playlist_name = record[:3]
+                if sequence <= snapshot_sequence:
+                    continue
+                self._apply(operation, playlist_name,
+                            record[3] if len(record) > 3 else None)
+                self._sequence = sequence
+                self._logged += 1
+                self.replayed += 1
+
+    def _apply(self, operation, playlist_name, video_id):
+        key = _key(playlist_name)
+        if operation == CREATE:
+            self._playlists.setdefault(key, (playlist_name, {}))
+            return
+        if key not in self._playlists:
+            return
+        video_ids = self._playlists[key][1]
+        if operation == ADD:
+            video_ids[video_id] = None
+        elif operation == REMOVE:
+            video_ids.pop(video_id, None)
+        elif operation == CLEAR:
+            video_ids.clear()
+        elif operation == DELETE:
+            del self._playlists[key]
+
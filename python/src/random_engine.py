@@ -0,0 +1,75 @@
+"""The random selection engine behind PLAY_RANDOM."""
+
+import random
+from collections import deque
+from typing import Mapping, Optional
+
+from .fenwick_tree import check_weight
+from .video import Video
+
+
+class RandomEngine:
+    """A class used to pick random videos for one player.
+
+    Every engine has its own random number generator, so seeding it makes
+    PLAY_RANDOM reproducible. Videos can be weighted to play popular ones
+    more often, and a no-repeat window keeps the last few picks from being
+    picked again.
+    """
+
+    def __init__(self, video_library, seed=None, no_repeat: int = 0):
+        """RandomEngine constructor.
+
+        Args:
+            video_library: The VideoLibrary to pick videos from.
+            seed: The seed of the random number generator. None seeds it
+                from the operating system.
+            no_repeat: How many of the most recent picks cannot be picked
+                again.
+        """
+        self._library = video_library
+        self.rng = random.Random(seed)
+        self._no_repeat = no_repeat
+        self._recent = deque()
+
+    def choose(self) -> Optional[Video]:
+        """Returns a random allowed video, or None if there is none.
+
+        If every allowed video is in the no-repeat window, the oldest ones
+        are released until a video can be picked.
+        """
+        video = self._library.get_random_video(self.rng)
+        while video is None and self._recent:
+            self._library.release_random(self._recent.popleft())
+            video = self._library.get_random_video(self.rng)
+
+        if video is not None and self._no_repeat:
+            self._recent.append(video.video_id)
+            self._library.hold_random(video.video_id)
+            if len(self._recent) > self._no_repeat:
+                self._library.release_random(self._recent.popleft())
+        return video
+
+    def set_weight(self, video_id: str, weight: float) -> bool:
+        """Sets the relative weight of a video, 1 by default.
+
+        Returns:
+            False if the video does not exist.
+
+        Raises:
+            ValueError: If the weight is negative or not finite.
+        """
+        return self._library.set_weight(video_id, weight)
+
+    def set_weights(self, weights: Mapping[str, float]):
+        """Sets the relative weights of many videos, e.g. a popularity
+        column keyed by video_id.
+
+        Raises:
+            ValueError: If a weight is negative or not finite. No weight
+                is changed then.
+        """
+        for weight in weights.values():
+            check_weight(weight)
+        for video_id, weight in weights.items():
+            self._library.set_weight(video_id, weight)
@@ -1,21 +1,139 @@
 """A youtube terminal simulator."""
+import argparse
+import sys
+import time
+
 from .video_player import VideoPlayer
 from .command_parser import CommandException
 from .command_parser import CommandParser
+from .output_sink import BufferedSink
+from .playlist_store import PlaylistStore
 
 
-if __name__ == "__main__":
+def run_interactive(catalog_path=None, playlist_store=None, watch=False):
+    """Reads commands from the user until EXIT.
+
+    Args:
+        catalog_path: An optional catalog file to use instead of the bundled
+            videos.txt.
+        playlist_store: An optional PlaylistStore keeping the playlists.
+        watch: Whether to pick up changes of the catalog file before every
+            command.
+    """
     print("""Hello and welcome to YouTube, what would you like to do?
     Enter HELP for list of available commands or EXIT to terminate.""")
-    video_player = VideoPlayer()
+    video_player = VideoPlayer(catalog_path=catalog_path,
+                               playlist_store=playlist_store)
     parser = CommandParser(video_player)
     while True:
         command = input("YT> ")
         if command.upper() == "EXIT":
             break
+        if watch:
+            video_player.poll_catalog()
         try:
             parser.execute_command(command.split())
         except CommandException as e:
             print(e)
     print("YouTube has now terminated its execution. "
           "Thank you and goodbye!")
+
+
+def run_batch(lines, out, catalog_path=None, playlist_store=None,
+              watch=False):
+    """Executes every command of a script without prompting.
+
+    The line after a SEARCH_VIDEOS or SEARCH_VIDEOS_WITH_TAG command that
+    has results is used as the answer to "Would you like to play any of the
+    above?", exactly like when the script is typed in. The script stops at
+    EXIT or at the end of the input.
+
+    Args:
+        lines: An iterable of command lines, e.g. an open file.
+        out: The OutputSink everything is written to.
+        catalog_path: An optional catalog file to use instead of the bundled
+            videos.txt.
+        playlist_store: An optional PlaylistStore keeping the playlists.
+        watch: Whether to pick up changes of the catalog file before every
+            command.
+
+    Returns:
+        The number of commands executed.
+    """
+    lines = iter(lines)
+
+    def answer_from_script(prompt):
+        out.write(prompt)
+        return next(lines, "").rstrip("\n")
+
+    video_player = VideoPlayer(
+        ask=answer_from_script, out=out, catalog_path=catalog_path,
+        playlist_store=playlist_store)
+    parser = CommandParser(video_player)
+    count = 0
+    for line in lines:
+        command = line.rstrip("\n")
+        if command.upper() == "EXIT":
+            break
+        count += 1
+        if watch:
+            video_player.poll_catalog()
+        try:
+            parser.execute_command(command.split())
+        except CommandException as e:
+            out.write(f"{e}\n")
+    return count
+
+
+def main(argv=None):
+    arguments = argparse.ArgumentParser(description=__doc__)
+    arguments.add_argument(
+        "--batch", metavar="FILE",
+        help="run the commands in FILE ('-' for standard input) without "
+             "prompting and report the throughput on standard error")
+    arguments.add_argument(
+        "--catalog", metavar="FILE",
+        help="load the videos from FILE, a videos.txt formatted file or a "
+             "compiled snapshot, instead of the bundled videos.txt")
+    arguments.add_argument(
+        "--data-dir", metavar="DIR",
+        help="keep the playlists in DIR so they survive EXIT")
+    arguments.add_argument(
+        "--watch", action="store_true",
+        help="reload the catalog file whenever it changes, checked before "
+             "every command")
+    options = arguments.parse_args(argv)
+
+    playlist_store = None
+    if options.data_dir is not None:
+        playlist_store = PlaylistStore(options.data_dir)
+    try:
+        _run(options, playlist_store)
+    finally:
+        if playlist_store is not None:
+            playlist_store.close()
+
+
+def _run(options, playlist_store):
+    """Runs interactively or in batch mode, depending on the options."""
+    if options.batch is None:
+        run_interactive(options.catalog, playlist_store, options.watch)
+        return
+
+    start = time.perf_counter()
+    with BufferedSink(sys.stdout) as out:
+        if options.batch == "-":
+            count = run_batch(sys.stdin, out, options.catalog,
+                              playlist_store, options.watch)
+        else:
+            with open(options.batch) as script:
+                count = run_batch(script, out, options.catalog,
+                                  playlist_store, options.watch)
+    elapsed = time.perf_counter() - start
+    rate = count / elapsed if elapsed else float("inf")
+    print(f"Executed {count} commands in {elapsed:.3f}s "
+          f"({rate:.0f} commands/sec)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
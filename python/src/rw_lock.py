@@ -0,0 +1,89 @@
+"""Locks for sharing a player between threads."""
+
+import threading
+from contextlib import contextmanager
+
+
+class ReadWriteLock:
+    """A class used to let many readers or a single writer in at a time.
+
+    Writers are preferred: once a writer is waiting, new readers wait
+    behind it, so a steady stream of reads cannot starve writes. The lock
+    is not reentrant.
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writing = False
+        self._waiting_writers = 0
+
+    @contextmanager
+    def read(self):
+        """Holds the lock shared for the duration of a with block."""
+        with self._condition:
+            while self._writing or self._waiting_writers:
+                self._condition.wait()
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._readers -= 1
+                if not self._readers:
+                    self._condition.notify_all()
+
+    @contextmanager
+    def write(self):
+        """Holds the lock exclusively for the duration of a with block."""
+        with self._condition:
+            self._waiting_writers += 1
+            try:
+                while self._writing or self._readers:
+                    self._condition.wait()
+            finally:
+                self._waiting_writers -= 1
+            self._writing = True
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._writing = False
+                self._condition.notify_all()
+
+
+class KeyedLocks:
+    """A class used to lock individual keys, such as one playlist or one
+    video, without a lock object per key.
+
+    Keys are hashed onto a fixed number of stripes. Locking several keys
+    takes their stripes in stripe order, so two threads locking the same
+    keys in a different order cannot deadlock. Two keys may share a
+    stripe, which only costs concurrency.
+    """
+
+    def __init__(self, stripes: int = 64):
+        """KeyedLocks constructor.
+
+        Args:
+            stripes: The number of locks the keys are spread over.
+        """
+        self._stripes = [threading.Lock() for _ in range(stripes)]
+
+    @contextmanager
+    def hold(self, *keys):
+        """Holds the locks of every key for the duration of a with block."""
+        stripes = sorted({hash(key) % len(self._stripes) for key in keys})
+        locks = [self._stripes[stripe] for stripe in stripes]
+        for position, lock in enumerate(locks):
+            try:
+                lock.acquire()
+            except BaseException:
+                for taken in reversed(locks[:position]):
+                    taken.release()
+                raise
+        try:
+            yield
+        finally:
+            for lock in reversed(locks):
+                lock.release()
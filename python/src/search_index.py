@@ -0,0 +1,178 @@
+"""An n-gram index for substring searches over video titles."""
+
+from typing import List
+
+from .cow import AppendOnlyList, ChunkedList, CowDict
+from .video import Video
+
+# How many removed videos the index keeps slots for before compacting, at
+# least. It also compacts once they outnumber the videos it holds.
+COMPACT_AFTER = 1024
+
+
+def _ngrams(text: str, n: int):
+    """Returns the set of all n character long substrings of text."""
+    return {text[i:i + n] for i in range(len(text) - n + 1)}
+
+
+class NgramIndex:
+    """A class used to find the videos whose title contains a search term.
+
+    Every lowercased title is split into overlapping n-grams and each n-gram
+    keeps a posting list of the videos containing it. A search term of at
+    least n characters can only match videos present in the posting list
+    of every one of its n-grams, so only the videos of its shortest posting
+    list are checked. Shorter terms fall back to checking every title.
+
+    Like the posting lists of TagIndex, every posting list is kept sorted
+    by title, and then by the order the videos were added in, so results
+    come back in title order without sorting them.
+
+    The index is built from copy-on-write containers, so fork returns a
+    copy to change while the original keeps serving searches. Versions
+    share the titles and videos by ordinal, which only grow, so removing
+    or replacing a video leaves its old slot behind. Once those slots
+    outnumber the videos, the index is rebuilt from the remaining ones,
+    which keeps its memory proportional to the videos it holds.
+    """
+
+    def __init__(self, n: int = 3):
+        self._n = n
+        self._postings = CowDict()
+        # Every (title, ordinal) key in the index, in title order.
+        self._keys = ChunkedList()
+        self._ordinals = CowDict()
+        self._titles = AppendOnlyList()
+        self._videos = AppendOnlyList()
+        # Slots of _titles and _videos left behind by removed videos.
+        self._removed = 0
+
+    def __len__(self):
+        return len(self._ordinals)
+
+    def fork(self) -> "NgramIndex":
+        """Returns a copy of the index sharing its storage with this one.
+        This index must not be changed afterwards."""
+        forked = NgramIndex.__new__(NgramIndex)
+        forked._n = self._n
+        forked._postings = self._postings.fork()
+        forked._keys = self._keys.fork()
+        forked._ordinals = self._ordinals.fork()
+        forked._titles = self._titles.fork()
+        forked._videos = self._videos.fork()
+        forked._removed = self._removed
+        return forked
+
+    def add(self, video: Video):
+        """Adds a video to the index.
+
+        Args:
+            video: The video to index. A video already in the index with the
+                same video_id is replaced.
+        """
+        if video.video_id in self._ordinals:
+            self.remove(video.video_id)
+        ordinal = len(self._videos)
+        title = video.title.lower()
+        key = (video.title, ordinal)
+        self._ordinals[video.video_id] = ordinal
+        self._titles.append(title)
+        self._videos.append(video)
+        self._keys.insort(key)
+        for gram in _ngrams(title, self._n):
+            self._postings.edit(gram, ChunkedList.fork, ChunkedList).insort(key)
+
+    def add_all(self, videos):
+        """Adds many videos with distinct video_ids.
+
+        Args:
+            videos: An iterable of videos. Into an empty index they are
+                sorted once and the posting lists are filled in title order,
+                without the bookkeeping of copy-on-write.
+        """
+        if self._ordinals:
+            for video in videos:
+                self.add(video)
+            return
+        self._build(videos)
+
+    def _build(self, videos):
+        """Replaces the whole index with one of videos with distinct
+        video_ids."""
+        ordinals = {}
+        titles = []
+        indexed = []
+        for ordinal, video in enumerate(videos):
+            ordinals[video.video_id] = ordinal
+            titles.append(video.title.lower())
+            indexed.append(video)
+        keys = sorted((video.title, ordinal)
+                      for ordinal, video in enumerate(indexed))
+        postings = {}
+        for key in keys:
+            for gram in _ngrams(titles[key[1]], self._n):
+                posting = postings.get(gram)
+                if posting is None:
+                    posting = postings[gram] = []
+                posting.append(key)
+        self._postings = CowDict({
+            gram: ChunkedList(posting) for gram, posting in postings.items()})
+        self._keys = ChunkedList(keys)
+        self._ordinals = CowDict(ordinals)
+        self._titles = AppendOnlyList(titles)
+        self._videos = AppendOnlyList(indexed)
+        self._removed = 0
+
+    def remove(self, video_id: str):
+        """Removes a video from the index. Unknown ids are ignored.
+
+        Args:
+            video_id: The id of the video to remove.
+        """
+        ordinal = self._ordinals.pop(video_id, None)
+        if ordinal is None:
+            return
+        key = (self._videos[ordinal].title, ordinal)
+        self._keys.remove(key)
+        for gram in _ngrams(self._titles[ordinal], self._n):
+            posting = self._postings.edit(gram, ChunkedList.fork, ChunkedList)
+            posting.remove(key)
+            if not posting:
+                del self._postings[gram]
+        self._removed += 1
+        if self._removed > max(len(self._ordinals), COMPACT_AFTER):
+            self._compact()
+
+    def _compact(self):
+        """Rebuilds the index without the slots of removed videos, keeping
+        the order the remaining videos were added in."""
+        videos = self._videos.shared()
+        self._build([videos[ordinal]
+                     for ordinal in sorted(self._ordinals.values())])
+
+    def search(self, search_term: str) -> List[Video]:
+        """Returns the videos whose title contains search_term, ignoring
+        case, sorted by title and then by the order they were added in.
+
+        Args:
+            search_term: The text to look for.
+        """
+        term = search_term.lower()
+        if len(term) < self._n:
+            candidates = self._keys
+        else:
+            candidates = None
+            for gram in _ngrams(term, self._n):
+                posting = self._postings.get(gram)
+                if not posting:
+                    return []
+                if candidates is None or len(posting) < len(candidates):
+                    candidates = posting
+
+        titles = self._titles.shared()
+        videos = self._videos.shared()
+        return [
+            videos[ordinal]
+            for _, ordinal in candidates
+            if term in titles[ordinal]
+        ]
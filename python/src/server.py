@@ -0,0 +1,327 @@
+"""An asyncio server running the video player over TCP or Unix sockets.
+
+Clients send one command per line, exactly as they would type it in
+`python3 -m src.run`, and receive the same output. Every connection gets
+its own player session; all of them share the catalog. The answer to
+"Would you like to play any of the above?" is the next line the client
+sends.
+
+With --sessions, the first line a client sends is its user name, and its
+playback, playlists and flags are kept for the next time it connects.
+
+    python3 -m src.server --port 8765
+    python3 -m src.server --unix /tmp/yt.sock
+    python3 -m src.server --sessions /var/tmp/yt-sessions
+"""
+
+import argparse
+import asyncio
+import concurrent.futures
+import logging
+import sys
+from typing import Callable, Optional
+
+from .command_parser import CommandException, CommandParser
+from .output_sink import ListSink
+from .session_manager import SessionError, SessionManager
+from .video_player import VideoPlayer
+
+WELCOME = ("Hello and welcome to YouTube, what would you like to do?\n"
+           "    Enter HELP for list of available commands or EXIT to "
+           "terminate.\n")
+GOODBYE = "YouTube has now terminated its execution. Thank you and goodbye!\n"
+BUSY = "The server is busy, please try again later.\n"
+LINE_TOO_LONG = "Line too long, closing the connection.\n"
+USER_PROMPT = "Please enter your user name: "
+
+logger = logging.getLogger(__name__)
+
+
+class VideoServer:
+    """A class used to serve player sessions over stream sockets.
+
+    Commands of one connection run one after the other, in the order they
+    arrive, so clients can pipeline: send many commands without waiting
+    for their output. Commands run on a thread pool. Commands asking a
+    question, like the searches, run there up to the question (see
+    Command.steps), and the answer is awaited on the event loop before
+    the rest of the command runs on the pool again, so a client that
+    never answers holds no worker.
+    Output is written after every command and the connection is not read
+    again until the client has taken it (backpressure), so a client that
+    stops reading stops its own session and nobody else's. Connections
+    above max_connections are told the server is busy and closed.
+
+    Given a SessionManager, the server asks every client for a user name
+    first and checks that user's session out of the manager for the
+    length of the connection.
+    """
+
+    def __init__(self, session_factory: Optional[Callable] = None,
+                 max_connections: int = 1000, workers: int = 32,
+                 answer_timeout: float = 60.0, line_limit: int = 1 << 16,
+                 sessions: Optional[SessionManager] = None):
+        """VideoServer constructor.
+
+        Args:
+            session_factory: A function called with the ask hook and the
+                OutputSink of a new connection, returning the VideoPlayer
+                of its session. By default every connection gets a
+                VideoPlayer over the bundled videos.txt.
+            max_connections: How many connections are served at once.
+            workers: How many commands can run at the same time.
+            answer_timeout: How many seconds a search waits for its
+                confirmation before taking it as a no.
+            line_limit: The longest line accepted, in bytes.
+            sessions: An optional SessionManager keeping the sessions of
+                named users. session_factory is not used with it.
+        """
+        if session_factory is None:
+            session_factory = _default_session
+        self._session_factory = session_factory
+        self._max_connections = max_connections
+        self._answer_timeout = answer_timeout
+        self._line_limit = line_limit
+        self._sessions = sessions
+        self._executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="video-server")
+        self._servers = []
+        self.connections = 0
+        self.rejected = 0
+
+    async def start_tcp(self, host: str = "127.0.0.1", port: int = 0):
+        """Starts listening on a TCP port.
+
+        Returns:
+            The asyncio Server, e.g. to find the port it picked.
+        """
+        server = await asyncio.start_server(
+            self._serve, host, port, limit=self._line_limit)
+        self._servers.append(server)
+        return server
+
+    async def start_unix(self, path: str):
+        """Starts listening on a Unix socket.
+
+        Returns:
+            The asyncio Server.
+        """
+        server = await asyncio.start_unix_server(
+            self._serve, path, limit=self._line_limit)
+        self._servers.append(server)
+        return server
+
+    async def close(self):
+        """Stops accepting connections and waits for the listeners to
+        close."""
+        for server in self._servers:
+            server.close()
+            await server.wait_closed()
+        self._servers = []
+        self._executor.shutdown(wait=False)
+
+    async def _serve(self, reader, writer):
+        if self.connections >= self._max_connections:
+            self.rejected += 1
+            writer.write(BUSY.encode())
+            await _close(writer)
+            return
+
+        self.connections += 1
+        try:
+            await _Session(self, reader, writer).run()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self.connections -= 1
+            await _close(writer)
+
+
+class _Session:
+    """The state of one connection."""
+
+    def __init__(self, server, reader, writer):
+        self._server = server
+        self._reader = reader
+        self._writer = writer
+        self._loop = asyncio.get_running_loop()
+        self._sink = ListSink()
+        self._parser = None
+
+    async def run(self):
+        self._writer.write(WELCOME.encode())
+        sessions = self._server._sessions
+        if sessions is None:
+            player = self._server._session_factory(self._ask, self._sink)
+            await self._serve_commands(player)
+            return
+
+        self._writer.write(USER_PROMPT.encode())
+        await self._writer.drain()
+        user_id = await self._read_line()
+        if not user_id or not user_id.strip():
+            return
+        user_id = user_id.strip()
+        try:
+            player = await self._loop.run_in_executor(
+                self._server._executor, sessions.checkout, user_id,
+                self._ask, self._sink)
+        except SessionError as e:
+            self._writer.write(f"{e}.\n".encode())
+            return
+        try:
+            await self._serve_commands(player)
+        finally:
+            await self._loop.run_in_executor(
+                self._server._executor, sessions.checkin, user_id, player)
+
+    async def _serve_commands(self, player):
+        self._parser = CommandParser(player)
+        await self._writer.drain()
+        while True:
+            line = await self._read_line()
+            if line is None:
+                return
+            if line.strip().upper() == "EXIT":
+                self._writer.write(GOODBYE.encode())
+                await self._writer.drain()
+                return
+            await self._run_command(line)
+            await self._send_output()
+
+    async def _run_command(self, line):
+        words = line.split()
+        steps = self._parser.command_steps(words)
+        if steps is None:
+            await self._run(line, self._parser.execute_command, words)
+            return
+        ask, prompt, answer = steps
+        question = await self._run(line, ask)
+        if question:
+            self._sink.write(prompt)
+            reply = await self._answer()
+            await self._run(line, answer, question, reply)
+
+    async def _run(self, line, step, *args):
+        """Runs a command, or one step of it, on the thread pool.
+
+        Returns:
+            What the step returned, or None if it failed.
+        """
+        return await self._loop.run_in_executor(
+            self._server._executor, self._execute, line, step, *args)
+
+    def _execute(self, line, step, *args):
+        """Runs a command, or one step of it, on a worker thread."""
+        try:
+            return step(*args)
+        except CommandException as e:
+            self._sink.write(f"{e}\n")
+        except Exception:
+            logger.exception("Command %r failed", line)
+            self._sink.write("Something went wrong, please try again.\n")
+        return None
+
+    def _ask(self, prompt):
+        """The player's ask hook, for commands asking a question without
+        registering steps. Runs on the worker thread while the event loop
+        sends what the command printed so far and reads the answer."""
+        self._sink.write(prompt)
+        future = asyncio.run_coroutine_threadsafe(self._answer(), self._loop)
+        return future.result()
+
+    async def _answer(self):
+        await self._send_output()
+        try:
+            line = await asyncio.wait_for(
+                self._read_line(), self._server._answer_timeout)
+        except asyncio.TimeoutError:
+            line = None
+        return "" if line is None else line
+
+    async def _read_line(self):
+        """Returns the next line without its newline, or None once the
+        client is gone."""
+        try:
+            line = await self._reader.readline()
+        except ValueError:  # Longer than line_limit.
+            self._writer.write(LINE_TOO_LONG.encode())
+            return None
+        if not line:
+            return None
+        return line.decode("utf-8", errors="replace").rstrip("\r\n")
+
+    async def _send_output(self):
+        output = self._sink.getvalue()
+        if output:
+            self._sink.clear()
+            self._writer.write(output.encode())
+        await self._writer.drain()
+
+
+async def _close(writer):
+    writer.close()
+    try:
+        await writer.wait_closed()
+    except ConnectionError:
+        pass
+
+
+def _default_session(ask, out):
+    return VideoPlayer(ask=ask, out=out)
+
+
+async def serve(options):
+    """Runs the server until it is cancelled."""
+    def new_session(ask, out):
+        return VideoPlayer(ask=ask, out=out, catalog_path=options.catalog)
+
+    sessions = None
+    if options.sessions:
+        sessions = SessionManager(options.catalog, options.sessions)
+    server = VideoServer(
+        new_session, max_connections=options.max_connections,
+        workers=options.workers, sessions=sessions)
+    if options.unix:
+        listener = await server.start_unix(options.unix)
+    else:
+        listener = await server.start_tcp(options.host, options.port)
+    for sock in listener.sockets:
+        print(f"Serving on {sock.getsockname()}", file=sys.stderr)
+    try:
+        await listener.serve_forever()
+    finally:
+        await server.close()
+        if sessions is not None:
+            sessions.close()
+
+
+def main(argv=None):
+    arguments = argparse.ArgumentParser(
+        description="Serves the video player over TCP or a Unix socket.")
+    arguments.add_argument("--host", default="127.0.0.1",
+                           help="address to listen on (default %(default)s)")
+    arguments.add_argument("--port", type=int, default=8765,
+                           help="TCP port to listen on (default %(default)s)")
+    arguments.add_argument("--unix", metavar="PATH",
+                           help="listen on a Unix socket instead of TCP")
+    arguments.add_argument("--catalog", metavar="FILE",
+                           help="catalog file to serve instead of the "
+                                "bundled videos.txt")
+    arguments.add_argument("--max-connections", type=int, default=1000,
+                           help="connections served at once "
+                                "(default %(default)s)")
+    arguments.add_argument("--sessions", metavar="DIR",
+                           help="ask clients for a user name and keep "
+                                "their sessions, spilling idle ones to DIR")
+    arguments.add_argument("--workers", type=int, default=32,
+                           help="commands run at once (default %(default)s)")
+    options = arguments.parse_args(argv)
+    try:
+        asyncio.run(serve(options))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
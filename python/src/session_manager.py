@@ -0,0 +1,253 @@
+"""A registry of per-user player sessions with LRU eviction to disk."""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable
+
+from .video_player import VideoPlayer
+
+# What an idle session costs on top of its ids and names, in bytes.
+_SESSION_OVERHEAD = 400
+_ENTRY_OVERHEAD = 64
+
+
+class SessionError(Exception):
+    """Raised when a session cannot be checked out."""
+
+
+def state_size(state) -> int:
+    """Returns a rough number of bytes an exported player state takes in
+    memory.
+
+    Args:
+        state: A dict returned by VideoPlayer.export_state.
+    """
+    size = _SESSION_OVERHEAD + len(state["current"] or "")
+    for playlist_name, video_ids in state["playlists"]:
+        size += _ENTRY_OVERHEAD + len(playlist_name)
+        size += sum(_ENTRY_OVERHEAD + len(video_id) for video_id in video_ids)
+    for video_id, flag_reason in state["flags"]:
+        size += _ENTRY_OVERHEAD + len(video_id) + len(flag_reason)
+    return size
+
+
+class _IdleSession:
+    """The exported state of a user nobody is connected as."""
+
+    __slots__ = ("state", "size", "last_used")
+
+    def __init__(self, state, last_used):
+        self.state = state
+        self.size = state_size(state)
+        self.last_used = last_used
+
+
+class SessionManager:
+    """A class used to keep the player state of many users.
+
+    A user only has a VideoPlayer while they are checked out, e.g. while
+    they are connected. When they are checked in, the player is reduced to
+    its exported state (what is playing, playlists and flags as video ids)
+    and dropped, so idle users cost a few hundred bytes instead of a
+    player, its library and its random number generator.
+
+    Idle sessions are kept in least recently used order. Sessions idle
+    for longer than `ttl` seconds, and the least recently used ones once
+    there are more than `max_sessions` or their states take more than
+    `memory_budget` bytes, are evicted: written to `spill_directory` and
+    read back the next time the user is checked out. Without a spill
+    directory evicted sessions are forgotten. Checked out sessions are
+    never evicted and do not count towards the limits.
+
+    The manager is thread safe; one user can only be checked out once at
+    a time.
+    """
+
+    def __init__(self, catalog_path=None, spill_directory=None,
+                 max_sessions: int = 100000,
+                 memory_budget: int = 64 << 20, ttl: float = 3600.0,
+                 clock: Callable[[], float] = time.monotonic):
+        """SessionManager constructor.
+
+        Args:
+            catalog_path: An optional videos.txt or snapshot file the
+                players use instead of the bundled videos.txt.
+            spill_directory: An optional directory evicted sessions are
+                written to. It is created if needed.
+            max_sessions: How many idle sessions are kept in memory.
+            memory_budget: How many bytes of idle session state are kept
+                in memory, as estimated by state_size.
+            ttl: How many seconds a session stays in memory after it was
+                last checked in.
+            clock: The function returning the current time in seconds.
+        """
+        self._catalog_path = catalog_path
+        self._spill_directory = spill_directory
+        self._max_sessions = max_sessions
+        self._memory_budget = memory_budget
+        self._ttl = ttl
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._idle = OrderedDict()
+        self._checked_out = set()
+        self._idle_bytes = 0
+        if spill_directory is not None:
+            os.makedirs(spill_directory, exist_ok=True)
+        # Checkouts served from memory.
+        self.hits = 0
+        # Checkouts of users not in memory, restored or new.
+        self.misses = 0
+        # Misses served from the spill directory.
+        self.restored = 0
+        # Sessions moved out of memory, expired ones included.
+        self.evictions = 0
+        # Evictions because the ttl ran out.
+        self.expired = 0
+
+    @property
+    def hit_rate(self) -> float:
+        """Returns the share of checkouts served from memory, 0 to 1."""
+        checkouts = self.hits + self.misses
+        return self.hits / checkouts if checkouts else 0.0
+
+    @property
+    def idle_bytes(self) -> int:
+        """Returns the estimated size of the idle sessions in memory."""
+        return self._idle_bytes
+
+    def __len__(self):
+        """Returns how many sessions are in memory, checked out or idle."""
+        return len(self._idle) + len(self._checked_out)
+
+    def stats(self):
+        """Returns the counters of the manager as a dict."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hit_rate,
+                "restored": self.restored,
+                "evictions": self.evictions,
+                "expired": self.expired,
+                "checked_out": len(self._checked_out),
+                "idle": len(self._idle),
+                "idle_bytes": self._idle_bytes,
+            }
+
+    def checkout(self, user_id: str, ask=None, out=None) -> VideoPlayer:
+        """Returns a player in the state the user left it.
+
+        Args:
+            user_id: The user whose session is wanted.
+            ask: The ask hook of the player, see VideoPlayer.
+            out: The OutputSink of the player.
+
+        Raises:
+            SessionError: If the user is already checked out.
+        """
+        with self._lock:
+            if user_id in self._checked_out:
+                raise SessionError(f"User {user_id} is already connected")
+            self._checked_out.add(user_id)
+            session = self._idle.pop(user_id, None)
+            if session is not None:
+                self.hits += 1
+                self._idle_bytes -= session.size
+                state = session.state
+            else:
+                self.misses += 1
+                state = self._restore(user_id)
+        try:
+            player = VideoPlayer(ask=ask, out=out,
+                                 catalog_path=self._catalog_path)
+            if state is not None:
+                player.restore_state(state)
+        except BaseException:
+            with self._lock:
+                self._checked_out.discard(user_id)
+                if state is not None:
+                    # Keep the state for the next attempt.
+                    session = _IdleSession(state, self._clock())
+                    self._idle[user_id] = session
+                    self._idle_bytes += session.size
+            raise
+        return player
+
+    def checkin(self, user_id: str, player: VideoPlayer):
+        """Keeps the state of a player returned by checkout and drops the
+        player. Idle sessions over the limits are evicted."""
+        session = _IdleSession(player.export_state(), self._clock())
+        with self._lock:
+            self._checked_out.discard(user_id)
+            self._idle[user_id] = session
+            self._idle_bytes += session.size
+            self._spill(self._take_evicted(session.last_used))
+
+    def evict_idle(self):
+        """Evicts the sessions whose ttl has run out. checkin already does
+        this; call it to also free memory while nobody checks in."""
+        with self._lock:
+            self._spill(self._take_evicted(self._clock()))
+
+    def close(self):
+        """Spills every idle session, so a new manager on the same spill
+        directory restores them."""
+        with self._lock:
+            self._spill(list(self._idle.items()))
+            self._idle.clear()
+            self._idle_bytes = 0
+
+    def _take_evicted(self, now):
+        """Removes the sessions to evict from memory and returns them."""
+        evicted = []
+        idle = self._idle
+        while idle:
+            user_id, session = next(iter(idle.items()))
+            if now - session.last_used >= self._ttl:
+                self.expired += 1
+            elif len(idle) <= self._max_sessions and \
+                    self._idle_bytes <= self._memory_budget:
+                break
+            idle.popitem(last=False)
+            self._idle_bytes -= session.size
+            self.evictions += 1
+            evicted.append((user_id, session))
+        return evicted
+
+    def _spill_path(self, user_id):
+        digest = hashlib.sha1(user_id.encode("utf-8")).hexdigest()
+        return os.path.join(self._spill_directory, f"{digest}.json")
+
+    def _spill(self, evicted):
+        """Writes evicted sessions to the spill directory. Called with the
+        lock held, so a checkout never misses a session being written."""
+        if self._spill_directory is None:
+            return
+        for user_id, session in evicted:
+            path = self._spill_path(user_id)
+            temporary = path + ".tmp"
+            with open(temporary, "w", encoding="utf-8") as spill_file:
+                json.dump({"user": user_id, "state": session.state},
+                          spill_file, ensure_ascii=False)
+            os.replace(temporary, path)
+
+    def _restore(self, user_id):
+        """Returns the spilled state of a user and removes it from disk, or
+        None if there is none. Called with the lock held."""
+        if self._spill_directory is None:
+            return None
+        path = self._spill_path(user_id)
+        try:
+            with open(path, encoding="utf-8") as spill_file:
+                spilled = json.load(spill_file)
+        except FileNotFoundError:
+            return None
+        if spilled["user"] != user_id:
+            return None
+        os.remove(path)
+        self.restored += 1
+        return spilled["state"]
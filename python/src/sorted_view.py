@@ -0,0 +1,110 @@
+"""A title-sorted view of a video catalog."""
+
+from operator import itemgetter
+
+from .cow import ChunkedList, CowDict
+from .video import Video
+
+
+def listing_key(video: Video) -> str:
+    """Returns the line a video is listed with, which is also what the
+    catalog is sorted by, e.g. "Amazing Cats (amazing_cats_video_id) [#cat
+    #animal]"."""
+    return f"{video.title} ({video.video_id}) [{' '.join(video.tags)}]"
+
+
+def _entry_key(entry):
+    return entry[0]
+
+
+class SortedVideoView:
+    """A class used to keep the videos of a catalog in listing order.
+
+    The order is computed once when the videos are added and maintained
+    with a binary search on every later add or remove, so listing the
+    catalog never sorts it again. Iterating, slicing and finding the rank
+    of a video all work directly on the kept order.
+
+    The videos are kept as (listing key, video) entries in a copy-on-write
+    list, so fork returns a copy to change while the original keeps being
+    listed.
+    """
+
+    def __init__(self):
+        self._entries = ChunkedList()
+        self._key_by_id = CowDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __iter__(self):
+        return map(itemgetter(1), self._entries)
+
+    def __getitem__(self, position):
+        """Returns the video at a position, or a list for a slice."""
+        if isinstance(position, slice):
+            return [video for _, video in self._entries[position]]
+        return self._entries[position][1]
+
+    def fork(self) -> "SortedVideoView":
+        """Returns a copy of the view sharing its storage with this one.
+        This view must not be changed afterwards."""
+        forked = SortedVideoView.__new__(SortedVideoView)
+        forked._entries = self._entries.fork()
+        forked._key_by_id = self._key_by_id.fork()
+        return forked
+
+    def add(self, video: Video):
+        """Inserts a video at its sorted position.
+
+        Args:
+            video: The video to add. A video already in the view with the
+                same video_id is replaced.
+        """
+        if video.video_id in self._key_by_id:
+            self.remove(video.video_id)
+        key = listing_key(video)
+        self._entries.insort((key, video))
+        self._key_by_id[video.video_id] = key
+
+    def add_all(self, videos):
+        """Adds many videos with distinct video_ids.
+
+        Args:
+            videos: An iterable of videos. Into an empty view they are
+                sorted once instead of inserted one by one.
+        """
+        if self._key_by_id:
+            for video in videos:
+                self.add(video)
+            return
+        entries = sorted(
+            ((listing_key(video), video) for video in videos),
+            key=_entry_key)
+        self._entries = ChunkedList(entries)
+        self._key_by_id = CowDict({
+            video.video_id: key for key, video in entries})
+
+    def remove(self, video_id: str):
+        """Removes a video from the view. Unknown ids are ignored.
+
+        Args:
+            video_id: The id of the video to remove.
+        """
+        key = self._key_by_id.pop(video_id, None)
+        if key is None:
+            return
+        del self._entries[self._entries.bisect_left((key,))]
+
+    def rank(self, video_id: str):
+        """Returns the position of a video in listing order, or None if the
+        video is not in the view.
+
+        Args:
+            video_id: The id of the video.
+        """
+        key = self._key_by_id.get(video_id)
+        if key is None:
+            return None
+        # Listing lines contain the video_id, so they are unique.
+        return self._entries.bisect_left((key,))
@@ -0,0 +1,157 @@
+"""An inverted index from video tags to videos."""
+
+import heapq
+from typing import Iterable, List
+
+from .cow import ChunkedList, CowDict
+from .video import Video
+
+
+def _entry_key(entry):
+    return entry[0]
+
+
+class TagIndex:
+    """A class used to find videos by tag without scanning the catalog.
+
+    Every tag keeps its own posting list already sorted by video title, so
+    looking a tag up costs time proportional to the number of videos with
+    that tag. Tags are matched exactly as they are written in the catalog.
+
+    A posting list holds (key, video) entries, where the key is the title
+    and the order the video was added in. The lists and the table of them
+    are copy-on-write containers, so fork returns a copy to change while
+    the original keeps answering queries.
+    """
+
+    def __init__(self):
+        self._postings = CowDict()
+        self._keys = CowDict()
+        self._next_ordinal = 0
+
+    def fork(self) -> "TagIndex":
+        """Returns a copy of the index sharing its storage with this one.
+        This index must not be changed afterwards."""
+        forked = TagIndex.__new__(TagIndex)
+        forked._postings = self._postings.fork()
+        forked._keys = self._keys.fork()
+        forked._next_ordinal = self._next_ordinal
+        return forked
+
+    def add(self, video: Video):
+        """Adds a video to the posting list of each of its tags.
+
+        Args:
+            video: The video to index. A video already in the index with the
+                same video_id is replaced.
+        """
+        if video.video_id in self._keys:
+            self.remove(video.video_id)
+        key = (video.title, self._next_ordinal)
+        self._next_ordinal += 1
+        self._keys[video.video_id] = (key, video.tags)
+        for tag in set(video.tags):
+            self._posting_to_change(tag).insort((key, video))
+
+    def add_all(self, videos):
+        """Adds many videos with distinct video_ids.
+
+        Args:
+            videos: An iterable of videos. Into an empty index the posting
+                lists are sorted once instead of kept sorted.
+        """
+        if self._keys:
+            for video in videos:
+                self.add(video)
+            return
+        postings = {}
+        keys = {}
+        for ordinal, video in enumerate(videos):
+            key = (video.title, ordinal)
+            keys[video.video_id] = (key, video.tags)
+            for tag in set(video.tags):
+                postings.setdefault(tag, []).append((key, video))
+        self._postings = CowDict({
+            tag: ChunkedList(sorted(entries, key=_entry_key))
+            for tag, entries in postings.items()
+        })
+        self._keys = CowDict(keys)
+        self._next_ordinal = len(keys)
+
+    def remove(self, video_id: str):
+        """Removes a video from the index. Unknown ids are ignored.
+
+        Args:
+            video_id: The id of the video to remove.
+        """
+        entry = self._keys.pop(video_id, None)
+        if entry is None:
+            return
+        key, tags = entry
+        for tag in set(tags):
+            posting = self._posting_to_change(tag)
+            del posting[posting.bisect_left((key,))]
+            if not posting:
+                del self._postings[tag]
+
+    def tags(self) -> List[str]:
+        """Returns every tag in the index."""
+        return list(self._postings)
+
+    def videos_with_tag(self, tag: str) -> List[Video]:
+        """Returns the videos carrying the tag, sorted by title.
+
+        Args:
+            tag: The tag to look for, e.g. "#cat".
+        """
+        posting = self._postings.get(tag, ())
+        return [video for _, video in posting]
+
+    def query(self, all_of: Iterable[str] = (), any_of: Iterable[str] = (),
+              none_of: Iterable[str] = ()) -> List[Video]:
+        """Returns the videos matching a combination of tags, sorted by
+        title.
+
+        Args:
+            all_of: Tags a video must all carry (AND).
+            any_of: Tags of which a video must carry at least one (OR).
+            none_of: Tags a video must not carry (NOT).
+
+        Raises:
+            ValueError: If neither all_of nor any_of is given, since NOT on
+                its own would select most of the catalog.
+        """
+        all_of, any_of, none_of = list(all_of), list(any_of), list(none_of)
+        if not all_of and not any_of:
+            raise ValueError("A tag query needs at least one tag to match")
+
+        postings = self._postings
+        if all_of:
+            # Walk the shortest list, it already has the right order, and
+            # check the other tags on the videos themselves.
+            all_of.sort(key=lambda tag: len(postings.get(tag, ())))
+            entries = postings.get(all_of[0], ())
+            required, optional = all_of[1:], any_of
+        else:
+            # Every merged video carries one of the any_of tags.
+            entries = self._merge([postings.get(tag, ()) for tag in any_of])
+            required, optional = [], []
+
+        return [
+            video for _, video in entries
+            if all(tag in video.tags for tag in required)
+            and (not optional or any(tag in video.tags for tag in optional))
+            and not any(tag in video.tags for tag in none_of)
+        ]
+
+    @staticmethod
+    def _merge(postings):
+        """Merges sorted posting lists, yielding every video once."""
+        previous = None
+        for key, video in heapq.merge(*postings, key=_entry_key):
+            if key != previous:
+                yield key, video
+                previous = key
+
+    def _posting_to_change(self, tag):
+        return self._postings.edit(tag, ChunkedList.fork, ChunkedList)
@@ -1,20 +1,27 @@
 """A video class."""
 
-from typing import Sequence
+import sys
+from typing import Dict, Iterable, Sequence, Tuple
 
 
 class Video:
-    """A class used to represent a Video."""
+    """A class used to represent a Video.
+
+    Videos only hold their catalog data, and use __slots__ so that large
+    catalogs don't pay for a __dict__ per video. Playback state belongs to
+    the VideoPlayer.
+    """
+
+    __slots__ = ("_title", "_video_id", "_tags")
 
     def __init__(self, video_title: str, video_id: str, video_tags: Sequence[str]):
         """Video constructor."""
         self._title = video_title
         self._video_id = video_id
-        self.playing = 0
-        self.paused = 0
 
         # Turn the tags into a tuple here so it's unmodifiable,
-        # in case the caller changes the 'video_tags' they passed to us
+        # in case the caller changes the 'video_tags' they passed to us.
+        # A tuple from a TagPool is kept as it is, so it stays shared.
         self._tags = tuple(video_tags)
 
     @property
@@ -31,3 +38,29 @@ class Video:
     def tags(self) -> Sequence[str]:
         """Returns the list of tags of a video."""
         return self._tags
+
+
+class TagPool:
+    """A class used to share tag tuples between videos.
+
+    Catalogs repeat the same tags, and often the same combination of tags,
+    over and over. The pool hands out one tuple per distinct combination,
+    made of interned strings, so every video tagged `#cat #animal` shares a
+    single tuple and every `#animal` is the same string.
+    """
+
+    def __init__(self):
+        self._tuples: Dict[Tuple[str, ...], Tuple[str, ...]] = {}
+
+    def __len__(self):
+        """Returns the number of distinct tag combinations."""
+        return len(self._tuples)
+
+    def get(self, tags: Iterable[str]) -> Tuple[str, ...]:
+        """Returns the shared tuple holding the given tags."""
+        key = tuple(tags)
+        pooled = self._tuples.get(key)
+        if pooled is None:
+            pooled = tuple(sys.intern(tag) for tag in key)
+            self._tuples[pooled] = pooled
+        return pooled
@@ -0,0 +1,487 @@
+"""A shared video catalog class."""
+
+import csv
+import os
+import threading
+from collections.abc import Mapping, ValuesView
+from pathlib import Path
+
+from .catalog_reload import CatalogDiff, CatalogFile
+from .catalog_snapshot import MAGIC, SnapshotCatalog
+from . import columnar_catalog
+from .columnar_catalog import ColumnarCatalog
+from .cow import ChunkedList, CowDict
+from .search_index import NgramIndex
+from .sorted_view import SortedVideoView
+from .tag_index import TagIndex
+from .video import TagPool, Video
+
+DEFAULT_CATALOG_PATH = Path(__file__).parent / "videos.txt"
+
+
+# Helper Wrapper around CSV reader to strip whitespace from around
+# each item.
+def _csv_reader_with_strip(reader):
+    yield from ((item.strip() for item in line) for line in reader)
+
+
+def read_video_rows(path):
+    """Yields a (title, video_id, tags) tuple for every line of a videos.txt
+    formatted file, which is UTF-8 encoded like the generated ones."""
+    with open(path, encoding="utf-8") as video_file:
+        yield from parse_video_rows(video_file)
+
+
+def parse_video_rows(lines):
+    """Yields a (title, video_id, tags) tuple for every line of videos.txt
+    formatted lines, e.g. an open file."""
+    reader = _csv_reader_with_strip(csv.reader(lines, delimiter="|"))
+    for video_info in reader:
+        title, url, tags = video_info
+        yield (
+            title,
+            url,
+            [tag.strip() for tag in tags.split(",")] if tags else [],
+        )
+
+
+def load_videos(path, columnar=False):
+    """Loads a catalog file into a mapping of video_id to Video.
+
+    Compiled snapshots and columnar catalogs are recognised by their magic
+    bytes and memory-mapped, anything else is parsed as a videos.txt file.
+
+    Args:
+        path: The file to load.
+        columnar: Whether to store a videos.txt file as a ColumnarCatalog
+            instead of a dictionary of Video objects.
+    """
+    with open(path, "rb") as catalog_file:
+        magic = catalog_file.read(len(MAGIC))
+    if magic == MAGIC:
+        return SnapshotCatalog(path)
+    if magic == columnar_catalog.MAGIC:
+        return ColumnarCatalog.open(path)
+    if columnar:
+        return ColumnarCatalog.from_rows(read_video_rows(path))
+
+    videos = {}
+    tag_pool = TagPool()
+    for title, url, tags in read_video_rows(path):
+        videos[url] = Video(title, url, tag_pool.get(tags))
+    return videos
+
+
+class VideoCatalog:
+    """A class used to represent the video data of a catalog file.
+
+    Catalogs are shared process-wide: acquiring the same file twice returns
+    the same object as long as the file has not been modified in between.
+    Every acquire must be paired with a release. A catalog nobody holds
+    stays cached for the next caller until its file changes.
+
+    Nothing that belongs to a single user (playback, playlists, flags) is
+    stored here; that state lives in the VideoPlayer.
+
+    Indexes are built the first time they are needed, so opening a
+    memory-mapped snapshot stays cheap until somebody searches it. Players
+    only read a catalog; apply_changes, add_video, remove_video and reload
+    are the only ways to change it and they keep every built index up to
+    date.
+
+    The videos and indexes are published as immutable CatalogVersions.
+    Readers take the current version and use it for as long as they like
+    without locking. Writers fork the current version, whose containers
+    share everything they do not change (see src/cow.py), apply their
+    changes to the fork and publish it by replacing one reference, so a
+    reader sees either all of a change or none of it.
+
+    Columnar catalogs are searched and filtered by scanning their buffers
+    instead, so the title and tag indexes are never built over them.
+
+    Every video also has an ordinal, its position in load order, which
+    per-player structures use to refer to videos compactly. Ordinals are
+    never reused: a removed video leaves an empty ordinal behind and an
+    added one gets a new ordinal at the end.
+    """
+
+    _shared = {}
+    # Reentrant: a library garbage collected while acquire is loading a
+    # file releases its catalog on the same thread.
+    _lock = threading.RLock()
+
+    def __init__(self, videos, key=None):
+        index_lock = threading.Lock()
+        if isinstance(videos, (SnapshotCatalog, ColumnarCatalog)):
+            # Snapshots and columns store their videos by ordinal already.
+            self._version = CatalogVersion(0, videos, None, None, index_lock)
+        else:
+            by_ordinal = ChunkedList(videos.values())
+            ordinals = CowDict({
+                video_id: ordinal for ordinal, video_id in enumerate(videos)})
+            self._version = CatalogVersion(
+                0, _VideoMap(ordinals, by_ordinal), by_ordinal, ordinals,
+                index_lock)
+        self._key = key
+        self._refs = 0
+        self._write_lock = threading.Lock()
+        # Tracks the catalog file once reload is first called.
+        self._source = None
+
+    @property
+    def current(self) -> "CatalogVersion":
+        """Returns the current version, which never changes. Use it to
+        read several things from the same version."""
+        return self._version
+
+    @property
+    def videos(self):
+        """Returns the read-only mapping of video_id to Video of the current
+        version."""
+        return self._version.videos
+
+    @property
+    def ordinal_count(self) -> int:
+        """Returns the number of ordinals handed out, removed videos
+        included."""
+        return self._version.ordinal_count
+
+    def ordinal(self, video_id: str):
+        """Returns the ordinal of a video, or None if it does not exist."""
+        return self._version.ordinal(video_id)
+
+    def video_at(self, ordinal: int):
+        """Returns the video with the given ordinal, or None if it has been
+        removed."""
+        return self._version.video_at(ordinal)
+
+    @property
+    def title_index(self) -> NgramIndex:
+        """Returns the trigram index over the video titles of the current
+        version, or the ColumnarCatalog itself, which searches the same
+        way."""
+        return self._version.title_index
+
+    @property
+    def tag_index(self) -> TagIndex:
+        """Returns the index from tags to title-sorted videos of the current
+        version, or the ColumnarCatalog itself, which answers the same
+        queries."""
+        return self._version.tag_index
+
+    @property
+    def sorted_view(self) -> SortedVideoView:
+        """Returns the videos of the current version in listing order."""
+        return self._version.sorted_view
+
+    @property
+    def refs(self) -> int:
+        """Returns how many holders currently share this catalog."""
+        return self._refs
+
+    @classmethod
+    def acquire(cls, path=DEFAULT_CATALOG_PATH, columnar=False):
+        """Returns the shared catalog for a file, loading it if needed.
+
+        Args:
+            path: The videos.txt, snapshot or columnar file to load.
+            columnar: Whether to load a videos.txt file into a
+                ColumnarCatalog.
+        """
+        path = str(Path(path).resolve())
+        key = (path, os.stat(path).st_mtime_ns, columnar)
+        with cls._lock:
+            catalog = cls._shared.get(key)
+            if catalog is None:
+                catalog = cls(load_videos(path, columnar), key)
+                # Older versions of the file can't be acquired any more,
+                # forget them unless somebody still holds them.
+                for other_key, other in list(cls._shared.items()):
+                    if other_key[0] == path and other_key[1] != key[1] \
+                            and other._refs == 0:
+                        del cls._shared[other_key]
+                cls._shared[key] = catalog
+            catalog._refs += 1
+        return catalog
+
+    def release(self):
+        """Gives back a catalog obtained from acquire."""
+        with self._lock:
+            self._refs -= 1
+            stale = self._key is not None and self._refs == 0 and any(
+                key[0] == self._key[0] and key[1] > self._key[1]
+                for key in self._shared)
+            if stale:
+                self._shared.pop(self._key, None)
+
+    def apply_changes(self, upserts=(), removals=()) -> "CatalogVersion":
+        """Adds, replaces and removes videos in one new version.
+
+        Removals are applied first, so a video both removed and upserted
+        ends up in the catalog. Removing an unknown video is ignored.
+
+        Args:
+            upserts: Videos to add, or to replace the video with the same
+                video_id.
+            removals: The video_ids of videos to remove.
+
+        Returns:
+            The published version.
+
+        Raises:
+            TypeError: If the catalog is a read-only snapshot.
+        """
+        with self._write_lock:
+            self._version = self._version.changed(upserts, removals)
+            return self._version
+
+    def add_video(self, video: Video):
+        """Adds a video to the catalog, or replaces the video with the same
+        video_id.
+
+        Raises:
+            TypeError: If the catalog is a read-only snapshot.
+        """
+        self.apply_changes(upserts=(video,))
+
+    def remove_video(self, video_id: str):
+        """Removes a video from the catalog. Unknown ids are ignored.
+
+        Raises:
+            TypeError: If the catalog is a read-only snapshot.
+        """
+        self.apply_changes(removals=(video_id,))
+
+    def reload(self):
+        """Applies the changes made to the catalog file since it was
+        loaded, or since the last reload, as one new version.
+
+        The file is only read if its size or modification time changed,
+        and then only its new lines are parsed, see CatalogFile. The
+        catalog stays shared under the new modification time of the file.
+
+        Returns:
+            A CatalogDiff of the changes, or None if the file has not
+            changed.
+
+        Raises:
+            TypeError: If the catalog was not loaded from a videos.txt file.
+            ValueError: If the file has a malformed line. The catalog is
+                left as it is.
+            OSError: If the file cannot be read.
+        """
+        if self._key is None or self._version._by_ordinal is None:
+            raise TypeError(
+                "Only catalogs loaded from a videos.txt file can be reloaded")
+        with self._write_lock:
+            if self._source is None:
+                self._source = CatalogFile(self._key[0], self._key[1])
+            changes = self._source.read_changes(self._version)
+            if changes is None:
+                return None
+            upserts, removals = changes
+            diff = CatalogDiff.of_changes(self._version, upserts, removals)
+            if diff:
+                self._version = self._version.changed(upserts, removals)
+            self._rekey(self._source.mtime_ns)
+            return diff
+
+    def _rekey(self, mtime_ns):
+        """Shares the catalog under a new modification time of its file."""
+        with self._lock:
+            key = (self._key[0], mtime_ns, self._key[2])
+            if key == self._key:
+                return
+            if self._shared.get(self._key) is self:
+                del self._shared[self._key]
+            self._shared.setdefault(key, self)
+            self._key = key
+
+    @classmethod
+    def clear_cache(cls):
+        """Forgets every shared catalog that is not currently held."""
+        with cls._lock:
+            for key, catalog in list(cls._shared.items()):
+                if catalog._refs == 0:
+                    del cls._shared[key]
+
+
+class _VideoMap(Mapping):
+    """The read-only mapping of video_id to Video of a CatalogVersion,
+    iterating in ordinal order."""
+
+    def __init__(self, ordinals, by_ordinal):
+        self._ordinals = ordinals
+        self._by_ordinal = by_ordinal
+
+    def __len__(self):
+        return len(self._ordinals)
+
+    def __contains__(self, video_id) -> bool:
+        return video_id in self._ordinals
+
+    def __getitem__(self, video_id):
+        return self._by_ordinal[self._ordinals[video_id]]
+
+    def get(self, video_id, default=None):
+        ordinal = self._ordinals.get(video_id)
+        return default if ordinal is None else self._by_ordinal[ordinal]
+
+    def __iter__(self):
+        return (video.video_id for video in self._by_ordinal
+                if video is not None)
+
+    def values(self):
+        return _Videos(self)
+
+    def items(self):
+        return ((video.video_id, video) for video in self._by_ordinal
+                if video is not None)
+
+
+class _Videos(ValuesView):
+    def __iter__(self):
+        return (video for video in self._mapping._by_ordinal
+                if video is not None)
+
+
+class CatalogVersion:
+    """A class used to represent one immutable version of a catalog.
+
+    Nothing reachable from a published version is changed again, so it can
+    be read from any number of threads without locks. Its indexes are
+    built the first time they are needed, like those of the catalog.
+    """
+
+    def __init__(self, number, videos, by_ordinal, ordinals, index_lock):
+        """CatalogVersion constructor.
+
+        Args:
+            number: The version number, 0 for the loaded file.
+            videos: The mapping of video_id to Video.
+            by_ordinal: A ChunkedList of the videos by ordinal, None for
+                snapshots and columnar catalogs.
+            ordinals: A CowDict of video_id to ordinal, None for snapshots
+                and columnar catalogs.
+            index_lock: The lock held while an index is built.
+        """
+        self.number = number
+        self._videos = videos
+        self._by_ordinal = by_ordinal
+        self._ordinals = ordinals
+        self._index_lock = index_lock
+        self._title_index = None
+        self._tag_index = None
+        self._sorted_view = None
+
+    @property
+    def videos(self):
+        """Returns the read-only mapping of video_id to Video."""
+        return self._videos
+
+    @property
+    def ordinal_count(self) -> int:
+        """Returns the number of ordinals handed out, removed videos
+        included."""
+        if self._by_ordinal is None:
+            return len(self._videos)
+        return len(self._by_ordinal)
+
+    def ordinal(self, video_id: str):
+        """Returns the ordinal of a video, or None if it does not exist."""
+        if self._ordinals is None:
+            return self._videos.ordinal(video_id)
+        return self._ordinals.get(video_id)
+
+    def video_at(self, ordinal: int):
+        """Returns the video with the given ordinal, or None if it has been
+        removed."""
+        if self._by_ordinal is None:
+            return self._videos.video_at(ordinal)
+        return self._by_ordinal[ordinal]
+
+    def ordinal_getter(self):
+        """Returns a function doing what ordinal does, for looking up many
+        video_ids in a row."""
+        if self._ordinals is None:
+            return self._videos.ordinal
+        return self._ordinals.getter()
+
+    @property
+    def title_index(self) -> NgramIndex:
+        """Returns the trigram index over the video titles, or the
+        ColumnarCatalog itself, which searches the same way."""
+        if isinstance(self._videos, ColumnarCatalog):
+            return self._videos
+        return self._index("_title_index", NgramIndex)
+
+    @property
+    def tag_index(self) -> TagIndex:
+        """Returns the index from tags to title-sorted videos, or the
+        ColumnarCatalog itself, which answers the same queries."""
+        if isinstance(self._videos, ColumnarCatalog):
+            return self._videos
+        return self._index("_tag_index", TagIndex)
+
+    @property
+    def sorted_view(self) -> SortedVideoView:
+        """Returns the videos kept sorted in listing order."""
+        return self._index("_sorted_view", SortedVideoView)
+
+    def changed(self, upserts=(), removals=()) -> "CatalogVersion":
+        """Returns the next version, with videos removed, then added or
+        replaced. This version is left as it is.
+
+        Raises:
+            TypeError: If the version is a read-only snapshot.
+        """
+        if self._by_ordinal is None:
+            raise TypeError("Catalog snapshots are read-only")
+        by_ordinal = self._by_ordinal.fork()
+        ordinals = self._ordinals.fork()
+        indexes = {
+            attribute: index.fork()
+            for attribute, index in self._built_indexes()
+        }
+        for video_id in removals:
+            ordinal = ordinals.pop(video_id, None)
+            if ordinal is None:
+                continue
+            by_ordinal[ordinal] = None
+            for index in indexes.values():
+                index.remove(video_id)
+        for video in upserts:
+            ordinal = ordinals.get(video.video_id)
+            if ordinal is None:
+                ordinals[video.video_id] = len(by_ordinal)
+                by_ordinal.append(video)
+            else:
+                by_ordinal[ordinal] = video
+            for index in indexes.values():
+                index.add(video)
+
+        version = CatalogVersion(
+            self.number + 1, _VideoMap(ordinals, by_ordinal), by_ordinal,
+            ordinals, self._index_lock)
+        for attribute, index in indexes.items():
+            setattr(version, attribute, index)
+        return version
+
+    def _built_indexes(self):
+        attributes = ("_title_index", "_tag_index", "_sorted_view")
+        return [(attribute, getattr(self, attribute))
+                for attribute in attributes
+                if getattr(self, attribute) is not None]
+
+    def _index(self, attribute, index_class):
+        """Returns the index stored in attribute, building it from every
+        video of the version the first time."""
+        index = getattr(self, attribute)
+        if index is None:
+            with self._index_lock:
+                index = getattr(self, attribute)
+                if index is None:
+                    index = index_class()
+                    index.add_all(self._videos.values())
+                    setattr(self, attribute, index)
+        return index
@@ -1,37 +1,127 @@
 """A video library class."""
 
-from .video import Video
-from pathlib import Path
-import csv
+import random
+import weakref
+from array import array
 
-
-# Helper Wrapper around CSV reader to strip whitespace from around
-# each item.
-def _csv_reader_with_strip(reader):
-    yield from ((item.strip() for item in line) for line in reader)
+from .allowed_pool import AllowedPool
+from .catalog_reload import CatalogDiff
+from .fenwick_tree import FenwickTree, check_weight
+from .flag_store import FlagStore
+from .moderation import ALLOW, FLAG
+from .video_catalog import DEFAULT_CATALOG_PATH, VideoCatalog
 
 
 class VideoLibrary:
-    """A class used to represent a Video Library."""
-
-    def __init__(self):
-        """The VideoLibrary class is initialized."""
-        self._videos = {}
-        with open(Path(__file__).parent / "videos.txt") as video_file:
-            reader = _csv_reader_with_strip(
-                csv.reader(video_file, delimiter="|"))
-            for video_info in reader:
-                title, url, tags = video_info
-                self._videos[url] = Video(
-                    title,
-                    url,
-                    [tag.strip() for tag in tags.split(",")] if tags else [],
-                )
+    """A class used to represent a Video Library.
+
+    The video data comes from a VideoCatalog shared with every other
+    library that loaded the same file, so creating a library does not
+    re-read videos.txt. Flags are kept per library on top of the shared
+    catalog, as flag reasons by catalog ordinal, together with the pool of
+    allowed videos PLAY_RANDOM picks from and, once weights are set, a
+    Fenwick tree of their weights. Searches and listings filter their
+    results with a table of flag reasons by video_id, built once per
+    catalog version and flag snapshot.
+
+    Catalog versions and flag snapshots never change once published, so
+    every read takes the current version of both once and answers from
+    them: a search running while a moderation batch is applied or the
+    catalog changes sees the flags and videos from before the change, or
+    from after it, never a mix.
+    """
+
+    def __init__(self, videos=None, catalog=None,
+                 catalog_path=DEFAULT_CATALOG_PATH):
+        """The VideoLibrary class is initialized.
+
+        Args:
+            videos: An optional mapping of video_id to Video to use instead
+                of the bundled videos.txt. It is not shared.
+            catalog: An optional VideoCatalog returned by
+                VideoCatalog.acquire. The library releases it when it is
+                closed or garbage collected.
+            catalog_path: The videos.txt or snapshot file to load when
+                neither videos nor catalog is given. Defaults to the bundled
+                videos.txt.
+        """
+        if videos is not None:
+            self._catalog = VideoCatalog(videos)
+            self._release = None
+        else:
+            if catalog is None:
+                catalog = VideoCatalog.acquire(catalog_path)
+            self._catalog = catalog
+            self._release = weakref.finalize(self, catalog.release)
         self._playlists = {}
+        self._flags = FlagStore()
+        self._reasons_cache = (None, None, {})
+        # The catalog version the last reload brought this library to.
+        self._reloaded = self._catalog.current
+        self._allowed = AllowedPool(self._catalog.ordinal_count)
+        self._held = set()
+        # Weighted selection is only set up once a weight is changed.
+        self._base_weights = None
+        self._weights = None
+
+    @classmethod
+    def from_snapshot(cls, snapshot_path):
+        """Opens a library from a compiled catalog snapshot.
+
+        The snapshot is memory-mapped instead of parsed, and Video objects
+        are only created when they are looked up. Build the snapshot with
+        `python3 -m src.catalog_snapshot src/videos.txt videos.snapshot`.
+
+        Args:
+            snapshot_path: The path of the snapshot file.
+        """
+        return cls(catalog=VideoCatalog.acquire(snapshot_path))
+
+    @classmethod
+    def from_columnar(cls, catalog_path=DEFAULT_CATALOG_PATH):
+        """Opens a library backed by a ColumnarCatalog.
+
+        A columnar file written by `python3 -m src.columnar_catalog` is
+        memory-mapped, a videos.txt file is converted in memory. Videos are
+        created on demand, and searches and tag filters scan the columns
+        instead of building indexes.
+
+        Args:
+            catalog_path: The videos.txt or columnar file to open.
+        """
+        return cls(catalog=VideoCatalog.acquire(catalog_path, columnar=True))
+
+    def close(self):
+        """Releases the shared catalog. Called automatically when the
+        library is garbage collected."""
+        if self._release is not None:
+            self._release()
+
+    def count_videos(self):
+        """Returns how many videos the library holds, flagged or not."""
+        return len(self._catalog.current.videos)
 
     def get_all_videos(self):
         """Returns all available video information from the video library."""
-        return list(self._videos.values())
+        return list(self._catalog.current.videos.values())
+
+    def get_sorted_videos(self):
+        """Returns every video in listing order (by title, then video_id).
+
+        The returned view is kept sorted by the catalog, so it supports
+        iteration, slicing and rank lookups without sorting.
+        """
+        return self._catalog.current.sorted_view
+
+    def get_sorted_videos_with_flags(self):
+        """Returns an iterator of (video, flag_reason) for every video in
+        listing order, with a flag_reason of None for videos that are not
+        flagged. The videos and flags are those of the moment it is
+        called, even if they change while it is iterated."""
+        version = self._catalog.current
+        reasons = self._flag_reasons(version, self._flags.snapshot())
+        return ((video, reasons.get(video.video_id))
+                for video in version.sorted_view)
 
     def get_video(self, video_id):
         """Returns the video object (title, url, tags) from the video library.
@@ -43,7 +133,321 @@ class VideoLibrary:
             The Video object for the requested video_id. None if the video
             does not exist.
         """
-        return self._videos.get(video_id, None)
+        return self._catalog.current.videos.get(video_id, None)
+
+    def get_random_video(self, rng=random):
+        """Returns a random video that is not flagged, or None if there is
+        none. Videos are equally likely unless weights have been set with
+        set_weight, and videos held with hold_random are skipped.
+
+        Args:
+            rng: The random number generator to use.
+        """
+        self._sync_with_catalog()
+        while True:
+            if self._weights is None:
+                ordinal = self._allowed.choice(rng)
+            else:
+                ordinal = self._weights.find(rng.random() * self._weights.total())
+            if ordinal is None:
+                return None
+            video = self._catalog.video_at(ordinal)
+            if video is not None and self._selectable(ordinal, video.video_id):
+                return video
+            # The catalog changed since the pool was built, drop the stale
+            # ordinal and try again.
+            self._exclude(ordinal)
+
+    def set_weight(self, video_id, weight):
+        """Sets how likely get_random_video is to pick a video, relative to
+        the other videos. Every video starts with a weight of 1.
+
+        Args:
+            video_id: The video url.
+            weight: The new weight, a number greater or equal to 0.
+
+        Returns:
+            False if the video does not exist.
+
+        Raises:
+            ValueError: If the weight is negative or not finite. Nothing
+                is changed then.
+        """
+        check_weight(weight)
+        ordinal = self._catalog.ordinal(video_id)
+        if ordinal is None:
+            return False
+        self._sync_with_catalog()
+        if self._weights is None:
+            self._base_weights = array("d", [1.0]) * self._allowed.known
+            self._weights = FenwickTree(
+                weight if ordinal in self._allowed else 0.0
+                for ordinal, weight in enumerate(self._base_weights))
+        self._base_weights[ordinal] = weight
+        if ordinal in self._allowed:
+            self._weights.set(ordinal, weight)
+        return True
+
+    def hold_random(self, video_id):
+        """Keeps get_random_video from picking a video until
+        release_random is called for it."""
+        ordinal = self._catalog.ordinal(video_id)
+        if ordinal is not None:
+            self._held.add(ordinal)
+            self._exclude(ordinal)
+
+    def release_random(self, video_id):
+        """Lets get_random_video pick a held video again."""
+        ordinal = self._catalog.ordinal(video_id)
+        if ordinal is not None:
+            self._held.discard(ordinal)
+            self._include(ordinal)
+
+    def get_flag_reason(self, video_id):
+        """Returns why a video was flagged, or None if it is not flagged.
+
+        Args:
+            video_id: The video url.
+        """
+        if not self._flags:
+            return None
+        ordinal = self._catalog.ordinal(video_id)
+        return None if ordinal is None else self._flags.reason(ordinal)
+
+    def count_allowed_videos(self):
+        """Returns how many videos of the library are not flagged."""
+        version = self._catalog.current
+        flags = self._flags.snapshot()
+        if not flags:
+            return len(version.videos)
+        video_at = version.video_at
+        return len(version.videos) - sum(
+            1 for ordinal in flags.ordinals() if video_at(ordinal) is not None)
+
+    def get_flags(self):
+        """Returns (video_id, flag_reason) for every flagged video, in
+        catalog order."""
+        video_at = self._catalog.current.video_at
+        return [
+            (video_at(ordinal).video_id, flag_reason)
+            for ordinal, flag_reason in self._flags.items()
+            if video_at(ordinal) is not None
+        ]
+
+    def batch(self):
+        """Returns a context manager collecting the flags and allows made
+        inside it, which searches and listings see all at once when it
+        ends. See FlagStore.batch."""
+        return self._flags.batch()
+
+    def flag_video(self, video_id, flag_reason):
+        """Flags a video of the library.
+
+        Args:
+            video_id: The video url.
+            flag_reason: Why the video is flagged.
+
+        Returns:
+            False if the video does not exist or is already flagged.
+        """
+        ordinal = self._catalog.ordinal(video_id)
+        if ordinal is None or not self._flags.flag(ordinal, flag_reason):
+            return False
+        self._exclude(ordinal)
+        return True
+
+    def allow_video(self, video_id):
+        """Removes the flag from a video.
+
+        Args:
+            video_id: The video url.
+
+        Returns:
+            False if the video is not flagged.
+        """
+        ordinal = self._catalog.ordinal(video_id)
+        if ordinal is None or not self._flags.allow(ordinal):
+            return False
+        self._include(ordinal)
+        return True
+
+    def moderate(self, records, default_reason="Not supplied"):
+        """Flags and allows many videos in one batch, which searches and
+        listings see all at once when it is done.
+
+        Args:
+            records: (video_id, action, reason) tuples, where action is
+                FLAG or ALLOW, e.g. ModerationRecords.
+            default_reason: The reason of FLAG records without one.
+
+        Returns:
+            A (flagged, allowed, skipped) tuple of counts. Records for
+            unknown videos, videos already in the requested state or with
+            an unknown action are skipped.
+        """
+        self._sync_with_catalog()
+        ordinal = self._catalog.current.ordinal_getter()
+        total = 0
+
+        def decisions():
+            nonlocal total
+            for video_id, action, reason in records:
+                total += 1
+                video_ordinal = ordinal(video_id)
+                if video_ordinal is None:
+                    continue
+                if action == FLAG:
+                    yield video_ordinal, reason or default_reason
+                elif action == ALLOW:
+                    yield video_ordinal, None
+
+        flagged, allowed, changed = self._flags.apply(decisions())
+        if self._weights is None:
+            # The flags are settled, so random selection only has to skip
+            # held videos besides them.
+            pool, held = self._allowed, self._held
+            for video_ordinal, flag_reason in changed.items():
+                if flag_reason is not None:
+                    pool.discard(video_ordinal)
+                elif video_ordinal not in held:
+                    pool.add(video_ordinal)
+        else:
+            for video_ordinal, flag_reason in changed.items():
+                if flag_reason is not None:
+                    self._exclude(video_ordinal)
+                else:
+                    self._include(video_ordinal)
+        return flagged, allowed, total - flagged - allowed
+
+    def reload(self):
+        """Picks up the changes made to the catalog file, see
+        VideoCatalog.reload.
+
+        Searches, tags, listing order and random selection all follow the
+        reloaded catalog. Removed videos lose their flags. Changes another
+        library sharing the catalog reloaded are reported here as well.
+
+        Returns:
+            A CatalogDiff of the changes since the last reload of this
+            library, or None if there are none.
+
+        Raises:
+            TypeError: If the catalog was not loaded from a videos.txt file.
+            ValueError: If the file has a malformed line.
+            OSError: If the file cannot be read.
+        """
+        before = self._reloaded
+        diff = self._catalog.reload()
+        current = self._catalog.current
+        if current is before:
+            return None
+        if not diff or current.number != before.number + 1:
+            diff = CatalogDiff.between(before, current)
+        self._reloaded = current
+        self._sync_with_catalog()
+        with self._flags.batch():
+            for video in diff.removed:
+                ordinal = before.ordinal(video.video_id)
+                self._flags.allow(ordinal)
+                self._held.discard(ordinal)
+                self._exclude(ordinal)
+        return diff
+
+    def _selectable(self, ordinal, video_id):
+        return ordinal not in self._held and ordinal not in self._flags
+
+    def _without_flagged(self, videos, version, flags):
+        if not flags:
+            return videos
+        reasons = self._flag_reasons(version, flags)
+        return [video for video in videos if video.video_id not in reasons]
+
+    def _flag_reasons(self, version, flags):
+        """Returns a dict of video_id to flag reason for the flagged videos
+        of a catalog version, kept until the version or the flags change."""
+        cached_version, cached_flags, reasons = self._reasons_cache
+        if cached_version is version and cached_flags is flags:
+            return reasons
+        video_at = version.video_at
+        reasons = {
+            video_at(ordinal).video_id: flag_reason
+            for ordinal, flag_reason in flags.items()
+            if video_at(ordinal) is not None
+        }
+        # Replaced as a whole, so threads reading it concurrently see an
+        # old entry or the new one.
+        self._reasons_cache = (version, flags, reasons)
+        return reasons
+
+    def _exclude(self, ordinal):
+        """Takes an ordinal out of random selection."""
+        if ordinal >= self._allowed.known:
+            return
+        self._allowed.discard(ordinal)
+        if self._weights is not None:
+            self._weights.set(ordinal, 0.0)
+
+    def _include(self, ordinal):
+        """Puts an ordinal back into random selection if nothing keeps it
+        out."""
+        video = self._catalog.video_at(ordinal)
+        if ordinal >= self._allowed.known or video is None or \
+                not self._selectable(ordinal, video.video_id):
+            return
+        self._allowed.add(ordinal)
+        if self._weights is not None:
+            self._weights.set(ordinal, self._base_weights[ordinal])
+
+    def _sync_with_catalog(self):
+        """Makes random selection aware of videos added to the catalog."""
+        known = self._allowed.known
+        added = self._catalog.ordinal_count - known
+        if added <= 0:
+            return
+        self._allowed.extend(added)
+        if self._weights is not None:
+            self._base_weights.extend([1.0] * added)
+            self._weights.extend(
+                1.0 if ordinal in self._allowed else 0.0
+                for ordinal in range(known, known + added))
+
+    def search_videos(self, search_term):
+        """Returns the videos that are not flagged and whose title contains
+        the search term, ignoring case, sorted by title.
+
+        Args:
+            search_term: The query to be used in search.
+        """
+        version = self._catalog.current
+        return self._without_flagged(
+            version.title_index.search(search_term), version,
+            self._flags.snapshot())
+
+    def get_videos_with_tag(self, video_tag):
+        """Returns the videos that are not flagged and carry the tag, sorted
+        by title.
+
+        Args:
+            video_tag: The tag to look for, e.g. "#cat".
+        """
+        version = self._catalog.current
+        return self._without_flagged(
+            version.tag_index.videos_with_tag(video_tag), version,
+            self._flags.snapshot())
+
+    def query_tags(self, all_of=(), any_of=(), none_of=()):
+        """Returns the videos that are not flagged and match a combination of
+        tags, sorted by title.
+
+        Args:
+            all_of: Tags a video must all carry.
+            any_of: Tags of which a video must carry at least one.
+            none_of: Tags a video must not carry.
+        """
+        version = self._catalog.current
+        return self._without_flagged(
+            version.tag_index.query(all_of, any_of, none_of), version,
+            self._flags.snapshot())
 
     def get_all_playlists(self):
         """Returns all available playlist information from the video library."""
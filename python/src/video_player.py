@@ -1,36 +1,139 @@
 """A video player class."""
 
 from .video_library import VideoLibrary
-import random
-from .video_playlist import Playlist
+from .playlist_library import PlaylistLibrary
+from .sorted_view import listing_key
+from .output_sink import OutputSink
+from .random_engine import RandomEngine
+from .moderation import read_moderation_feed
+
+
+def _flag_note(flag_reason):
+    if flag_reason is None:
+        return ""
+    return f" - FLAGGED (reason: {flag_reason})"
 
 
 class VideoPlayer:
     """A class used to represent a Video Player."""
 
-    def __init__(self):
-        self._video_library = VideoLibrary()
+    def __init__(self, ask=None, out=None, seed=None, no_repeat=0,
+                 catalog_path=None, playlist_store=None):
+        """The VideoPlayer class is initialized.
+
+        Args:
+            ask: An optional function used instead of input() to ask the
+                user which search result to play. It is called with the
+                prompt, shows it and returns the answer.
+            out: The OutputSink messages are written to. By default they
+                go to sys.stdout like print().
+            seed: An optional seed making PLAY_RANDOM reproducible.
+            no_repeat: How many of the most recent random picks
+                PLAY_RANDOM avoids repeating.
+            catalog_path: An optional videos.txt or snapshot file to use
+                instead of the bundled videos.txt.
+            playlist_store: An optional PlaylistStore the playlists are
+                loaded from and every playlist change is recorded in.
+        """
+        if catalog_path is None:
+            self._video_library = VideoLibrary()
+        else:
+            self._video_library = VideoLibrary(catalog_path=catalog_path)
+        self.random_engine = RandomEngine(self._video_library, seed, no_repeat)
+        self._ask = ask
+        self._out = out if out is not None else OutputSink()
+        # Playback state belongs to this player, the Video objects are
+        # shared with every other player using the same catalog.
         self.current = None
-        self.playlists = {}
-        self.playlists_lower = []
+        self.paused = False
+        self.playlists = PlaylistLibrary()
+        self._playlist_store = playlist_store
+        if playlist_store is not None:
+            self._load_playlists()
+
+    @property
+    def out(self) -> OutputSink:
+        """Returns the sink the player writes its output to."""
+        return self._out
+
+    def _print(self, text=""):
+        self._out.write(f"{text}\n")
+
+    def _load_playlists(self):
+        """Recreates the playlists kept in the playlist store. Videos no
+        longer in the library are left out."""
+        for playlist_name, video_ids in self._playlist_store.playlists():
+            playlist = self.playlists.create(playlist_name)
+            for video_id in video_ids:
+                video = self._video_library.get_video(video_id)
+                if video is not None:
+                    playlist.add(video)
+
+    def _record(self, change, *args):
+        """Records a playlist change in the playlist store, if any."""
+        if self._playlist_store is not None:
+            getattr(self._playlist_store, change)(*args)
+
+    def export_state(self):
+        """Returns the state of this player: what is playing, the playlists
+        and the flags, as video ids and plain lists ready for json.dump.
+
+        Returns:
+            A dict with "current" (a video_id or None), "paused",
+            "playlists" as [name, video_ids] pairs and "flags" as
+            [video_id, flag_reason] pairs.
+        """
+        return {
+            "current": self.current.video_id if self.current else None,
+            "paused": self.paused,
+            "playlists": [
+                [playlist.playlist_name,
+                 [video.video_id for video in playlist]]
+                for playlist in self.playlists
+            ],
+            "flags": [list(flag) for flag in self._video_library.get_flags()],
+        }
+
+    def restore_state(self, state):
+        """Brings a new player back to a state returned by export_state.
+
+        Nothing is printed or recorded in the playlist store. Videos no
+        longer in the library are left out.
+
+        Args:
+            state: A dict returned by export_state.
+        """
+        library = self._video_library
+        for video_id, flag_reason in state["flags"]:
+            library.flag_video(video_id, flag_reason)
+        for playlist_name, video_ids in state["playlists"]:
+            playlist = self.playlists.create(playlist_name)
+            if playlist is None:
+                continue
+            for video_id in video_ids:
+                video = library.get_video(video_id)
+                if video is not None:
+                    playlist.add(video)
+        current = state["current"]
+        self.current = library.get_video(current) if current else None
+        self.paused = bool(state["paused"]) and self.current is not None
+
+    def _flag_note(self, video):
+        """Returns " - FLAGGED (reason: ...)" for flagged videos, or an empty
+        string."""
+        return _flag_note(self._video_library.get_flag_reason(video.video_id))
 
     def number_of_videos(self):
-        num_videos = len(self._video_library.get_all_videos())
-        print(f"{num_videos} videos in the library")
+        num_videos = self._video_library.count_videos()
+        self._print(f"{num_videos} videos in the library")
 
     def show_all_videos(self):
         """Returns all videos."""
 
-        ordered_videos = []
-
-        for video in self._video_library.get_all_videos():
-            ordered_videos.append(f"{video.title} ({video.video_id}) [{' '.join(video.tags)}]")
-        
-        ordered_videos.sort()
-
-        print("Here's a list of all available videos:")
-        for video in ordered_videos:
-            print(f'\t {video}')
+        self._print("Here's a list of all available videos:")
+        for video, flag_reason in \
+                self._video_library.get_sorted_videos_with_flags():
+            self._print(f"\t {listing_key(video)}{_flag_note(flag_reason)}")
 
     def play_video(self, video_id):
         """Plays the respective video.
@@ -42,72 +145,75 @@ class VideoPlayer:
         video = self._video_library.get_video(video_id)
 
         if video:
+            flag_reason = self._video_library.get_flag_reason(video_id)
+            if flag_reason is not None:
+                self._print(f"Cannot play video: Video is currently flagged (reason: {flag_reason})")
+                return
             if self.current:
-                print(f"Stopping video: {self.current.title}")
-                self.current.playing = 0
-                self.current.paused = 0
+                self._print(f"Stopping video: {self.current.title}")
             self.current = video
-            video.playing = 1
-            print(f"Playing video: {self.current.title}")
+            self.paused = False
+            self._print(f"Playing video: {self.current.title}")
         else:
-            print("Cannot play video: Video does not exist")
+            self._print("Cannot play video: Video does not exist")
 
     def stop_video(self):
         """Stops the current video."""
 
         if self.current:
-            self.current.playing = 0
-            print(f"Stopping video: {self.current.title}")
+            self._print(f"Stopping video: {self.current.title}")
             self.current = None
+            self.paused = False
         else:
-            print("Cannot stop video: No video is currently playing")
+            self._print("Cannot stop video: No video is currently playing")
 
     def play_random_video(self):
         """Plays a random video from the video library."""
 
+        random_video = self.random_engine.choose()
+        if random_video is None:
+            self._print("No videos available")
+            return
         if self.current:
             self.stop_video()
-        random_video = random.choice(self._video_library.get_all_videos())
         self.current = random_video
-        random_video.playing = 1
-        print(f"Playing video: {random_video.title}")
+        self.paused = False
+        self._print(f"Playing video: {random_video.title}")
 
     def pause_video(self):
         """Pauses the current video."""
 
         if self.current:
-            if self.current.paused:
-                print(f"Video already paused: {self.current.title}")
+            if self.paused:
+                self._print(f"Video already paused: {self.current.title}")
             else:
-                self.current.playing = 0
-                self.current.paused = 1
-                print(f"Pausing video: {self.current.title}")
+                self.paused = True
+                self._print(f"Pausing video: {self.current.title}")
         else:
-            print("Cannot pause video: No video is currently playing")
+            self._print("Cannot pause video: No video is currently playing")
 
     def continue_video(self):
         """Resumes playing the current video."""
 
         if self.current:
-            if self.current.paused:
-                self.current.paused = 0
-                self.current.playing = 1
-                print(f"Continuing video: {self.current.title}")
+            if self.paused:
+                self.paused = False
+                self._print(f"Continuing video: {self.current.title}")
             else:
-                print("Cannot continue video: Video is not paused")
+                self._print("Cannot continue video: Video is not paused")
         else:
-            print("Cannot continue video: No video is currently playing")
+            self._print("Cannot continue video: No video is currently playing")
 
     def show_playing(self):
         """Displays video currently playing."""
 
         if self.current:
-            if self.current.paused:
-                print(f"Currently playing: {self.current.title} ({self.current.video_id}) [{' '.join(self.current.tags)}] - PAUSED")
+            if self.paused:
+                self._print(f"Currently playing: {self.current.title} ({self.current.video_id}) [{' '.join(self.current.tags)}] - PAUSED")
             else:
-                print(f"Currently playing: {self.current.title} ({self.current.video_id}) [{' '.join(self.current.tags)}]")
+                self._print(f"Currently playing: {self.current.title} ({self.current.video_id}) [{' '.join(self.current.tags)}]")
         else:
-            print("No video is currently playing")
+            self._print("No video is currently playing")
 
     def create_playlist(self, playlist_name):
         """Creates a playlist with a given name.
@@ -115,13 +221,11 @@ class VideoPlayer:
         Args:
             playlist_name: The playlist name.
         """
-        if playlist_name.lower() in self.playlists_lower:
-            print("Cannot create playlist: A playlist with the same name already exists")
+        if self.playlists.create(playlist_name) is None:
+            self._print("Cannot create playlist: A playlist with the same name already exists")
         else:
-            self.playlists[playlist_name.lower()] = Playlist(playlist_name)
-            self.playlists_lower.append(playlist_name.lower())
-            print(f"Successfully created new playlist: {playlist_name}")
-
+            self._record("create", playlist_name)
+            self._print(f"Successfully created new playlist: {playlist_name}")
 
     def add_to_playlist(self, playlist_name, video_id):
         """Adds a video to a playlist with a given name.
@@ -130,50 +234,32 @@ class VideoPlayer:
             playlist_name: The playlist name.
             video_id: The video_id to be added.
         """
-        # playlist = self.playlists.get(playlist_name, None)
-        # video = self._video_library.get_video(video_id, None)
-
-        if not playlist_name.lower() in self.playlists_lower:
-            print(f"Cannot add video to {playlist_name}: Playlist does not exist")
+        playlist = self.playlists.get(playlist_name)
+        if playlist is None:
+            self._print(f"Cannot add video to {playlist_name}: Playlist does not exist")
         else:
             video = self._video_library.get_video(video_id)
-            if video:
-                if video in self.playlists[playlist_name.lower()].videos:
-                    print(f"Cannot add video to {playlist_name}: Video already added")
+            flag_reason = self._video_library.get_flag_reason(video_id)
+            if video and flag_reason is not None:
+                self._print(f"Cannot add video to {playlist_name}: Video is currently flagged (reason: {flag_reason})")
+            elif video:
+                if playlist.add(video):
+                    self._record("add", playlist.playlist_name, video_id)
+                    self._print(f"Added video to {playlist_name}: {video.title}")
                 else:
-                    playlist = self.playlists[playlist_name.lower()]
-                    playlist.videos.append(video)
-                    print(f"Added video to {playlist_name}: {video.title}")
+                    self._print(f"Cannot add video to {playlist_name}: Video already added")
             else:
-                print(f"Cannot add video to {playlist_name}: Video does not exist")
-        # # else:
-        # #     video = self._video_library.get_video(video_id)
-        # #     if video:
-        # #         playlist = self._video_library.get_playlist(playlist_name)
-        # #         playlist.videos.append(video)
-        # #         print(f"Added video to {playlist_name}: {video.title}")
-        # #     else:
-        # #         print(f"Cannot add video to {playlist_name}: Video does not exist")
-        # if playlist:
-        #     if video:
-        #         playlist.videos.append(video)
-        #         print(f"Added video to {playlist_name}: {video.title}")
-        #     else:
-        #         print(f"Cannot add video to {playlist_name}: Video does not exist")
-        # else:
-        #     print("Cannot add video to {playlist_name}: Playlist does not exist")
+                self._print(f"Cannot add video to {playlist_name}: Video does not exist")
 
     def show_all_playlists(self):
         """Display all playlists."""
 
-        pl_list = sorted(self.playlists_lower)
-
-        if pl_list:
-            print("Showing all playlists:")
-            for pl in pl_list:
-                print(self.playlists[pl].playlist_name)
+        if self.playlists:
+            self._print("Showing all playlists:")
+            for playlist in self.playlists:
+                self._print(playlist.playlist_name)
         else:
-            print("No playlists exist yet")
+            self._print("No playlists exist yet")
 
     def show_playlist(self, playlist_name):
         """Display all videos in a playlist with a given name.
@@ -181,15 +267,16 @@ class VideoPlayer:
         Args:
             playlist_name: The playlist name.
         """
-        if playlist_name.lower() in self.playlists_lower:
-            print(f"Showing playlist: {playlist_name}")
-            if self.playlists[playlist_name.lower()].videos:
-                for video in self.playlists[playlist_name.lower()].videos:
-                    print(f"{video.title} ({video.video_id}) [{' '.join(video.tags)}]")
+        playlist = self.playlists.get(playlist_name)
+        if playlist is not None:
+            self._print(f"Showing playlist: {playlist_name}")
+            if playlist:
+                for video in playlist:
+                    self._print(f"{listing_key(video)}{self._flag_note(video)}")
             else:
-                print("No videos here yet")
+                self._print("No videos here yet")
         else:
-            print(f"Cannot show playlist {playlist_name}: Playlist does not exist")
+            self._print(f"Cannot show playlist {playlist_name}: Playlist does not exist")
 
     def remove_from_playlist(self, playlist_name, video_id):
         """Removes a video to a playlist with a given name.
@@ -198,18 +285,19 @@ class VideoPlayer:
             playlist_name: The playlist name.
             video_id: The video_id to be removed.
         """
-        if not playlist_name.lower() in self.playlists_lower:
-            print(f"Cannot remove video from {playlist_name}: Playlist does not exist")
+        playlist = self.playlists.get(playlist_name)
+        if playlist is None:
+            self._print(f"Cannot remove video from {playlist_name}: Playlist does not exist")
         else:
             video = self._video_library.get_video(video_id)
             if video:
-                if video in self.playlists[playlist_name.lower()].videos:
-                    self.playlists[playlist_name.lower()].videos.remove(video)
-                    print(f"Removed video from {playlist_name}: {video.title}")
+                if playlist.remove(video):
+                    self._record("remove", playlist.playlist_name, video_id)
+                    self._print(f"Removed video from {playlist_name}: {video.title}")
                 else:
-                    print(f"Cannot remove video from {playlist_name}: Video is not in playlist")
+                    self._print(f"Cannot remove video from {playlist_name}: Video is not in playlist")
             else:
-                print(f"Cannot remove video from {playlist_name}: Video does not exist")
+                self._print(f"Cannot remove video from {playlist_name}: Video does not exist")
 
     def clear_playlist(self, playlist_name):
         """Removes all videos from a playlist with a given name.
@@ -217,11 +305,13 @@ class VideoPlayer:
         Args:
             playlist_name: The playlist name.
         """
-        if not playlist_name.lower() in self.playlists_lower:
-            print(f"Cannot clear playlist {playlist_name}: Playlist does not exist")
+        playlist = self.playlists.get(playlist_name)
+        if playlist is None:
+            self._print(f"Cannot clear playlist {playlist_name}: Playlist does not exist")
         else:
-            self.playlists[playlist_name.lower()].videos = []
-            print(f"Successfully removed all videos from {playlist_name}")
+            playlist.clear()
+            self._record("clear", playlist.playlist_name)
+            self._print(f"Successfully removed all videos from {playlist_name}")
 
     def delete_playlist(self, playlist_name):
         """Deletes a playlist with a given name.
@@ -229,13 +319,11 @@ class VideoPlayer:
         Args:
             playlist_name: The playlist name.
         """
-        if not playlist_name.lower() in self.playlists_lower:
-            print(f"Cannot delete playlist {playlist_name}: Playlist does not exist")
+        if self.playlists.delete(playlist_name) is None:
+            self._print(f"Cannot delete playlist {playlist_name}: Playlist does not exist")
         else:
-            self.playlists_lower.remove(playlist_name.lower())
-            self.playlists.pop(playlist_name.lower())
-            print(f"Deleted playlist: {playlist_name}")
-
+            self._record("delete", playlist_name)
+            self._print(f"Deleted playlist: {playlist_name}")
 
     def search_videos(self, search_term):
         """Display all the videos whose titles contain the search_term.
@@ -243,32 +331,9 @@ class VideoPlayer:
         Args:
             search_term: The query to be used in search.
         """
-        all_videos = self._video_library.get_all_videos()
-        search_results = {}
-        for video in all_videos:
-            if not video.title.lower().find(search_term.lower()) == -1:
-                search_results[video.title] = video
-
-        search_results = {key: value for key, value in sorted(search_results.items())}
-
+        search_results = self.show_search_results(search_term)
         if search_results:
-            print(f"Here are the results for {search_term}:")
-            for i, video in enumerate(search_results.items()):
-                print(f"{i+1}) {video[1].title} ({video[1].video_id}) [{' '.join(video[1].tags)}]", end="\n")
-            print("Would you like to play any of the above? If yes, specify the number of the video.")
-            print("If your answer is not a valid number, we will assume it's a no.")
-            idx = input("\n")
-            # print(idx)
-            try:
-                idx = int(idx)
-                if (idx-1) in range(len(search_results)):
-                    self.play_video(list(search_results.items())[idx-1][1].video_id)
-                    print(f"Playing video: {list(search_results.items())[idx-1][1].title}")
-            except ValueError:
-                pass
-        else:
-            print(f"No search results for {search_term}")
- 
+            self.play_search_answer(search_results, self._read_answer("\n"))
 
     def search_videos_tag(self, video_tag):
         """Display all videos whose tags contains the provided tag.
@@ -276,31 +341,87 @@ class VideoPlayer:
         Args:
             video_tag: The video tag to be used in search.
         """
-        all_videos = self._video_library.get_all_videos()
-        search_results = {}
-        for video in all_videos:
-            if video_tag.lower() in video.tags:
-                search_results[video.title] = video
+        search_results = self.show_tag_results(video_tag)
+        if search_results:
+            self.play_search_answer(search_results, self._read_answer(""))
 
-        search_results = {key: value for key, value in sorted(search_results.items())}
+    def show_search_results(self, search_term):
+        """Displays the videos whose titles contain the search_term and asks
+        which one to play, without waiting for the answer.
 
-        if search_results:
-            print(f"Here are the results for {video_tag}:")
-            for i, video in enumerate(search_results.items()):
-                print(f"{i+1}) {video[1].title} ({video[1].video_id}) [{' '.join(video[1].tags)}]")
-            print("Would you like to play any of the above? If yes, specify the number of the video.")
-            print("If your answer is not a valid number, we will assume it's a no.")
-            idx = input("")
-            # print(idx)
-            try:
-                idx = int(idx)
-                if (idx-1) in range(len(search_results)):
-                    self.play_video(list(search_results.items())[idx-1][1].video_id)
-                    print(f"Playing video: {list(search_results.items())[idx-1][1].title}")
-            except ValueError:
-                pass
-        else:
-            print(f"No search results for {video_tag}")
+        Args:
+            search_term: The query to be used in search.
+
+        Returns:
+            The videos shown, to pass to play_search_answer with the answer.
+        """
+        return self._offer_results(self._find_videos(search_term), search_term)
+
+    def show_tag_results(self, video_tag):
+        """Displays the videos with the given tag and asks which one to
+        play, without waiting for the answer.
+
+        Args:
+            video_tag: The video tag to be used in search.
+
+        Returns:
+            The videos shown, to pass to play_search_answer with the answer.
+        """
+        return self._offer_results(self._find_videos_with_tag(video_tag), video_tag)
+
+    def _offer_results(self, search_results, query):
+        if not search_results:
+            self._print(f"No search results for {query}")
+            return []
+        self._print(f"Here are the results for {query}:")
+        for i, video in enumerate(search_results.values()):
+            self._print(f"{i+1}) {video.title} ({video.video_id}) [{' '.join(video.tags)}]")
+        self._print("Would you like to play any of the above? If yes, specify the number of the video.")
+        self._print("If your answer is not a valid number, we will assume it's a no.")
+        return list(search_results.values())
+
+    def play_search_answer(self, search_results, answer):
+        """Plays the search result the user picked.
+
+        Args:
+            search_results: The videos returned by show_search_results or
+                show_tag_results.
+            answer: The user's answer, the number of a video or anything
+                else for no.
+        """
+        try:
+            idx = int(answer)
+            if (idx-1) in range(len(search_results)):
+                self.play_video(search_results[idx-1].video_id)
+                self._print(f"Playing video: {search_results[idx-1].title}")
+        except ValueError:
+            pass
+
+    def _find_videos(self, search_term):
+        """Returns the videos whose titles contain search_term, keyed and
+        sorted by title."""
+        # The title index already returns the videos sorted by title.
+        search_results = {}
+        for video in self._video_library.search_videos(search_term):
+            search_results[video.title] = video
+        return search_results
+
+    def _find_videos_with_tag(self, video_tag):
+        """Returns the videos with the given tag, keyed and sorted by
+        title."""
+        # The tag index already returns the videos sorted by title.
+        search_results = {}
+        for video in self._video_library.get_videos_with_tag(video_tag.lower()):
+            search_results[video.title] = video
+        return search_results
+
+    def _read_answer(self, prompt):
+        """Asks the user a question and returns the answer."""
+        if self._ask is not None:
+            return self._ask(prompt)
+        # Whatever is still buffered has to be shown before the question.
+        self._out.flush()
+        return input(prompt)
 
     def flag_video(self, video_id, flag_reason=""):
         """Mark a video as flagged.
@@ -309,7 +430,19 @@ class VideoPlayer:
             video_id: The video_id to be flagged.
             flag_reason: Reason for flagging the video.
         """
-        print("flag_video needs implementation")
+        if not flag_reason:
+            flag_reason = "Not supplied"
+
+        video = self._video_library.get_video(video_id)
+        if not video:
+            self._print("Cannot flag video: Video does not exist")
+        elif self._video_library.get_flag_reason(video_id) is not None:
+            self._print("Cannot flag video: Video is already flagged")
+        else:
+            if self.current is not None and self.current.video_id == video_id:
+                self.stop_video()
+            self._video_library.flag_video(video_id, flag_reason)
+            self._print(f"Successfully flagged video: {video.title} (reason: {flag_reason})")
 
     def allow_video(self, video_id):
         """Removes a flag from a video.
@@ -317,4 +450,102 @@ class VideoPlayer:
         Args:
             video_id: The video_id to be allowed again.
         """
-        print("allow_video needs implementation")
+        video = self._video_library.get_video(video_id)
+        if not video:
+            self._print("Cannot remove flag from video: Video does not exist")
+        elif not self._video_library.allow_video(video_id):
+            self._print("Cannot remove flag from video: Video is not flagged")
+        else:
+            self._print(f"Successfully removed flag from video: {video.title}")
+
+    def apply_moderation(self, records):
+        """Flags and allows many videos in one pass.
+
+        Nothing is printed per video: the currently playing video is
+        stopped (once) if it gets flagged, and a single summary line is
+        printed at the end. Searches and listings see the whole feed
+        applied at once, when it is done.
+
+        Args:
+            records: An iterable of (video_id, action, reason) tuples, where
+                action is "FLAG" or "ALLOW" and reason may be empty.
+
+        Returns:
+            A (flagged, allowed, skipped) tuple of counts. Records for
+            unknown videos, videos already in the requested state or with
+            an unknown action are skipped.
+        """
+        library = self._video_library
+        playing = self.current
+        was_flagged = playing is not None and \
+            library.get_flag_reason(playing.video_id) is not None
+        flagged, allowed, skipped = library.moderate(records)
+        if playing is not None and not was_flagged and \
+                library.get_flag_reason(playing.video_id) is not None:
+            self.stop_video()
+        self._print(f"Applied moderation feed: {flagged} flagged, {allowed} allowed, {skipped} skipped")
+        return flagged, allowed, skipped
+
+    def reload_catalog(self):
+        """Picks up the changes made to the catalog file and reports them."""
+        self._reload_catalog(report_unchanged=True)
+
+    def poll_catalog(self):
+        """Picks up the changes made to the catalog file, if any. Nothing
+        is printed if there are none.
+
+        Returns:
+            The CatalogDiff of the changes, or None if there are none or
+            the catalog cannot be reloaded.
+        """
+        return self._reload_catalog(report_unchanged=False)
+
+    def _reload_catalog(self, report_unchanged):
+        """Reloads the catalog and makes the player follow it.
+
+        Playlists and the playing video follow the catalog: updated videos
+        are swapped in where they are, and removed videos are taken out of
+        every playlist and stopped if they are playing.
+        """
+        try:
+            diff = self._video_library.reload()
+        except OSError as e:
+            self._print(f"Cannot reload catalog: {e.strerror}")
+            return None
+        except (TypeError, ValueError) as e:
+            self._print(f"Cannot reload catalog: {e}")
+            return None
+        if diff is None:
+            if report_unchanged:
+                self._print("Catalog is up to date")
+            return None
+        for _, video in diff.updated:
+            for playlist in self.playlists.holding(video.video_id):
+                playlist.replace(video)
+            if self.current is not None and \
+                    self.current.video_id == video.video_id:
+                self.current = video
+        for video in diff.removed:
+            for playlist in self.playlists.holding(video.video_id):
+                if playlist.remove(video):
+                    self._record("remove", playlist.playlist_name,
+                                 video.video_id)
+            if self.current is not None and \
+                    self.current.video_id == video.video_id:
+                self.stop_video()
+        self._print(f"Reloaded catalog: {len(diff.added)} added, "
+                    f"{len(diff.removed)} removed, "
+                    f"{len(diff.updated)} updated")
+        return diff
+
+    def apply_moderation_feed(self, feed_path):
+        """Flags and allows the videos listed in a moderation feed file.
+
+        Args:
+            feed_path: The path of a file with one `video_id | FLAG or
+                ALLOW | reason` line per decision.
+        """
+        try:
+            self.apply_moderation(read_moderation_feed(feed_path))
+        except OSError as e:
+            self._print(f"Cannot apply moderation feed: {e.strerror}")
@@ -1,13 +1,116 @@
 """A video playlist class."""
 
+from typing import Dict, Iterator, Optional
+
+from .video import Video
+
 
 class Playlist:
-    """A class used to represent a Playlist."""
-    def __init__(self, playlist_name: str):
+    """A class used to represent a Playlist.
+
+    The videos behave like an ordered set: checking, adding and removing a
+    video are O(1) whatever the size of the playlist, and the videos keep
+    the order they were added in. Removed videos leave a hole in the slot
+    list that is compacted away once holes make up half of it, or before
+    the next positional access.
+    """
+
+    def __init__(self, playlist_name: str, index: Optional[Dict] = None):
+        """Playlist constructor.
+
+        Args:
+            playlist_name: The name of the playlist.
+            index: An optional dictionary of video_id to the playlists
+                holding that video, as a dictionary with the playlists as
+                keys, which the playlist keeps up to date.
+        """
         self.playlist_name = playlist_name
-        self.videos = []
-    
-    # @property
-    # def playlist_name(self) -> str:
-    #     """Returns the name of a playlist."""
-    #     return self._playlist_name
+        self._slots = []
+        self._positions = {}
+        self._index = index
+
+    def __contains__(self, video: Video) -> bool:
+        return video.video_id in self._positions
+
+    def __len__(self):
+        return len(self._positions)
+
+    def __iter__(self) -> Iterator[Video]:
+        return (video for video in self._slots if video is not None)
+
+    def __getitem__(self, position: int) -> Video:
+        """Returns the video at a position, in the order they were added."""
+        self._compact()
+        return self._slots[position]
+
+    def add(self, video: Video) -> bool:
+        """Adds a video at the end of the playlist.
+
+        Returns:
+            False if the video was already in the playlist.
+        """
+        if video.video_id in self._positions:
+            return False
+        self._positions[video.video_id] = len(self._slots)
+        self._slots.append(video)
+        if self._index is not None:
+            self._index.setdefault(video.video_id, {})[self] = None
+        return True
+
+    def remove(self, video: Video) -> bool:
+        """Removes a video from the playlist.
+
+        Returns:
+            False if the video was not in the playlist.
+        """
+        position = self._positions.pop(video.video_id, None)
+        if position is None:
+            return False
+        self._slots[position] = None
+        if len(self._positions) * 2 < len(self._slots):
+            self._compact()
+        self._unindex(video.video_id)
+        return True
+
+    def replace(self, video: Video) -> bool:
+        """Puts a video in place of the video with the same video_id,
+        keeping its position.
+
+        Returns:
+            False if no video with that video_id is in the playlist.
+        """
+        position = self._positions.get(video.video_id)
+        if position is None:
+            return False
+        self._slots[position] = video
+        return True
+
+    def clear(self):
+        """Removes every video from the playlist."""
+        for video_id in self._positions:
+            self._unindex(video_id)
+        self._slots = []
+        self._positions = {}
+
+    def detach(self):
+        """Takes the playlist out of its index, e.g. once it is deleted."""
+        for video_id in self._positions:
+            self._unindex(video_id)
+        self._index = None
+
+    def _unindex(self, video_id):
+        if self._index is None:
+            return
+        playlists = self._index[video_id]
+        del playlists[self]
+        if not playlists:
+            del self._index[video_id]
+
+    def _compact(self):
+        if len(self._slots) == len(self._positions):
+            return
+        self._slots = [video for video in self._slots if video is not None]
+        self._positions = {
+            video.video_id: position
+            for position, video in enumerate(self._slots)
+        }
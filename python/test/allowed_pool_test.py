@@ -0,0 +1,58 @@
+import random
+
+from src.allowed_pool import AllowedPool
+from src.video_library import VideoLibrary
+
+
+def test_pool_tracks_allowed_ordinals():
+    pool = AllowedPool(10)
+    assert len(pool) == 10
+    assert pool.discard(3)
+    assert pool.discard(9)
+    assert not pool.discard(3)
+    assert 3 not in pool and 9 not in pool and 4 in pool
+    assert len(pool) == 8
+    assert pool.add(3)
+    assert not pool.add(3)
+    assert not pool.add(10)
+    assert len(pool) == 9
+
+
+def test_choice_only_returns_allowed_ordinals():
+    rng = random.Random(1)
+    pool = AllowedPool(50)
+    excluded = set(range(0, 50, 3))
+    for ordinal in excluded:
+        pool.discard(ordinal)
+    chosen = {pool.choice(rng) for _ in range(2000)}
+    assert chosen == set(range(50)) - excluded
+
+
+def test_extend_and_empty_pool():
+    pool = AllowedPool()
+    assert pool.choice() is None
+    pool.extend(2)
+    assert pool.known == 2 and len(pool) == 2
+    pool.discard(0)
+    pool.discard(1)
+    assert pool.choice() is None
+
+
+def test_large_pool_is_free_until_changed():
+    pool = AllowedPool(10 ** 9)
+    assert 0 <= pool.choice(random.Random(3)) < 10 ** 9
+    assert pool._slots == {}
+    pool.discard(5)
+    assert len(pool._slots) == 2
+
+
+def test_library_random_video_skips_flagged():
+    library = VideoLibrary()
+    rng = random.Random(5)
+    for video_id in ["funny_dogs_video_id", "amazing_cats_video_id",
+                     "another_cat_video_id", "life_at_google_video_id"]:
+        library.flag_video(video_id, "reason")
+    for _ in range(20):
+        assert library.get_random_video(rng).video_id == "nothing_video_id"
+    library.flag_video("nothing_video_id", "reason")
+    assert library.get_random_video(rng) is None
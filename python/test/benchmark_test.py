@@ -0,0 +1,92 @@
+import json
+
+from src import benchmark
+from src.command_parser import CommandParser
+
+
+def test_every_command_has_a_workload():
+    for name in CommandParser.COMMANDS:
+        assert benchmark.workload_for(name) is not None, name
+
+
+def test_percentile():
+    values = [1, 2, 3, 4, 5, 6, 7, 8, 9, 10]
+    assert benchmark.percentile(values, 0.5) == 5
+    assert benchmark.percentile(values, 0.9) == 9
+    assert benchmark.percentile(values, 0.99) == 10
+    assert benchmark.percentile([], 0.5) == 0.0
+
+
+def test_run_benchmarks_reports_every_command():
+    results = benchmark.run_benchmarks(
+        sizes=[60], iterations=5, time_budget=0.01, warmup=1,
+        memory_iterations=2)
+    assert {result["command"] for result in results["results"]} == \
+        set(CommandParser.COMMANDS)
+    for result in results["results"]:
+        assert result["catalog_size"] == 60
+        assert result["iterations"] == 5
+        assert result["p50_us"] <= result["p90_us"] <= result["p99_us"] \
+            <= result["max_us"]
+        assert result["peak_alloc_bytes"] >= 0
+    assert results["loads"][0]["catalog_size"] == 60
+    assert results["moderation"][0]["records"] == 90
+    json.dumps(results)
+
+
+def test_commands_are_built_right_before_they_run(monkeypatch, tmp_path):
+    events = []
+
+    def command(context):
+        events.append("build")
+        return ["HELP"]
+
+    monkeypatch.setitem(benchmark.WORKLOADS, "HELP",
+                        benchmark.Workload(command))
+    monkeypatch.setattr(benchmark, "_execute",
+                        lambda parser, command: events.append("run"))
+    path = tmp_path / "videos.txt"
+    benchmark.write_catalog(path, benchmark.CatalogSpec(videos=10))
+    benchmark.benchmark_command(
+        "HELP", path, [], tmp_path, iterations=5, time_budget=0.0, warmup=1,
+        memory_iterations=3)
+    assert events == ["build", "run"] * 9
+
+
+def test_benchmark_moderation_reports_both_runs(tmp_path):
+    path = tmp_path / "videos.txt"
+    benchmark.write_catalog(path, benchmark.CatalogSpec(videos=100))
+    rows = list(benchmark.read_video_rows(path))
+    result = benchmark.benchmark_moderation(path, rows, tmp_path)
+    assert result["records"] == 150
+    assert result["per_command_us"] > 0 and result["feed_us"] > 0
+    assert "moderation feed" in benchmark.format_moderation(result)
+
+
+def test_find_regressions():
+    baseline = {"results": [
+        {"catalog_size": 10, "command": "PLAY", "p50_us": 10.0},
+        {"catalog_size": 10, "command": "STOP", "p50_us": 10.0},
+    ]}
+    results = {"results": [
+        {"catalog_size": 10, "command": "PLAY", "p50_us": 12.0},
+        {"catalog_size": 10, "command": "STOP", "p50_us": 14.0},
+        {"catalog_size": 99, "command": "STOP", "p50_us": 99.0},
+    ]}
+    assert benchmark.find_regressions(results, baseline, threshold=0.25) == [
+        "STOP on 10 videos: p50_us 10.0 -> 14.0 (+40%)"]
+
+
+def test_main_fails_on_regression(tmp_path, capsys):
+    output = tmp_path / "results.json"
+    arguments = ["--sizes", "30", "--commands", "play,stop",
+                 "--iterations", "5", "--output", str(output)]
+    assert benchmark.main(arguments) == 0
+
+    baseline = json.loads(output.read_text())
+    for result in baseline["results"]:
+        result["p50_us"] /= 100
+    (tmp_path / "baseline.json").write_text(json.dumps(baseline))
+    assert benchmark.main(arguments + [
+        "--baseline", str(tmp_path / "baseline.json")]) == 1
+    assert "REGRESSION: PLAY on 30 videos" in capsys.readouterr().err
@@ -0,0 +1,82 @@
+import os
+import subprocess
+import sys
+from collections import Counter
+from pathlib import Path
+
+import pytest
+
+from src.catalog_generator import CatalogSpec, generate_rows, write_catalog
+from src.video_catalog import read_video_rows
+from src.video_library import VideoLibrary
+from src.video_player import VideoPlayer
+from src.output_sink import ListSink
+
+
+def test_generated_catalog_round_trips(tmp_path):
+    path = tmp_path / "videos.txt"
+    spec = CatalogSpec(videos=500, unicode=0.3, seed=3)
+    assert write_catalog(path, spec) == 500
+    rows = list(read_video_rows(path))
+    assert rows == [
+        (title, video_id, list(tags))
+        for title, video_id, tags in generate_rows(spec)]
+    assert len({video_id for _, video_id, _ in rows}) == 500
+    assert any(not title.isascii() for title, _, _ in rows)
+
+
+def test_same_seed_same_catalog():
+    spec = CatalogSpec(videos=50, seed=7)
+    assert list(generate_rows(spec)) == list(generate_rows(spec))
+    assert list(generate_rows(spec)) != \
+        list(generate_rows(spec._replace(seed=8)))
+
+
+def test_title_lengths_and_tags_follow_spec():
+    spec = CatalogSpec(videos=2000, title_words=3, max_title_words=6,
+                       tags=50, max_tags=3)
+    rows = list(generate_rows(spec))
+    assert all(1 <= len(title.split()) <= 6 for title, _, _ in rows)
+    assert all(len(tags) == len(set(tags)) <= 3 for _, _, tags in rows)
+    counts = Counter(tag for _, _, tags in rows for tag in tags)
+    assert len(counts) <= 50
+    # Zipfian popularity: the top tag is far more common than the median.
+    ranked = counts.most_common()
+    assert ranked[0][1] > 5 * ranked[len(ranked) // 2][1]
+
+
+def test_max_tags_cannot_exceed_vocabulary():
+    with pytest.raises(ValueError):
+        list(generate_rows(CatalogSpec(tags=2, max_tags=3)))
+
+
+def test_library_loads_catalog_path(tmp_path):
+    path = tmp_path / "videos.txt"
+    write_catalog(path, CatalogSpec(videos=1000))
+    library = VideoLibrary(catalog_path=path)
+    assert len(library.get_all_videos()) == 1000
+    assert library.get_video("video_999_id") is not None
+
+    out = ListSink()
+    VideoPlayer(out=out, catalog_path=path).number_of_videos()
+    assert out.lines() == ["1000 videos in the library"]
+
+
+def test_unicode_catalog_loads_under_c_locale(tmp_path):
+    path = tmp_path / "videos.txt"
+    write_catalog(path, CatalogSpec(videos=200, unicode=0.5))
+    script = (
+        "import sys\n"
+        "from src.video_library import VideoLibrary\n"
+        "library = VideoLibrary(catalog_path=sys.argv[1])\n"
+        "with open(sys.argv[1], 'a', encoding='utf-8') as catalog:\n"
+        "    catalog.write('Caf\\u00e9 | cafe_id | #caf\\u00e9\\n')\n"
+        "print(len(library.reload().added), library.count_videos())\n"
+    )
+    env = dict(os.environ, LC_ALL="C", PYTHONUTF8="0",
+               PYTHONCOERCECLOCALE="0")
+    result = subprocess.run(
+        [sys.executable, "-c", script, str(path)], env=env,
+        cwd=Path(__file__).parent.parent, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.split() == ["1", "201"]
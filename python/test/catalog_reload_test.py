@@ -0,0 +1,172 @@
+import os
+import random
+import shutil
+from pathlib import Path
+
+import pytest
+
+from src.catalog_reload import CatalogFile
+from src.output_sink import ListSink
+from src.video_catalog import VideoCatalog
+from src.video_library import VideoLibrary
+from src.video_player import VideoPlayer
+
+VIDEOS_TXT = Path(__file__).parent.parent / "src" / "videos.txt"
+
+
+def write(path, text, append=False):
+    """Changes the file and moves its modification time forward, so the
+    change is seen however coarse the file system clock is."""
+    stat = os.stat(path)
+    with open(path, "a" if append else "w") as catalog_file:
+        catalog_file.write(text)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+
+@pytest.fixture
+def catalog_path(tmp_path):
+    path = tmp_path / "videos.txt"
+    shutil.copy(VIDEOS_TXT, path)
+    yield path
+    VideoCatalog.clear_cache()
+
+
+@pytest.fixture
+def parsed(monkeypatch):
+    """Collects every line CatalogFile parses."""
+    lines = []
+    parse = CatalogFile._parse
+
+    def recording_parse(self, batch):
+        lines.extend(batch)
+        return parse(self, batch)
+
+    monkeypatch.setattr(CatalogFile, "_parse", recording_parse)
+    return lines
+
+
+def ids(videos):
+    return [video.video_id for video in videos]
+
+
+def test_unchanged_file_is_not_read(catalog_path, parsed):
+    library = VideoLibrary(catalog_path=catalog_path)
+    assert library.reload() is None
+    assert parsed == []
+
+
+def test_appended_lines_are_parsed_alone(catalog_path, parsed):
+    library = VideoLibrary(catalog_path=catalog_path)
+    write(catalog_path, "\nMore Cats | more_cats_id | #cat", append=True)
+    diff = library.reload()
+    assert ids(diff.added) == ["more_cats_id"]
+    assert not diff.removed and not diff.updated
+    # The first change compares the whole file with the catalog.
+    assert len(parsed) == 6
+
+    del parsed[:]
+    write(catalog_path, "\nDogs Again | dogs_again_id | #dog\n", append=True)
+    diff = library.reload()
+    assert ids(diff.added) == ["dogs_again_id"]
+    assert parsed == ["Dogs Again | dogs_again_id | #dog"]
+    assert "dogs_again_id" in ids(library.search_videos("again"))
+    assert "dogs_again_id" in ids(library.get_videos_with_tag("#dog"))
+    assert ids(library.get_sorted_videos())[2] == "dogs_again_id"
+    assert library.count_videos() == 7
+
+
+def test_edited_lines_are_diffed(catalog_path, parsed):
+    library = VideoLibrary(catalog_path=catalog_path)
+    lines = VIDEOS_TXT.read_text().splitlines()
+    write(catalog_path, "\n".join(lines) + "\n")
+    assert not library.reload()
+
+    del parsed[:]
+    lines[1] = "Amazing Cats Remastered | amazing_cats_video_id | #cat"
+    del lines[3]
+    lines.append("Brand New | brand_new_id |")
+    write(catalog_path, "\n".join(lines))
+    diff = library.reload()
+    assert parsed == [lines[1], lines[-1]]
+    assert ids(diff.added) == ["brand_new_id"]
+    assert ids(diff.removed) == ["life_at_google_video_id"]
+    [(old, new)] = diff.updated
+    assert (old.title, new.title) == \
+        ("Amazing Cats", "Amazing Cats Remastered")
+    assert ids(library.search_videos("cats")) == ["amazing_cats_video_id"]
+    assert ids(library.get_videos_with_tag("#animal")) == \
+        ["another_cat_video_id", "funny_dogs_video_id"]
+    assert library.get_video("life_at_google_video_id") is None
+
+
+def test_random_pool_and_flags_follow_reload(catalog_path):
+    library = VideoLibrary(catalog_path=catalog_path)
+    library.flag_video("life_at_google_video_id", "reason")
+    lines = VIDEOS_TXT.read_text().splitlines()
+    write(catalog_path, "\n".join(lines[:3] + ["New | new_id |"]))
+    library.reload()
+    assert library.get_flags() == []
+    assert library.count_allowed_videos() == 4
+    rng = random.Random(3)
+    picked = {library.get_random_video(rng).video_id for _ in range(200)}
+    assert picked == {"funny_dogs_video_id", "amazing_cats_video_id",
+                      "another_cat_video_id", "new_id"}
+
+
+def test_player_keeps_playlists_valid(catalog_path):
+    out = ListSink()
+    player = VideoPlayer(out=out, catalog_path=catalog_path)
+    player.create_playlist("mix")
+    player.add_to_playlist("mix", "amazing_cats_video_id")
+    player.add_to_playlist("mix", "life_at_google_video_id")
+    player.add_to_playlist("mix", "funny_dogs_video_id")
+    player.play_video("life_at_google_video_id")
+    lines = VIDEOS_TXT.read_text().splitlines()
+    lines[1] = "Amazing Cats 2 | amazing_cats_video_id | #cat"
+    del lines[3]
+    write(catalog_path, "\n".join(lines))
+
+    player.reload_catalog()
+    player.reload_catalog()
+    assert out.lines()[-3:] == [
+        "Stopping video: Life at Google",
+        "Reloaded catalog: 0 added, 1 removed, 1 updated",
+        "Catalog is up to date",
+    ]
+    playlist = player.playlists.get("mix")
+    assert [video.title for video in playlist] == \
+        ["Amazing Cats 2", "Funny Dogs"]
+    assert playlist[0] is player._video_library.get_video(
+        "amazing_cats_video_id")
+    assert player.current is None
+
+
+def test_malformed_file_leaves_catalog_alone(catalog_path):
+    out = ListSink()
+    player = VideoPlayer(out=out, catalog_path=catalog_path)
+    write(catalog_path, "\nno separators here", append=True)
+    player.reload_catalog()
+    assert out.lines()[-1].startswith("Cannot reload catalog: ")
+    assert player._video_library.count_videos() == 5
+
+    write(catalog_path, VIDEOS_TXT.read_text())
+    player.reload_catalog()
+    assert out.lines()[-1] == "Catalog is up to date"
+
+
+def test_libraries_sharing_a_catalog_see_reloads(catalog_path):
+    first = VideoLibrary(catalog_path=catalog_path)
+    second = VideoLibrary(catalog_path=catalog_path)
+    write(catalog_path, "\nNew | new_id |", append=True)
+    assert ids(first.reload().added) == ["new_id"]
+    assert ids(second.reload().added) == ["new_id"]
+    assert second.reload() is None
+    # The reloaded catalog is what acquiring the changed file returns.
+    third = VideoLibrary(catalog_path=catalog_path)
+    assert third._catalog is first._catalog
+
+
+def test_only_text_catalogs_reload():
+    library = VideoLibrary(videos={})
+    with pytest.raises(TypeError):
+        library.reload()
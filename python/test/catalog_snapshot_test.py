@@ -0,0 +1,89 @@
+from pathlib import Path
+
+import pytest
+
+from src.catalog_snapshot import SnapshotCatalog, SnapshotError, build_snapshot
+from src.video_catalog import read_video_rows
+from src.video_library import VideoLibrary
+
+VIDEOS_TXT = Path(__file__).parent.parent / "src" / "videos.txt"
+
+
+@pytest.fixture
+def snapshot_path(tmp_path):
+    path = tmp_path / "videos.snapshot"
+    build_snapshot(read_video_rows(VIDEOS_TXT), path)
+    return path
+
+
+def test_snapshot_library_has_all_videos(snapshot_path):
+    library = VideoLibrary.from_snapshot(snapshot_path)
+    assert len(library.get_all_videos()) == 5
+
+
+def test_snapshot_matches_text_catalog(snapshot_path):
+    text_library = VideoLibrary()
+    snapshot_library = VideoLibrary.from_snapshot(snapshot_path)
+    for video in text_library.get_all_videos():
+        loaded = snapshot_library.get_video(video.video_id)
+        assert loaded.title == video.title
+        assert loaded.video_id == video.video_id
+        assert loaded.tags == video.tags
+
+
+def test_last_row_of_a_video_id_wins(tmp_path):
+    path = tmp_path / "videos.txt"
+    path.write_text("A | x | #a\nC | y |\nB | x | #b\n")
+    build_snapshot(read_video_rows(path), tmp_path / "videos.snapshot")
+    library = VideoLibrary(catalog_path=path)
+    snapshot = VideoLibrary.from_snapshot(tmp_path / "videos.snapshot")
+    assert snapshot.count_videos() == library.count_videos() == 2
+    assert [(video.title, video.video_id, video.tags)
+            for video in snapshot.get_all_videos()] == \
+        [(video.title, video.video_id, video.tags)
+         for video in library.get_all_videos()] == \
+        [("B", "x", ("#b",)), ("C", "y", ())]
+    assert snapshot.get_video("x").title == "B"
+
+
+def test_snapshot_parses_video_without_tags(snapshot_path):
+    library = VideoLibrary.from_snapshot(snapshot_path)
+    video = library.get_video("nothing_video_id")
+    assert video.title == "Video about nothing"
+    assert video.tags == ()
+
+
+def test_snapshot_materializes_videos_lazily(snapshot_path):
+    catalog = SnapshotCatalog(snapshot_path)
+    assert catalog.get("does_not_exist") is None
+    video = catalog["funny_dogs_video_id"]
+    assert catalog["funny_dogs_video_id"] is video
+    assert len(catalog._videos) == 1
+
+
+def test_snapshot_rejects_other_files(tmp_path):
+    path = tmp_path / "not_a_snapshot"
+    path.write_bytes(b"Funny Dogs | funny_dogs_video_id | #dog")
+    with pytest.raises(SnapshotError):
+        SnapshotCatalog(path)
+
+
+def test_snapshot_rejects_empty_and_truncated_files(snapshot_path, tmp_path):
+    data = snapshot_path.read_bytes()
+    empty = tmp_path / "empty"
+    empty.write_bytes(b"")
+    with pytest.raises(SnapshotError):
+        SnapshotCatalog(empty)
+
+    # Cut inside the records: the header counts more than the file holds.
+    truncated = tmp_path / "truncated"
+    truncated.write_bytes(data[:40])
+    with pytest.raises(SnapshotError):
+        SnapshotCatalog(truncated)
+
+    # Cut inside the string pool: noticed when a video is read.
+    truncated.write_bytes(data[:-10])
+    catalog = SnapshotCatalog(truncated)
+    with pytest.raises(SnapshotError):
+        [catalog.video_at(ordinal) for ordinal in range(len(catalog))]
+    catalog.close()
@@ -0,0 +1,134 @@
+import random
+from pathlib import Path
+
+import pytest
+
+from src.catalog_generator import CatalogSpec, generate_rows
+from src import columnar_catalog
+from src.columnar_catalog import ColumnarCatalog, ColumnarError
+from src.output_sink import ListSink
+from src.search_index import NgramIndex
+from src.tag_index import TagIndex
+from src.video import Video
+from src.video_catalog import read_video_rows
+from src.video_library import VideoLibrary
+from src.video_player import VideoPlayer
+
+VIDEOS_TXT = Path(__file__).parent.parent / "src" / "videos.txt"
+
+
+def ids(videos):
+    return [video.video_id for video in videos]
+
+
+@pytest.fixture(params=["memory", "mmap"])
+def generated(request, tmp_path):
+    rows = list(generate_rows(CatalogSpec(videos=3000, tags=40, unicode=0.2)))
+    catalog = ColumnarCatalog.from_rows(rows)
+    if request.param == "mmap":
+        catalog.save(tmp_path / "videos.columns")
+        catalog = ColumnarCatalog.open(tmp_path / "videos.columns")
+    return rows, catalog
+
+
+def test_columns_round_trip_the_catalog():
+    rows = list(read_video_rows(VIDEOS_TXT))
+    catalog = ColumnarCatalog.from_rows(rows)
+    assert len(catalog) == 5
+    assert list(catalog) == [video_id for _, video_id, _ in rows]
+    for title, video_id, tags in rows:
+        video = catalog[video_id]
+        assert (video.title, video.video_id, video.tags) == \
+            (title, video_id, tuple(tags))
+    assert catalog["nothing_video_id"].tags == ()
+    assert "missing_video_id" not in catalog
+    assert catalog["amazing_cats_video_id"].tags is \
+        catalog["another_cat_video_id"].tags
+
+
+def test_scans_match_the_indexes(generated):
+    rows, catalog = generated
+    title_index, tag_index = NgramIndex(), TagIndex()
+    for title, video_id, tags in rows:
+        video = Video(title, video_id, tags)
+        title_index.add(video)
+        tag_index.add(video)
+
+    rng = random.Random(5)
+    for _ in range(100):
+        title, _, tags = rng.choice(rows)
+        term = rng.choice(title.split())[:rng.randint(1, 4)]
+        assert ids(catalog.search(term)) == ids(title_index.search(term))
+        tag = rng.choice(tag_index.tags())
+        assert ids(catalog.videos_with_tag(tag)) == \
+            ids(tag_index.videos_with_tag(tag))
+        query = ([tag], tags[:1], [rng.choice(tag_index.tags())])
+        assert ids(catalog.query(*query)) == ids(tag_index.query(*query))
+
+
+def test_search_does_not_match_across_titles():
+    catalog = ColumnarCatalog.from_rows([
+        ("Cats", "a_id", []), ("Dogs", "b_id", [])])
+    assert catalog.search("sd") == []
+    assert ids(catalog.search("s")) == ["a_id", "b_id"]
+
+
+def test_tag_counts():
+    catalog = ColumnarCatalog.from_rows(read_video_rows(VIDEOS_TXT))
+    assert catalog.tag_counts() == {
+        "#cat": 2, "#animal": 3, "#dog": 1, "#google": 1, "#career": 1}
+
+
+def test_last_row_of_a_video_id_wins(tmp_path):
+    path = tmp_path / "videos.txt"
+    path.write_text("A | x | #a\nC | y |\nB | x | #b\n")
+    library = VideoLibrary(catalog_path=path)
+    columnar = VideoLibrary.from_columnar(path)
+    assert columnar.count_videos() == library.count_videos() == 2
+    assert [(video.title, video.video_id, video.tags)
+            for video in columnar.get_all_videos()] == \
+        [(video.title, video.video_id, video.tags)
+         for video in library.get_all_videos()] == \
+        [("B", "x", ("#b",)), ("C", "y", ())]
+    assert columnar._catalog.current.videos.tag_counts() == {"#b": 1}
+
+
+def test_numpy_scans_match_the_pure_python_ones(generated, monkeypatch):
+    pytest.importorskip("numpy")
+    _, catalog = generated
+    tags = catalog.tags()
+    with_numpy = (catalog.tag_counts(),
+                  [ids(catalog.videos_with_tag(tag)) for tag in tags])
+    monkeypatch.setattr(columnar_catalog, "numpy", None)
+    assert with_numpy == (catalog.tag_counts(),
+                          [ids(catalog.videos_with_tag(tag)) for tag in tags])
+
+
+def test_truncated_file_is_rejected(tmp_path):
+    path = tmp_path / "videos.columns"
+    ColumnarCatalog.from_rows(read_video_rows(VIDEOS_TXT)).save(path)
+    path.write_bytes(path.read_bytes()[:-10])
+    with pytest.raises(ColumnarError):
+        ColumnarCatalog.open(path)
+
+
+def test_columnar_library_behaves_like_the_default_one(tmp_path):
+    library = VideoLibrary.from_columnar(VIDEOS_TXT)
+    assert library.count_videos() == 5
+    assert ids(library.search_videos("cat")) == \
+        ["amazing_cats_video_id", "another_cat_video_id"]
+    library.flag_video("funny_dogs_video_id", "dont_like_dogs")
+    assert ids(library.get_videos_with_tag("#animal")) == \
+        ["amazing_cats_video_id", "another_cat_video_id"]
+
+    path = tmp_path / "videos.columns"
+    ColumnarCatalog.from_rows(read_video_rows(VIDEOS_TXT)).save(path)
+    out = ListSink()
+    player = VideoPlayer(out=out, catalog_path=path)
+    player.play_video("amazing_cats_video_id")
+    player.flag_video("amazing_cats_video_id")
+    assert out.lines() == [
+        "Playing video: Amazing Cats",
+        "Stopping video: Amazing Cats",
+        "Successfully flagged video: Amazing Cats (reason: Not supplied)",
+    ]
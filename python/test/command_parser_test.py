@@ -0,0 +1,87 @@
+import pytest
+
+from src.command_parser import CommandException, CommandParser
+from src.video_player import VideoPlayer
+
+
+def test_commands_are_case_insensitive(capfd):
+    parser = CommandParser(VideoPlayer())
+    parser.execute_command(["play", "amazing_cats_video_id"])
+    parser.execute_command(["Show_Playing", "ignored"])
+    out, err = capfd.readouterr()
+    lines = out.splitlines()
+    assert lines == [
+        "Playing video: Amazing Cats",
+        "Currently playing: Amazing Cats (amazing_cats_video_id) "
+        "[#cat #animal]",
+    ]
+
+
+def test_wrong_number_of_arguments():
+    parser = CommandParser(VideoPlayer())
+    with pytest.raises(CommandException, match="followed by video_id"):
+        parser.execute_command(["PLAY"])
+    with pytest.raises(CommandException, match="optional flag reason"):
+        parser.execute_command(["FLAG_VIDEO", "a", "b", "c"])
+
+
+def test_unknown_command(capfd):
+    CommandParser(VideoPlayer()).execute_command(["DANCE"])
+    out, err = capfd.readouterr()
+    assert "Please enter a valid command" in out
+
+
+def test_register_command(capfd):
+    CommandParser.register_command(
+        "ECHO", lambda parser, text: print(text), (1,),
+        "Please enter ECHO command followed by some text.",
+        "ECHO <text> - Prints the text.")
+    try:
+        parser = CommandParser(VideoPlayer())
+        parser.execute_command(["echo", "hello"])
+        parser.execute_command(["HELP"])
+    finally:
+        del CommandParser.COMMANDS["ECHO"]
+    out, err = capfd.readouterr()
+    lines = out.splitlines()
+    assert lines[0] == "hello"
+    assert "    ECHO <text> - Prints the text." in lines
+    assert lines[-2] == "    EXIT - Terminates the program execution."
+
+
+def test_commands_registered_later_reach_existing_parsers(capfd):
+    parser = CommandParser(VideoPlayer())
+    parser.execute_command(["NUMBER_OF_VIDEOS"])
+    original = CommandParser.COMMANDS["NUMBER_OF_VIDEOS"]
+    CommandParser.register_command(
+        "ECHO", lambda parser, text: print(text), (1,),
+        "Please enter ECHO command followed by some text.",
+        "ECHO <text> - Prints the text.")
+    CommandParser.register_command(
+        "NUMBER_OF_VIDEOS", lambda parser: print("replaced"))
+    try:
+        parser.execute_command(["ECHO", "hello"])
+        parser.execute_command(["NUMBER_OF_VIDEOS"])
+    finally:
+        del CommandParser.COMMANDS["ECHO"]
+        CommandParser.COMMANDS["NUMBER_OF_VIDEOS"] = original
+    parser.execute_command(["NUMBER_OF_VIDEOS"])
+    out, err = capfd.readouterr()
+    assert out.splitlines() == [
+        "5 videos in the library", "hello", "replaced",
+        "5 videos in the library"]
+
+
+def test_command_steps(capfd):
+    parser = CommandParser(VideoPlayer())
+    assert parser.command_steps(["PLAY", "amazing_cats_video_id"]) is None
+    assert parser.command_steps(["SEARCH_VIDEOS"]) is None
+    assert parser.command_steps([]) is None
+    ask, prompt, answer = parser.command_steps(["search_videos", "cat"])
+    assert prompt == "\n"
+    results = ask()
+    assert [video.video_id for video in results] == [
+        "amazing_cats_video_id", "another_cat_video_id"]
+    answer(results, "1")
+    out, err = capfd.readouterr()
+    assert out.splitlines()[-1] == "Playing video: Amazing Cats"
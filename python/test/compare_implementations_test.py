@@ -0,0 +1,44 @@
+import sys
+
+from src import compare_implementations
+from src.compare_implementations import (
+    COMMAND_MIX, IMPLEMENTATIONS, PLAYLISTS, generate_trace, run_comparison)
+
+ROWS = [
+    ("Amazing Cats", "amazing_cats_video_id", ["#cat", "#animal"]),
+    ("Funny Dogs", "funny_dogs_video_id", ["#dog", "#animal"]),
+    ("Video about nothing", "nothing_video_id", []),
+]
+
+
+def test_generate_trace():
+    trace = generate_trace(ROWS, length=300, seed=4)
+    assert trace == generate_trace(ROWS, length=300, seed=4)
+    assert len(trace) == PLAYLISTS + 300
+    assert all(command[0] in COMMAND_MIX for command in trace)
+    assert all(command[0] == "CREATE_PLAYLIST" for command in trace[:PLAYLISTS])
+
+
+def test_every_implementation_replays_the_trace():
+    stdin, stdout = sys.stdin, sys.stdout
+    results = run_comparison(sizes=[50], trace_length=100)
+    assert (sys.stdin, sys.stdout) == (stdin, stdout)
+    assert [result["implementation"] for result in results] == \
+        list(IMPLEMENTATIONS)
+    for result in results:
+        assert result["catalog_size"] == 50
+        assert result["errors"] == 0
+        assert result["peak_bytes"] > 0
+    table = compare_implementations.format_table(results)
+    assert "Median latency in us on 50 videos" in table
+
+
+def test_every_size_gets_a_fresh_install():
+    modules = set(sys.modules)
+    results = run_comparison(
+        implementations={"solution1": IMPLEMENTATIONS["solution1"]},
+        sizes=[20, 30], trace_length=20)
+    assert [result["catalog_size"] for result in results] == [20, 30]
+    assert [result["errors"] for result in results] == [0, 0]
+    assert not [name for name in set(sys.modules) - modules
+                if name.startswith("_impl_")]
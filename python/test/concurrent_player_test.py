@@ -0,0 +1,164 @@
+import random
+import sys
+import threading
+
+from src.concurrent_player import ConcurrentVideoPlayer
+from src.output_sink import ListSink
+from src.playlist_store import PlaylistStore
+from src.rw_lock import KeyedLocks, ReadWriteLock
+
+VIDEO_IDS = [
+    "amazing_cats_video_id", "another_cat_video_id", "funny_dogs_video_id",
+    "life_at_google_video_id", "nothing_video_id", "does_not_exist",
+]
+PLAYLISTS = ["alpha", "Beta", "gamma", "delta"]
+
+
+def test_read_write_lock():
+    lock = ReadWriteLock()
+    events = []
+
+    def write():
+        with lock.write():
+            events.append("write")
+
+    with lock.read():
+        with lock.read():
+            writer = threading.Thread(target=write)
+            writer.start()
+            writer.join(0.05)
+            assert writer.is_alive() and not events
+    writer.join(1)
+    assert events == ["write"]
+
+
+def test_keyed_locks_take_each_stripe_once():
+    locks = KeyedLocks(stripes=1)
+    with locks.hold("a", "b", ("playlist", "a")):
+        pass
+    with locks.hold():
+        pass
+
+
+def random_command(rng):
+    video_id = rng.choice(VIDEO_IDS)
+    playlist = rng.choice(PLAYLISTS)
+    if rng.random() < 0.5:
+        playlist = playlist.upper()
+    return rng.choice([
+        ("number_of_videos",),
+        ("show_all_videos",),
+        ("play_video", video_id),
+        ("play_random_video",),
+        ("stop_video",),
+        ("pause_video",),
+        ("continue_video",),
+        ("show_playing",),
+        ("create_playlist", playlist),
+        ("delete_playlist", playlist),
+        ("add_to_playlist", playlist, video_id),
+        ("add_to_playlist", playlist, video_id),
+        ("remove_from_playlist", playlist, video_id),
+        ("clear_playlist", playlist),
+        ("show_playlist", playlist),
+        ("show_all_playlists",),
+        ("search_videos", "cat"),
+        ("search_videos_tag", "#animal"),
+        ("flag_video", video_id, "reason"),
+        ("allow_video", video_id),
+    ])
+
+
+def check_invariants(player, store):
+    library = player._video_library
+    # Playlists: the sorted names match the playlists, and every playlist's
+    # positions point at its own slots.
+    playlists = player.playlists
+    assert playlists._sorted_keys == sorted(playlists._playlists)
+    for playlist in playlists:
+        slots = playlist._slots
+        for video_id, position in playlist._positions.items():
+            assert slots[position].video_id == video_id
+        assert len([video for video in slots if video is not None]) == \
+            len(playlist)
+    # Flags: the lookups, the reasons and the random pool agree.
+    flags = library._flags
+    flagged = {ordinal for ordinal, _ in flags.items()}
+    assert {ordinal for ordinal in range(library._catalog.ordinal_count)
+            if ordinal in flags} == flagged
+    assert len(flags) == len(flagged)
+    assert len(library._allowed) == \
+        library._catalog.ordinal_count - len(flagged | library._held)
+    # Nothing flagged is playing, and the store saw every change in order.
+    if player.current is not None:
+        assert library.get_flag_reason(player.current.video_id) is None
+
+    def by_name(playlists):
+        return sorted(([name, list(video_ids)] for name, video_ids in playlists),
+                      key=lambda playlist: playlist[0].lower())
+
+    assert by_name(store.playlists()) == \
+        by_name(player.export_state()["playlists"])
+
+
+def test_stress_mixed_commands(tmp_path):
+    store = PlaylistStore(tmp_path, sync_every=1000)
+    player = ConcurrentVideoPlayer(ask=lambda prompt: "1", out=ListSink(),
+                                   seed=1, no_repeat=2, playlist_store=store)
+    errors = []
+
+    def hammer(seed):
+        rng = random.Random(seed)
+        try:
+            for _ in range(1500):
+                command, *args = random_command(rng)
+                getattr(player, command)(*args)
+        except Exception as e:
+            errors.append(e)
+
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        threads = [threading.Thread(target=hammer, args=(seed,))
+                   for seed in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        sys.setswitchinterval(interval)
+
+    assert errors == []
+    check_invariants(player, store)
+    store.close()
+    # The log replays to the same playlists.
+    reopened = PlaylistStore(tmp_path)
+    assert reopened.playlists() == store.playlists()
+    reopened.close()
+
+
+def test_searches_see_moderation_feeds_whole():
+    player = ConcurrentVideoPlayer(ask=lambda prompt: "No", out=ListSink())
+    library = player._video_library
+    feed = [(video_id, "FLAG", "spam") for video_id in VIDEO_IDS[:4]]
+    allow = [(video_id, "ALLOW", "") for video_id in VIDEO_IDS[:4]]
+    seen = set()
+    done = threading.Event()
+
+    def search():
+        while not done.is_set():
+            seen.add(len(library.search_videos("")))
+
+    reader = threading.Thread(target=search)
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        reader.start()
+        for _ in range(200):
+            player.apply_moderation(feed)
+            player.apply_moderation(allow)
+    finally:
+        done.set()
+        reader.join()
+        sys.setswitchinterval(interval)
+    assert seen <= {1, 5}
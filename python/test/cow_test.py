@@ -0,0 +1,75 @@
+import bisect
+import random
+
+from src.cow import AppendOnlyList, ChunkedList, CowDict
+
+
+def test_cow_dict_forks_do_not_see_each_other():
+    base = CowDict({"a": 1, "b": 2})
+    fork = base.fork()
+    fork["c"] = 3
+    del fork["a"]
+    fork["b"] = 20
+    assert dict(base.items()) == {"a": 1, "b": 2}
+    assert dict(fork.items()) == {"b": 20, "c": 3}
+    assert len(base) == 2 and len(fork) == 2
+    assert "a" not in fork and fork.get("a") is None
+    assert fork.pop("a", "gone") == "gone"
+
+
+def test_cow_dict_edit_copies_shared_values():
+    base = CowDict()
+    base.edit("tag", list, list).append(1)
+    fork = base.fork()
+    fork.edit("tag", list, list).append(2)
+    fork.edit("tag", list, list).append(3)
+    assert base["tag"] == [1]
+    assert fork["tag"] == [1, 2, 3]
+
+
+def test_chunked_list_matches_list():
+    rng = random.Random(7)
+    items = sorted(rng.randrange(1000) for _ in range(300))
+    chunked = ChunkedList(items, chunk_size=8)
+    versions = [(chunked, list(items))]
+    for _ in range(20):
+        chunked = chunked.fork()
+        items = list(items)
+        for _ in range(20):
+            item = rng.randrange(1000)
+            if rng.random() < 0.6:
+                chunked.insort(item)
+                bisect.insort(items, item)
+            elif item in items:
+                assert chunked.remove(item)
+                items.remove(item)
+            else:
+                assert not chunked.remove(item)
+        versions.append((chunked, items))
+    for chunked, items in versions:
+        assert list(chunked) == items
+        assert len(chunked) == len(items)
+        assert chunked[5:40] == items[5:40]
+        assert chunked[-1] == items[-1]
+        assert chunked.bisect_left(500) == bisect.bisect_left(items, 500)
+
+
+def test_chunked_list_append_and_set():
+    first = ChunkedList(range(10), chunk_size=4)
+    second = first.fork()
+    second[9] = "nine"
+    second.append(10)
+    assert list(first) == list(range(10))
+    assert list(second) == list(range(9)) + ["nine", 10]
+    assert second[10] == 10
+
+
+def test_append_only_list_versions():
+    first = AppendOnlyList([1, 2])
+    second = first.fork()
+    second.append(3)
+    third = first.fork()
+    third.append(4)
+    assert list(first) == [1, 2] and len(first) == 2
+    assert list(second) == [1, 2, 3] and list(third) == [1, 2, 4]
+    assert second[2] == 3
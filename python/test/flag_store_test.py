@@ -0,0 +1,64 @@
+from src.flag_store import FlagStore
+from src.video_library import VideoLibrary
+
+
+def test_flag_and_allow():
+    flags = FlagStore()
+    assert not flags
+    assert flags.flag(3, "spam")
+    assert not flags.flag(3, "again")
+    assert flags.flag(100, "Not supplied")
+    assert 3 in flags and 100 in flags and 4 not in flags and 10 ** 6 not in flags
+    assert flags.reason(3) == "spam"
+    assert len(flags) == 2
+    assert flags.allow(3)
+    assert not flags.allow(3)
+    assert flags.reason(3) is None
+    assert len(flags) == 1
+
+
+def test_snapshot_keeps_the_flags_it_was_taken_with():
+    flags = FlagStore()
+    for ordinal in (0, 7, 10 ** 6):
+        assert flags.flag(ordinal, "reason")
+    snapshot = flags.snapshot()
+    flags.allow(7)
+    assert [ordinal for ordinal, _ in snapshot.items()] == [0, 7, 10 ** 6]
+    assert sorted(snapshot.ordinals()) == [0, 7, 10 ** 6]
+    assert 7 in snapshot and 7 not in flags
+    assert 8 not in flags and 10 ** 6 in flags
+
+
+def test_library_counts_allowed_videos():
+    library = VideoLibrary()
+    assert library.count_allowed_videos() == 5
+    library.flag_video("funny_dogs_video_id", "reason")
+    assert library.count_allowed_videos() == 4
+    assert library.get_flag_reason("funny_dogs_video_id") == "reason"
+    assert library.get_flag_reason("amazing_cats_video_id") is None
+
+
+def test_batch_is_published_at_once():
+    flags = FlagStore()
+    flags.flag(1, "spam")
+    before = flags.snapshot()
+    with flags.batch():
+        flags.flag(2, "spam")
+        flags.allow(1)
+        # The thread running the batch sees its changes, snapshots taken
+        # before do not.
+        assert 2 in flags and 1 not in flags
+        assert 1 in before and 2 not in before
+    assert flags.items() == [(2, "spam")]
+    assert before.items() == [(1, "spam")]
+
+
+def test_failed_batch_is_not_published():
+    flags = FlagStore()
+    try:
+        with flags.batch():
+            flags.flag(1, "spam")
+            raise ValueError
+    except ValueError:
+        pass
+    assert not flags and 1 not in flags.snapshot()
@@ -0,0 +1,120 @@
+import io
+import os
+import random
+import subprocess
+import sys
+from pathlib import Path
+
+from src.catalog_generator import CatalogSpec, write_catalog
+from src.command_parser import CommandParser
+from src.moderation import ModerationRecord, parse_moderation_feed
+from src.output_sink import ListSink
+from src.video_player import VideoPlayer
+
+
+def test_parse_moderation_feed():
+    feed = io.StringIO(
+        "amazing_cats_video_id | flag | dont_like_cats\n"
+        "\n"
+        "funny_dogs_video_id|FLAG\n"
+        "funny_dogs_video_id | Allow |\n")
+    assert list(parse_moderation_feed(feed)) == [
+        ModerationRecord("amazing_cats_video_id", "FLAG", "dont_like_cats"),
+        ModerationRecord("funny_dogs_video_id", "FLAG", ""),
+        ModerationRecord("funny_dogs_video_id", "ALLOW", ""),
+    ]
+
+
+def test_apply_moderation_stops_current_video_once():
+    out = ListSink()
+    player = VideoPlayer(out=out)
+    player.play_video("amazing_cats_video_id")
+    counts = player.apply_moderation([
+        ("amazing_cats_video_id", "FLAG", "dont_like_cats"),
+        ("amazing_cats_video_id", "FLAG", "again"),
+        ("funny_dogs_video_id", "FLAG", ""),
+        ("does_not_exist", "FLAG", ""),
+        ("funny_dogs_video_id", "ALLOW", ""),
+        ("nothing_video_id", "ALLOW", ""),
+        ("nothing_video_id", "DELETE", ""),
+    ])
+    assert counts == (2, 1, 4)
+    player.show_all_videos()
+    assert out.lines()[1:3] == [
+        "Stopping video: Amazing Cats",
+        "Applied moderation feed: 2 flagged, 1 allowed, 4 skipped",
+    ]
+    assert ("Amazing Cats (amazing_cats_video_id) [#cat #animal] - FLAGGED "
+            "(reason: dont_like_cats)") in out.lines()[4]
+    assert "Funny Dogs (funny_dogs_video_id) [#dog #animal]" in out.lines()[6]
+
+
+def test_apply_moderation_feed_command(tmp_path):
+    feed = tmp_path / "feed.txt"
+    feed.write_text("life_at_google_video_id | FLAG\n")
+    out = ListSink()
+    parser = CommandParser(VideoPlayer(out=out))
+    parser.execute_command(["APPLY_MODERATION_FEED", str(feed)])
+    parser.execute_command(["PLAY", "life_at_google_video_id"])
+    parser.execute_command(["APPLY_MODERATION_FEED", str(tmp_path / "missing")])
+    assert out.lines() == [
+        "Applied moderation feed: 1 flagged, 0 allowed, 0 skipped",
+        "Cannot play video: Video is currently flagged (reason: Not supplied)",
+        "Cannot apply moderation feed: No such file or directory",
+    ]
+
+
+def test_feed_ends_like_the_single_commands(tmp_path):
+    catalog = tmp_path / "videos.txt"
+    write_catalog(catalog, CatalogSpec(videos=300))
+    rng = random.Random(5)
+    video_ids = [f"video_{number}_id" for number in range(300)]
+    commands = []
+    for _ in range(1000):
+        video_id = rng.choice(video_ids + ["missing_id"])
+        if rng.random() < 0.6:
+            commands.append(["FLAG_VIDEO", video_id, f"reason_{len(commands)}"])
+        else:
+            commands.append(["ALLOW_VIDEO", video_id])
+    feed = tmp_path / "feed.txt"
+    feed.write_text("".join(
+        f"{command[1]} | {command[0][:-6]} | {' '.join(command[2:])}\n"
+        for command in commands))
+
+    players = []
+    for run in (lambda parser: [parser.execute_command(command)
+                                for command in commands],
+                lambda parser: parser.execute_command(
+                    ["APPLY_MODERATION_FEED", str(feed)])):
+        player = VideoPlayer(out=ListSink(), catalog_path=catalog, seed=1)
+        player.play_video(video_ids[0])
+        run(CommandParser(player))
+        players.append(player)
+
+    commands_player, feed_player = players
+    libraries = [player._video_library for player in players]
+    assert libraries[0].get_flags() == libraries[1].get_flags()
+    assert libraries[0].count_allowed_videos() == \
+        libraries[1].count_allowed_videos()
+    assert [ordinal in libraries[0]._allowed for ordinal in range(300)] == \
+        [ordinal in libraries[1]._allowed for ordinal in range(300)]
+    assert (commands_player.current is None) == (feed_player.current is None)
+
+
+def test_feed_is_read_as_utf8_under_c_locale(tmp_path):
+    feed = tmp_path / "feed.txt"
+    feed.write_text("amazing_cats_video_id | FLAG | caf\u00e9\n",
+                    encoding="utf-8")
+    script = (
+        "import sys\n"
+        "from src.moderation import read_moderation_feed\n"
+        "print(ascii([record.reason for record in "
+        "read_moderation_feed(sys.argv[1])]))\n"
+    )
+    env = dict(os.environ, LC_ALL="C", PYTHONUTF8="0",
+               PYTHONCOERCECLOCALE="0")
+    result = subprocess.run(
+        [sys.executable, "-c", script, str(feed)], env=env,
+        cwd=Path(__file__).parent.parent, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == "['caf\\xe9']"
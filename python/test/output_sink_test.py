@@ -0,0 +1,46 @@
+import io
+from unittest import mock
+
+from src.command_parser import CommandParser
+from src.output_sink import BufferedSink, ListSink, NullSink
+from src.video_player import VideoPlayer
+
+COMMANDS = [
+    "SHOW_ALL_VIDEOS", "PLAY funny_dogs_video_id", "PAUSE", "SHOW_PLAYING",
+    "CREATE_PLAYLIST my_list", "ADD_TO_PLAYLIST my_list nothing_video_id",
+    "SHOW_PLAYLIST my_list", "SHOW_ALL_PLAYLISTS", "SEARCH_VIDEOS cat",
+    "UNKNOWN", "HELP",
+]
+
+
+def _run(parser):
+    for command in COMMANDS:
+        parser.execute_command(command.split())
+
+
+@mock.patch('builtins.input', lambda *args: 'No')
+def test_sink_output_matches_stdout(capfd):
+    _run(CommandParser(VideoPlayer()))
+    out, err = capfd.readouterr()
+
+    sink = ListSink()
+    _run(CommandParser(VideoPlayer(ask=lambda prompt: "No", out=sink)))
+    assert sink.getvalue() == out
+
+
+def test_buffered_sink_writes_in_chunks():
+    stream = io.StringIO()
+    sink = BufferedSink(stream, chunk_size=10)
+    sink.write("12345\n")
+    assert stream.getvalue() == ""
+    sink.write("67890\n")
+    assert stream.getvalue() == "12345\n67890\n"
+    sink.write("end\n")
+    sink.flush()
+    assert stream.getvalue() == "12345\n67890\nend\n"
+
+
+def test_null_sink(capfd):
+    _run(CommandParser(VideoPlayer(ask=lambda prompt: "No", out=NullSink())))
+    out, err = capfd.readouterr()
+    assert out == ""
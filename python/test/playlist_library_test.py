@@ -0,0 +1,49 @@
+from src.playlist_library import PlaylistLibrary
+from src.video import Video
+
+
+def test_create_is_case_insensitive():
+    library = PlaylistLibrary()
+    playlist = library.create("My_Playlist")
+    assert playlist.playlist_name == "My_Playlist"
+    assert library.create("MY_PLAYLIST") is None
+    assert "my_playlist" in library
+    assert library.get("my_PLAYLIST") is playlist
+
+
+def test_playlists_are_listed_in_sorted_order():
+    library = PlaylistLibrary()
+    for name in ["zebra", "Apple", "mango", "banana"]:
+        library.create(name)
+    assert [p.playlist_name for p in library] == [
+        "Apple", "banana", "mango", "zebra"]
+    library.delete("MANGO")
+    library.create("Cherry")
+    assert [p.playlist_name for p in library] == [
+        "Apple", "banana", "Cherry", "zebra"]
+    assert len(library) == 4
+
+
+def test_delete_missing_playlist():
+    library = PlaylistLibrary()
+    assert library.delete("nothing") is None
+    assert not library
+
+
+def test_playlists_holding_a_video():
+    library = PlaylistLibrary()
+    cats = Video("Amazing Cats", "cats_id", [])
+    dogs = Video("Funny Dogs", "dogs_id", [])
+    zebra, apple, mango = (library.create(name)
+                           for name in ["zebra", "Apple", "mango"])
+    for playlist in (zebra, apple, mango):
+        playlist.add(cats)
+    mango.add(dogs)
+    assert library.holding("cats_id") == [apple, mango, zebra]
+    assert library.holding("dogs_id") == [mango]
+    apple.remove(cats)
+    zebra.clear()
+    assert library.holding("cats_id") == [mango]
+    library.delete("mango")
+    assert library.holding("cats_id") == [] and library.holding("dogs_id") == []
+    assert library.holding("missing_id") == []
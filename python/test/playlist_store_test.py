@@ -0,0 +1,115 @@
+import os
+import threading
+
+from src.output_sink import ListSink
+from src.playlist_store import LOG_FILE, SNAPSHOT_FILE, PlaylistStore
+from src.run import run_batch
+from src.video_player import VideoPlayer
+
+
+def test_store_replays_the_log(tmp_path):
+    with PlaylistStore(tmp_path) as store:
+        store.create("My_Playlist")
+        store.add("my_playlist", "amazing_cats_video_id")
+        store.add("my_playlist", "funny_dogs_video_id")
+        store.remove("MY_PLAYLIST", "amazing_cats_video_id")
+        store.create("gone")
+        store.delete("gone")
+        store.create("emptied")
+        store.add("emptied", "funny_dogs_video_id")
+        store.clear("emptied")
+
+    store = PlaylistStore(tmp_path)
+    assert store.playlists() == [
+        ("My_Playlist", ["funny_dogs_video_id"]),
+        ("emptied", []),
+    ]
+    assert store.replayed == store.sequence == 9
+
+
+def test_snapshot_compacts_the_log(tmp_path):
+    with PlaylistStore(tmp_path, snapshot_every=4) as store:
+        store.create("a")
+        for video_id in ("v1", "v2", "v3", "v4"):
+            store.add("a", video_id)
+    assert os.path.exists(tmp_path / SNAPSHOT_FILE)
+
+    store = PlaylistStore(tmp_path)
+    assert store.playlists() == [("a", ["v1", "v2", "v3", "v4"])]
+    # Four changes went into the snapshot, only the last one is replayed.
+    assert store.replayed == 1
+    assert store.sequence == 5
+
+
+def test_records_older_than_the_snapshot_are_skipped(tmp_path):
+    with PlaylistStore(tmp_path) as store:
+        store.create("a")
+        store.add("a", "v1")
+        log = (tmp_path / LOG_FILE).read_text()
+        store.snapshot()
+    # A crash between writing the snapshot and emptying the log.
+    (tmp_path / LOG_FILE).write_text(log)
+    store = PlaylistStore(tmp_path)
+    assert store.playlists() == [("a", ["v1"])]
+    assert store.replayed == 0
+
+
+def test_torn_last_record_is_dropped(tmp_path):
+    with PlaylistStore(tmp_path) as store:
+        store.create("a")
+        store.add("a", "v1")
+    with open(tmp_path / LOG_FILE, "a") as log:
+        log.write('[3, "add", "a", "v')
+
+    with PlaylistStore(tmp_path) as store:
+        assert store.playlists() == [("a", ["v1"])]
+        store.add("a", "v2")
+    assert PlaylistStore(tmp_path).playlists() == [("a", ["v1", "v2"])]
+
+
+def test_group_commit_syncs_in_batches(tmp_path, monkeypatch):
+    synced = []
+    monkeypatch.setattr(os, "fsync", synced.append)
+    store = PlaylistStore(tmp_path, sync_every=3, sync_interval=3600)
+    for number in range(7):
+        store.create(f"p{number}")
+    assert len(synced) == 2
+    store.close()
+    assert len(synced) == 3
+
+
+def test_idle_changes_are_synced_after_the_interval(tmp_path, monkeypatch):
+    synced = threading.Event()
+    monkeypatch.setattr(os, "fsync", lambda descriptor: synced.set())
+    store = PlaylistStore(tmp_path, sync_every=100, sync_interval=0.2)
+    store.create("a")
+    assert not synced.is_set()
+    # Nothing else is recorded, the timer syncs the change on its own.
+    assert synced.wait(5)
+    store.close()
+
+
+def test_player_playlists_survive_a_restart(tmp_path):
+    script = [
+        "CREATE_PLAYLIST my_PLAYlist\n",
+        "ADD_TO_PLAYLIST my_playlist amazing_cats_video_id\n",
+        "ADD_TO_PLAYLIST my_playlist funny_dogs_video_id\n",
+        "ADD_TO_PLAYLIST my_playlist missing_video_id\n",
+        "REMOVE_FROM_PLAYLIST my_playlist funny_dogs_video_id\n",
+        "CREATE_PLAYLIST other\n",
+        "DELETE_PLAYLIST other\n",
+    ]
+    with PlaylistStore(tmp_path) as store:
+        run_batch(script, ListSink(), playlist_store=store)
+
+    out = ListSink()
+    with PlaylistStore(tmp_path) as store:
+        player = VideoPlayer(out=out, playlist_store=store)
+        player.show_all_playlists()
+        player.show_playlist("my_playlist")
+    assert out.lines() == [
+        "Showing all playlists:",
+        "my_PLAYlist",
+        "Showing playlist: my_playlist",
+        "Amazing Cats (amazing_cats_video_id) [#cat #animal]",
+    ]
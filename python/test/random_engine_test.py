@@ -0,0 +1,108 @@
+from collections import Counter
+
+import pytest
+
+from src.fenwick_tree import FenwickTree
+from src.output_sink import ListSink
+from src.random_engine import RandomEngine
+from src.video_library import VideoLibrary
+from src.video_player import VideoPlayer
+
+
+def test_fenwick_tree_extend_matches_a_rebuild():
+    weights = [float(weight % 7) for weight in range(1, 40)]
+    for start in (0, 1, 5, 16, 39):
+        tree = FenwickTree(weights[:start])
+        tree.extend(weights[start:])
+        built = FenwickTree(weights)
+        assert list(tree._tree) == list(built._tree)
+        assert [tree.find(target + 0.5) for target in range(int(tree.total()))] \
+            == [built.find(target + 0.5) for target in range(int(built.total()))]
+
+
+def test_fenwick_tree_find_and_update():
+    tree = FenwickTree([1.0, 0.0, 2.0, 1.0])
+    assert tree.total() == 4.0
+    assert [tree.find(t) for t in (0.0, 0.99, 1.0, 2.99, 3.0, 3.99)] == [
+        0, 0, 2, 2, 3, 3]
+    assert tree.find(4.0) is None
+    tree.set(1, 5.0)
+    tree.set(2, 0.0)
+    assert tree.total() == 7.0
+    assert tree.find(1.0) == 1
+    assert tree.find(6.5) == 3
+
+
+def test_seeded_players_play_the_same_videos():
+    def picks(seed):
+        out = ListSink()
+        player = VideoPlayer(out=out, seed=seed)
+        for _ in range(10):
+            player.play_random_video()
+        return [line for line in out.lines() if line.startswith("Playing")]
+
+    assert picks(42) == picks(42)
+
+
+def test_weighted_selection_follows_weights():
+    library = VideoLibrary()
+    engine = RandomEngine(library, seed=3)
+    engine.set_weights({
+        "funny_dogs_video_id": 0,
+        "amazing_cats_video_id": 9,
+        "another_cat_video_id": 1,
+        "life_at_google_video_id": 0,
+        "nothing_video_id": 0,
+    })
+    counts = Counter(engine.choose().video_id for _ in range(2000))
+    assert set(counts) == {"amazing_cats_video_id", "another_cat_video_id"}
+    assert 1600 < counts["amazing_cats_video_id"] < 1950
+
+    library.flag_video("amazing_cats_video_id", "reason")
+    assert {engine.choose().video_id for _ in range(50)} == {
+        "another_cat_video_id"}
+
+
+def test_no_repeat_window():
+    engine = RandomEngine(VideoLibrary(), seed=11, no_repeat=4)
+    picks = [engine.choose().video_id for _ in range(50)]
+    for i in range(len(picks) - 4):
+        assert len(set(picks[i:i + 5])) == 5
+
+
+def test_no_repeat_window_larger_than_catalog():
+    library = VideoLibrary()
+    engine = RandomEngine(library, seed=1, no_repeat=10)
+    for video_id in ["funny_dogs_video_id", "amazing_cats_video_id",
+                     "another_cat_video_id", "life_at_google_video_id"]:
+        library.flag_video(video_id, "reason")
+    for _ in range(5):
+        assert engine.choose().video_id == "nothing_video_id"
+
+
+def test_invalid_weights_are_rejected():
+    library = VideoLibrary()
+    engine = RandomEngine(library, seed=5)
+    with pytest.raises(ValueError):
+        library.set_weight("amazing_cats_video_id", -1)
+    with pytest.raises(ValueError):
+        engine.set_weights({"funny_dogs_video_id": 0,
+                            "amazing_cats_video_id": float("nan")})
+    assert library.set_weight("nothing_video_id_x", 2) is False
+    # Nothing was changed, every video is still equally likely.
+    picked = {engine.choose().video_id for _ in range(200)}
+    assert len(picked) == 5
+
+
+def test_weights_follow_videos_added_to_the_catalog(tmp_path):
+    path = tmp_path / "videos.txt"
+    path.write_text("Amazing Cats | cats_id | #cat\nFunny Dogs | dogs_id |\n")
+    library = VideoLibrary(catalog_path=path)
+    engine = RandomEngine(library, seed=2)
+    engine.set_weights({"cats_id": 0, "dogs_id": 3})
+    with open(path, "a") as catalog:
+        catalog.write("More Cats | more_cats_id |\n")
+    library.reload()
+    counts = Counter(engine.choose().video_id for _ in range(2000))
+    assert set(counts) == {"dogs_id", "more_cats_id"}
+    assert 1350 < counts["dogs_id"] < 1650
@@ -0,0 +1,63 @@
+import io
+import os
+import shutil
+from pathlib import Path
+
+from src.output_sink import ListSink
+from src.run import run_batch
+from src.video_catalog import VideoCatalog
+
+
+def test_run_batch_executes_until_exit():
+    script = io.StringIO(
+        "PLAY amazing_cats_video_id\n"
+        "PLAY\n"
+        "SHOW_PLAYING\n"
+        "EXIT\n"
+        "STOP\n")
+    out = ListSink()
+    assert run_batch(script, out) == 3
+    assert out.lines() == [
+        "Playing video: Amazing Cats",
+        "Please enter PLAY command followed by video_id.",
+        "Currently playing: Amazing Cats (amazing_cats_video_id) "
+        "[#cat #animal]",
+    ]
+
+
+def test_run_batch_answers_search_from_script():
+    script = io.StringIO(
+        "SEARCH_VIDEOS_WITH_TAG #dog\n"
+        "1\n"
+        "SHOW_PLAYING\n")
+    out = ListSink()
+    assert run_batch(script, out) == 2
+    lines = out.lines()
+    assert "1) Funny Dogs (funny_dogs_video_id) [#dog #animal]" in lines[1]
+    assert "Playing video: Funny Dogs" in lines[4]
+    assert lines[-1] == ("Currently playing: Funny Dogs "
+                         "(funny_dogs_video_id) [#dog #animal]")
+
+
+def test_run_batch_watches_catalog(tmp_path):
+    path = tmp_path / "videos.txt"
+    shutil.copy(Path(__file__).parent.parent / "src" / "videos.txt", path)
+
+    def script():
+        yield "NUMBER_OF_VIDEOS\n"
+        stat = os.stat(path)
+        with open(path, "a") as catalog_file:
+            catalog_file.write("\nNew | new_id |")
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+        yield "NUMBER_OF_VIDEOS\n"
+
+    out = ListSink()
+    try:
+        assert run_batch(script(), out, catalog_path=path, watch=True) == 2
+    finally:
+        VideoCatalog.clear_cache()
+    assert out.lines() == [
+        "5 videos in the library",
+        "Reloaded catalog: 1 added, 0 removed, 0 updated",
+        "6 videos in the library",
+    ]
@@ -0,0 +1,83 @@
+import random
+
+from src import search_index
+from src.search_index import NgramIndex
+from src.video import Video
+from src.video_library import VideoLibrary
+
+
+def _scan(videos, term):
+    """Matches the videos one by one and sorts them by title, keeping the
+    order they were added in for equal titles."""
+    return sorted((v for v in videos if term.lower() in v.title.lower()),
+                  key=lambda video: video.title)
+
+
+def test_search_matches_linear_scan():
+    rng = random.Random(7)
+    words = ["Cat", "dog", "Google", "ÄRGER", "nothing", "cats", "a", "İstanbul"]
+    videos = [
+        Video(" ".join(rng.choice(words) for _ in range(rng.randint(1, 4))),
+              f"video_{i}", [])
+        for i in range(300)
+    ]
+    index = NgramIndex()
+    for video in videos:
+        index.add(video)
+    built = NgramIndex()
+    built.add_all(videos)
+
+    for term in ["cat", "CATS", "a", "", "og go", "ärg", "istan", "zzz", "at d"]:
+        assert index.search(term) == _scan(videos, term)
+        assert built.search(term) == _scan(videos, term)
+
+
+def test_search_after_remove():
+    index = NgramIndex()
+    cats = Video("Amazing Cats", "cats_id", [])
+    more_cats = Video("More Cats", "more_cats_id", [])
+    index.add(cats)
+    index.add(more_cats)
+    index.remove("cats_id")
+    assert index.search("cats") == [more_cats]
+    assert index.search("s") == [more_cats]
+    assert len(index) == 1
+
+
+def test_fork_leaves_original_unchanged():
+    index = NgramIndex()
+    cats = Video("Amazing Cats", "cats_id", [])
+    index.add(cats)
+    first, second = index.fork(), index.fork()
+    first.remove("cats_id")
+    renamed = Video("Amazing Dogs", "cats_id", [])
+    first.add(renamed)
+    second.add(Video("Cats Again", "again_id", []))
+    assert index.search("cats") == [cats] and index.search("a") == [cats]
+    assert first.search("a") == [renamed] and first.search("cats") == []
+    assert [video.video_id for video in second.search("cats")] == \
+        ["cats_id", "again_id"]
+
+
+def test_replacing_a_title_over_and_over_stays_bounded(monkeypatch):
+    monkeypatch.setattr(search_index, "COMPACT_AFTER", 8)
+    index = NgramIndex()
+    index.add_all([Video("Funny Dogs", "dogs_id", []),
+                   Video("Amazing Cats", "cats_id", [])])
+    before = index.fork()
+    index = index.fork()
+    for number in range(100):
+        index.add(Video(f"Cats {number}", "cats_id", []))
+        assert len(index._videos) <= 2 + 8 + 1
+    assert [video.title for video in index.search("a")] == \
+        ["Cats 99"]
+    assert [video.title for video in index.search("s")] == \
+        ["Cats 99", "Funny Dogs"]
+    assert [video.title for video in before.search("s")] == \
+        ["Amazing Cats", "Funny Dogs"]
+
+
+def test_library_search_videos():
+    library = VideoLibrary()
+    titles = [video.title for video in library.search_videos("CAT")]
+    assert titles == ["Amazing Cats", "Another Cat Video"]
@@ -0,0 +1,164 @@
+import asyncio
+
+from src.server import BUSY, GOODBYE, WELCOME, VideoServer
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+async def start(**options):
+    server = VideoServer(**options)
+    listener = await server.start_tcp("127.0.0.1", 0)
+    port = listener.sockets[0].getsockname()[1]
+    return server, port
+
+
+async def read_until_closed(reader):
+    data = await reader.read()
+    return data.decode()
+
+
+def test_pipelined_commands_and_search_answer():
+    async def scenario():
+        server, port = await start()
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(b"PLAY amazing_cats_video_id\n"
+                     b"SEARCH_VIDEOS dog\n"
+                     b"1\n"
+                     b"SHOW_PLAYING\n"
+                     b"EXIT\n")
+        output = await read_until_closed(reader)
+        writer.close()
+        await server.close()
+        return output
+
+    output = run(scenario())
+    assert output.startswith(WELCOME + (
+        "Playing video: Amazing Cats\n"
+        "Here are the results for dog:\n"
+        "1) Funny Dogs (funny_dogs_video_id) [#dog #animal]\n"))
+    assert "Stopping video: Amazing Cats\nPlaying video: Funny Dogs\n" \
+        in output
+    assert output.endswith(
+        "Currently playing: Funny Dogs (funny_dogs_video_id) [#dog #animal]\n"
+        + GOODBYE)
+
+
+def test_search_waits_for_the_answer():
+    async def scenario():
+        server, port = await start()
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        await reader.readline()
+        await reader.readline()
+        writer.write(b"SEARCH_VIDEOS_WITH_TAG #cat\n")
+        lines = [await reader.readline() for _ in range(5)]
+        writer.write(b"no\nSHOW_PLAYING\nEXIT\n")
+        rest = await read_until_closed(reader)
+        writer.close()
+        await server.close()
+        return lines, rest
+
+    lines, rest = run(scenario())
+    assert lines[-1] == b"If your answer is not a valid number, we will " \
+                        b"assume it's a no.\n"
+    assert rest == "No video is currently playing\n" + GOODBYE
+
+
+def test_sessions_are_separate():
+    async def scenario():
+        server, port = await start()
+        first = await asyncio.open_connection("127.0.0.1", port)
+        second = await asyncio.open_connection("127.0.0.1", port)
+        first[1].write(b"CREATE_PLAYLIST mine\nPLAY funny_dogs_video_id\n"
+                       b"EXIT\n")
+        await read_until_closed(first[0])
+        second[1].write(b"SHOW_ALL_PLAYLISTS\nSHOW_PLAYING\nEXIT\n")
+        output = await read_until_closed(second[0])
+        await server.close()
+        return output, server.connections
+
+    output, connections = run(scenario())
+    assert output == WELCOME + "No playlists exist yet\n" \
+        "No video is currently playing\n" + GOODBYE
+    assert connections == 0
+
+
+def test_connections_above_the_limit_are_rejected():
+    async def scenario():
+        server, port = await start(max_connections=1)
+        first = await asyncio.open_connection("127.0.0.1", port)
+        await first[0].readline()
+        second = await asyncio.open_connection("127.0.0.1", port)
+        rejected = await read_until_closed(second[0])
+        first[1].write(b"EXIT\n")
+        await read_until_closed(first[0])
+        await server.close()
+        return rejected, server.rejected
+
+    assert run(scenario()) == (BUSY, 1)
+
+
+def test_unanswered_search_times_out_as_no():
+    async def scenario():
+        server, port = await start(answer_timeout=0.05)
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(b"SEARCH_VIDEOS cat\n")
+        await asyncio.sleep(0.2)
+        writer.write(b"SHOW_PLAYING\nEXIT\n")
+        output = await read_until_closed(reader)
+        await server.close()
+        return output
+
+    assert run(scenario()).endswith(
+        "No video is currently playing\n" + GOODBYE)
+
+
+def test_unanswered_searches_hold_no_worker():
+    async def scenario():
+        server, port = await start(workers=2, answer_timeout=30)
+        stalled = []
+        for _ in range(2):
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.write(b"SEARCH_VIDEOS cat\n")
+            # Wait for the question, then never answer it.
+            while not (await reader.readline()).startswith(b"If your"):
+                pass
+            stalled.append(writer)
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(b"NUMBER_OF_VIDEOS\nEXIT\n")
+        output = await asyncio.wait_for(read_until_closed(reader), 5)
+        for writer in stalled:
+            writer.close()
+        await server.close()
+        return output
+
+    assert run(scenario()) == WELCOME + "5 videos in the library\n" + GOODBYE
+
+
+def test_search_steps_come_from_the_command_table():
+    from src.command_parser import CommandParser
+
+    original = CommandParser.COMMANDS["SEARCH_VIDEOS"]
+
+    async def scenario():
+        server, port = await start()
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        await reader.readline()
+        await reader.readline()
+        CommandParser.register_command(
+            "SEARCH_VIDEOS", "search_videos", (1,), original.usage,
+            original.help, ("show_tag_results", "", "play_search_answer"))
+        writer.write(b"SEARCH_VIDEOS #dog\n1\nEXIT\n")
+        output = await read_until_closed(reader)
+        await server.close()
+        return output
+
+    try:
+        output = run(scenario())
+    finally:
+        CommandParser.COMMANDS["SEARCH_VIDEOS"] = original
+    assert output.startswith(
+        "Here are the results for #dog:\n"
+        "1) Funny Dogs (funny_dogs_video_id) [#dog #animal]\n")
+    assert "Playing video: Funny Dogs\n" in output
@@ -0,0 +1,142 @@
+import asyncio
+
+import pytest
+
+from src.output_sink import ListSink
+from src.server import USER_PROMPT, WELCOME, VideoServer
+from src.session_manager import SessionError, SessionManager
+from src.video_player import VideoPlayer
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def use(manager, user_id, *commands):
+    out = ListSink()
+    player = manager.checkout(user_id, out=out)
+    for command, *args in commands:
+        getattr(player, command)(*args)
+    manager.checkin(user_id, player)
+    return out.getvalue()
+
+
+def test_export_and_restore_state():
+    player = VideoPlayer(out=ListSink())
+    player.create_playlist("My_List")
+    player.add_to_playlist("my_list", "amazing_cats_video_id")
+    player.add_to_playlist("my_list", "funny_dogs_video_id")
+    player.flag_video("life_at_google_video_id", "dont_like")
+    player.play_video("funny_dogs_video_id")
+    player.pause_video()
+    state = player.export_state()
+    assert state == {
+        "current": "funny_dogs_video_id",
+        "paused": True,
+        "playlists": [["My_List", ["amazing_cats_video_id",
+                                   "funny_dogs_video_id"]]],
+        "flags": [["life_at_google_video_id", "dont_like"]],
+    }
+
+    restored = VideoPlayer(out=ListSink())
+    restored.restore_state(state)
+    assert restored.export_state() == state
+    assert restored.out.getvalue() == ""
+
+
+def test_hits_misses_and_separate_users():
+    manager = SessionManager()
+    use(manager, "ann", ("create_playlist", "mine"),
+        ("play_video", "amazing_cats_video_id"))
+    assert use(manager, "bob", ("show_playing",)) == \
+        "No video is currently playing\n"
+    assert use(manager, "ann", ("show_playing",), ("show_all_playlists",)) == (
+        "Currently playing: Amazing Cats (amazing_cats_video_id) "
+        "[#cat #animal]\n"
+        "Showing all playlists:\n"
+        "mine\n")
+    assert (manager.hits, manager.misses) == (1, 2)
+    assert manager.hit_rate == pytest.approx(1 / 3)
+    assert len(manager) == 2
+
+
+def test_one_checkout_per_user():
+    manager = SessionManager()
+    player = manager.checkout("ann", out=ListSink())
+    with pytest.raises(SessionError):
+        manager.checkout("ann")
+    manager.checkin("ann", player)
+    manager.checkin("ann", manager.checkout("ann", out=ListSink()))
+
+
+def test_lru_eviction_spills_and_restores(tmp_path):
+    manager = SessionManager(spill_directory=tmp_path, max_sessions=2)
+    use(manager, "ann", ("flag_video", "amazing_cats_video_id", "spam"))
+    use(manager, "bob", ("create_playlist", "bobs"))
+    use(manager, "cid", ("play_video", "funny_dogs_video_id"))
+    assert manager.evictions == 1
+    assert len(list(tmp_path.iterdir())) == 1
+
+    assert use(manager, "ann", ("play_video", "amazing_cats_video_id")) == \
+        "Cannot play video: Video is currently flagged (reason: spam)\n"
+    assert manager.restored == 1
+    # Restoring ann pushed out bob, the least recently used.
+    assert use(manager, "bob", ("show_all_playlists",)) == \
+        "Showing all playlists:\nbobs\n"
+    assert manager.restored == 2
+    assert manager.stats()["idle"] == 2
+
+
+def test_ttl_and_memory_budget(tmp_path):
+    clock = Clock()
+    manager = SessionManager(spill_directory=tmp_path, ttl=10, clock=clock)
+    use(manager, "ann", ("create_playlist", "mine"))
+    clock.now = 5
+    use(manager, "bob")
+    clock.now = 12
+    manager.evict_idle()
+    assert (manager.evictions, manager.expired) == (1, 1)
+    assert manager.stats()["idle"] == 1
+
+    small = SessionManager(spill_directory=tmp_path / "small",
+                           memory_budget=1000)
+    use(small, "ann", ("create_playlist", "a" * 200))
+    use(small, "bob", ("create_playlist", "b" * 200))
+    assert small.evictions == 1
+    assert small.idle_bytes <= 1000
+
+
+def test_close_spills_everything(tmp_path):
+    manager = SessionManager(spill_directory=tmp_path)
+    use(manager, "ann", ("create_playlist", "mine"))
+    manager.close()
+    reopened = SessionManager(spill_directory=tmp_path)
+    assert use(reopened, "ann", ("show_all_playlists",)) == \
+        "Showing all playlists:\nmine\n"
+    assert reopened.restored == 1
+
+
+def test_server_keeps_sessions_by_user_name():
+    async def connect(port, lines):
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(lines)
+        output = (await reader.read()).decode()
+        writer.close()
+        return output
+
+    async def scenario():
+        server = VideoServer(sessions=SessionManager())
+        listener = await server.start_tcp("127.0.0.1", 0)
+        port = listener.sockets[0].getsockname()[1]
+        first = await connect(port, b"ann\nPLAY funny_dogs_video_id\nEXIT\n")
+        second = await connect(port, b"ann\nSHOW_PLAYING\nEXIT\n")
+        await server.close()
+        return first, second
+
+    first, second = asyncio.run(scenario())
+    assert first.startswith(WELCOME + USER_PROMPT)
+    assert "Currently playing: Funny Dogs" in second
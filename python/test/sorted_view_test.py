@@ -0,0 +1,58 @@
+from src.sorted_view import SortedVideoView, listing_key
+from src.video import Video
+from src.video_catalog import VideoCatalog
+from src.video_library import VideoLibrary
+
+
+def _videos():
+    return [
+        Video("Funny Dogs", "funny_dogs_video_id", ["#dog", "#animal"]),
+        Video("Amazing Cats", "amazing_cats_video_id", ["#cat", "#animal"]),
+        Video("Video about nothing", "nothing_video_id", []),
+    ]
+
+
+def test_view_keeps_listing_order():
+    view = SortedVideoView()
+    videos = _videos()
+    for video in videos:
+        view.add(video)
+    assert [listing_key(v) for v in view] == sorted(
+        listing_key(v) for v in videos)
+    assert view[0].title == "Amazing Cats"
+    assert [v.title for v in view[1:]] == ["Funny Dogs", "Video about nothing"]
+    assert view.rank("nothing_video_id") == 2
+    assert view.rank("does_not_exist") is None
+
+
+def test_view_add_and_remove():
+    view = SortedVideoView()
+    for video in _videos():
+        view.add(video)
+    view.remove("amazing_cats_video_id")
+    view.add(Video("Best Birds", "birds_video_id", ["#bird"]))
+    assert [v.video_id for v in view] == [
+        "birds_video_id", "funny_dogs_video_id", "nothing_video_id"]
+    assert len(view) == 3
+
+
+def test_catalog_updates_built_indexes():
+    catalog = VideoCatalog({video.video_id: video for video in _videos()})
+    assert len(catalog.sorted_view) == 3
+    assert len(catalog.tag_index.videos_with_tag("#animal")) == 2
+
+    catalog.add_video(Video("Cute Cat", "cute_cat_video_id", ["#cat"]))
+    catalog.remove_video("funny_dogs_video_id")
+
+    assert [v.video_id for v in catalog.sorted_view] == [
+        "amazing_cats_video_id", "cute_cat_video_id", "nothing_video_id"]
+    assert [v.video_id for v in catalog.tag_index.videos_with_tag("#cat")] == [
+        "amazing_cats_video_id", "cute_cat_video_id"]
+    assert catalog.title_index.search("dog") == []
+
+
+def test_library_sorted_videos():
+    library = VideoLibrary()
+    assert [v.title for v in library.get_sorted_videos()] == [
+        "Amazing Cats", "Another Cat Video", "Funny Dogs", "Life at Google",
+        "Video about nothing"]
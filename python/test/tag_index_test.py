@@ -0,0 +1,51 @@
+import pytest
+
+from src.tag_index import TagIndex
+from src.video import Video
+from src.video_library import VideoLibrary
+
+
+@pytest.fixture
+def index():
+    index = TagIndex()
+    for video in [
+        Video("Funny Dogs", "dogs", ["#dog", "#animal"]),
+        Video("Amazing Cats", "cats", ["#cat", "#animal"]),
+        Video("Cat and Dog", "both", ["#cat", "#dog", "#animal"]),
+        Video("Life at Google", "google", ["#google", "#career"]),
+    ]:
+        index.add(video)
+    return index
+
+
+def _ids(videos):
+    return [video.video_id for video in videos]
+
+
+def test_videos_with_tag_are_sorted_by_title(index):
+    assert _ids(index.videos_with_tag("#animal")) == ["cats", "both", "dogs"]
+    assert index.videos_with_tag("#unknown") == []
+
+
+def test_query_and_or_not(index):
+    assert _ids(index.query(all_of=["#cat", "#dog"])) == ["both"]
+    assert _ids(index.query(any_of=["#cat", "#career"])) == [
+        "cats", "both", "google"]
+    assert _ids(index.query(any_of=["#animal"], none_of=["#dog"])) == ["cats"]
+    assert _ids(index.query(all_of=["#animal"], any_of=["#cat", "#google"],
+                            none_of=["#dog"])) == ["cats"]
+    with pytest.raises(ValueError):
+        index.query(none_of=["#dog"])
+
+
+def test_remove_updates_postings(index):
+    index.remove("cats")
+    assert _ids(index.videos_with_tag("#cat")) == ["both"]
+    index.remove("google")
+    assert "#google" not in index.tags()
+
+
+def test_library_videos_with_tag():
+    library = VideoLibrary()
+    assert _ids(library.get_videos_with_tag("#cat")) == [
+        "amazing_cats_video_id", "another_cat_video_id"]
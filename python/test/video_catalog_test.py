@@ -0,0 +1,73 @@
+import os
+import shutil
+from pathlib import Path
+
+from src.video_catalog import VideoCatalog
+from src.video_library import VideoLibrary
+from src.video_player import VideoPlayer
+
+VIDEOS_TXT = Path(__file__).parent.parent / "src" / "videos.txt"
+
+
+def test_libraries_share_one_catalog():
+    first = VideoLibrary()
+    second = VideoLibrary()
+    assert first._catalog is second._catalog
+    assert (first.get_video("amazing_cats_video_id")
+            is second.get_video("amazing_cats_video_id"))
+
+
+def test_catalog_is_released_with_library():
+    library = VideoLibrary()
+    catalog = library._catalog
+    refs = catalog.refs
+    library.close()
+    assert catalog.refs == refs - 1
+    library.close()
+    assert catalog.refs == refs - 1
+
+
+def test_catalog_reloads_when_file_changes(tmp_path):
+    path = tmp_path / "videos.txt"
+    shutil.copy(VIDEOS_TXT, path)
+    first = VideoCatalog.acquire(path)
+    assert VideoCatalog.acquire(path) is first
+
+    with open(path, "a") as video_file:
+        video_file.write("\nNew Video | new_video_id | #new")
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+
+    second = VideoCatalog.acquire(path)
+    assert second is not first
+    assert len(second.videos) == 6
+    assert len(first.videos) == 5
+
+
+def test_players_do_not_share_playback_state(capfd):
+    first = VideoPlayer()
+    second = VideoPlayer()
+    first.play_video("amazing_cats_video_id")
+    first.pause_video()
+    second.play_video("amazing_cats_video_id")
+    second.show_playing()
+    out, err = capfd.readouterr()
+    lines = out.splitlines()
+    assert lines[-1] == ("Currently playing: Amazing Cats "
+                         "(amazing_cats_video_id) [#cat #animal]")
+
+
+def test_readers_keep_their_version():
+    library = VideoLibrary(videos={
+        video.video_id: video for video in VideoLibrary().get_all_videos()})
+    catalog = library._catalog
+    before = catalog.current
+    cats = before.title_index.search("cat")
+    catalog.remove_video("amazing_cats_video_id")
+    assert before.title_index.search("cat") == cats
+    assert before.videos.get("amazing_cats_video_id") is not None
+    assert catalog.current.number == before.number + 1
+    assert [video.video_id for video in library.search_videos("cat")] == \
+        ["another_cat_video_id"]
+    assert "amazing_cats_video_id" not in \
+        [video.video_id for video in catalog.current.sorted_view]
@@ -0,0 +1,41 @@
+from src.video import Video
+from src.video_playlist import Playlist
+
+
+def _videos(count):
+    return [Video(f"Video {i}", f"video_{i}", []) for i in range(count)]
+
+
+def test_add_keeps_insertion_order_and_rejects_duplicates():
+    playlist = Playlist("my_playlist")
+    videos = _videos(3)
+    for video in videos:
+        assert playlist.add(video)
+    assert not playlist.add(videos[1])
+    assert list(playlist) == videos
+    assert len(playlist) == 3
+    assert videos[2] in playlist
+
+
+def test_remove_and_positional_access():
+    playlist = Playlist("my_playlist")
+    videos = _videos(10)
+    for video in videos:
+        playlist.add(video)
+    assert playlist.remove(videos[0])
+    assert playlist.remove(videos[5])
+    assert not playlist.remove(videos[5])
+    assert videos[5] not in playlist
+    assert playlist[0] is videos[1]
+    assert playlist[4] is videos[6]
+    assert playlist[-1] is videos[9]
+    assert list(playlist) == videos[1:5] + videos[6:]
+
+
+def test_clear():
+    playlist = Playlist("my_playlist")
+    for video in _videos(3):
+        playlist.add(video)
+    playlist.clear()
+    assert not playlist
+    assert list(playlist) == []
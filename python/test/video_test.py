@@ -0,0 +1,40 @@
+import pytest
+
+from src.catalog_generator import CatalogSpec, write_catalog
+from src.memory_benchmark import measure
+from src.video import TagPool, Video
+from src.video_library import VideoLibrary
+
+
+def test_video_has_no_dict():
+    video = Video("Amazing Cats", "amazing_cats_video_id", ["#cat"])
+    assert not hasattr(video, "__dict__")
+    with pytest.raises(AttributeError):
+        video.playing = True
+
+
+def test_tag_pool_shares_tuples_and_strings():
+    pool = TagPool()
+    first = pool.get(["#cat", "#animal"])
+    second = pool.get(["#cat", "#" + "animal"])
+    assert first is second
+    assert pool.get(["#dog", "#animal"])[1] is first[1]
+    assert len(pool) == 2
+    assert Video("Cats", "cats_id", first).tags is first
+
+
+def test_loaded_videos_share_tags():
+    library = VideoLibrary()
+    cats = library.get_video("amazing_cats_video_id")
+    other_cats = library.get_video("another_cat_video_id")
+    dogs = library.get_video("funny_dogs_video_id")
+    assert cats.tags is other_cats.tags
+    assert cats.tags[1] is dogs.tags[1]
+
+
+def test_memory_benchmark_shows_savings(tmp_path):
+    path = tmp_path / "videos.txt"
+    write_catalog(path, CatalogSpec(videos=2000, tags=20, max_tags=2))
+    result = measure(path)
+    assert result["videos"] == 2000
+    assert result["after_bytes_per_video"] < result["before_bytes_per_video"]
@@ -35,10 +35,14 @@ class VideoLibrary:
                     url,
                     [tag.strip() for tag in tags.split(",")] if tags else [],
                 )
+        # The videos never change after loading, so they are sorted once.
+        # Flagging only appends to str(video), which leaves the order alone.
+        self._sorted_videos = tuple(sorted(self._videos.values(), key=str))
 
     def get_all_videos(self) -> Sequence[Video]:
-        """Returns all available video information from the video library."""
-        return list(sorted(self._videos.values(), key=str))
+        """Returns all available video information from the video library,
+        sorted by how the videos are printed."""
+        return self._sorted_videos
 
     def get_allowed_videos(self) -> Sequence[Video]:
         """Returns all allowed videos in the library."""